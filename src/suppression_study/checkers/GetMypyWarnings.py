@@ -1,5 +1,12 @@
 import argparse
+import json
+from os.path import join, normpath
+import re
+import shlex
+import subprocess
+import sys
 from suppression_study.checkers.GetWarningsSuper import GetWarningsSuper
+from suppression_study.suppression.Suppression import Suppression, write_suppressions_to_file
 from suppression_study.warnings.Warning import Warning
 
 
@@ -7,6 +14,13 @@ parser = argparse.ArgumentParser(description="Gather all Mypy warnings in a spec
 parser.add_argument("--repo_dir", help="Directory with the repository to check", required=True)
 parser.add_argument("--commit_id", help="Specify which commit to run checkers", required=True)
 parser.add_argument("--results_dir", help="Directory where to put the results", required=True)
+parser.add_argument("--unused_ignores", action="store_true", help="Also report the unused \"# type: ignore\" comments, "
+                    "written to <commit>_useless_suppressions.csv, in the same Mypy run")
+
+# an unused "# type: ignore" comment, with the unused codes, and the rest of the message
+USELESS_SUPPRESSION_PATTERN = re.compile(r"(.+?):(\d+): error: Unused \"type: ignore(?:\[(.*?)\])?\" comment(.*)")
+# eg,. ", use narrower [method-assign] instead of [assignment] code"
+NARROWER_CODE_PATTERN = re.compile(r"use narrower \[[^\]]*\] instead of \[([^\]]*)\] code")
 
 
 class GetMypyWarnings(GetWarningsSuper): 
@@ -14,17 +28,33 @@ class GetMypyWarnings(GetWarningsSuper):
     By receiving a repository and a commit, this script will run Mypy checker 
     on the specified commit, and return a warning list (written to a csv file.).
     '''
-    def __init__(self, repo_dir, commit_id, results_dir):
+    def __init__(self, repo_dir, commit_id, results_dir, unused_ignores=False, mypy_daemon=None, files=None,
+            shadow_files=None):
         self.repo_dir = repo_dir
         self.commit_id = commit_id
         self.results_dir = results_dir
+        # if True, Mypy also reports the unused "# type: ignore" comments, which are not warnings
+        self.unused_ignores = unused_ignores
+        # optional, a MypyDaemon to recheck the checkout incrementally, instead of running a new mypy process
+        self.mypy_daemon = mypy_daemon
+        # optional, the files to check (paths relative to repo_dir) instead of all, see get_source_files
+        self.files = files
+        # optional, path -> file, Mypy checks the content of the file instead, see SuppressionRemover.get_shadow_files
+        self.shadow_files = shadow_files if shadow_files else {}
     
     def run_checker(self):
         '''
         Run Mypy checker, Return a report file
         '''
         checker = "mypy"
-        command_line = "mypy ./"
+        options = ["--warn-unused-ignores"] if self.unused_ignores else []
+        for path, shadow_file in sorted(self.shadow_files.items()):
+            options += ["--shadow-file", shlex.quote(path), shlex.quote(shadow_file)]
+        files = [shlex.quote(file) for file in self.files] if self.files else ["./"]
+        command_line = " ".join(["mypy"] + options + files)
+        if self.mypy_daemon is not None:
+            self.checkout_commit() # before, the daemon may stop
+            command_line = self.mypy_daemon.get_command_line(self.repo_dir, self.commit_id, options, files)
         report, commit_results_dir = super(GetMypyWarnings, self).run_checker(checker, command_line)
 
         return report, commit_results_dir
@@ -57,11 +87,44 @@ class GetMypyWarnings(GetWarningsSuper):
                     # which leads to an incorrect entry in the warnings csv.
                     # The following is a temporary fix, which simply ignores such errors.
                     # if line_number.isdigit():
-                    warning_object = Warning(file_path, warning_type, line_number)
-                    warnings.append(warning_object)
+                    if self.unused_ignores and warning_type == "unused-ignore":
+                        pass # see read_useless_suppressions
+                    else:
+                        warning_object = Warning(file_path, warning_type, line_number)
+                        warnings.append(warning_object)
                 line = f.readline()
 
         return warnings 
+
+    def read_useless_suppressions(self, report):
+        '''
+        Read the unused "# type: ignore" comments of a report (with unused_ignores), Return a suppression list.
+        Report format:
+            chia/util/struct_stream.py:80: error: Unused "type: ignore" comment  [unused-ignore]
+            chia/util/struct_stream.py:95: error: Unused "type: ignore[misc, override]" comment  [unused-ignore]
+            chia/util/struct_stream.py:99: error: Unused "type: ignore" comment, use narrower [method-assign] instead of [assignment] code  [unused-ignore]
+        Mypy gives the error codes only for a comment with several codes, eg,. "# type: ignore[misc, override, arg-type]",
+        then only the unused ones, so that the suppression may be partly useful.
+        A code with a narrower one is reported unused, but it still suppresses the error of its sub-code,
+        unless the comment also has the sub-code, so it is not taken as useless.
+        '''
+        useless_suppressions = []
+        with open(report, "r") as f:
+            for line in f:
+                m = USELESS_SUPPRESSION_PATTERN.match(line)
+                if m is None:
+                    continue
+                codes = m.group(3).split(", ") if m.group(3) is not None else None
+                used_codes = NARROWER_CODE_PATTERN.findall(m.group(4))
+                if used_codes:
+                    if codes is None: # a single code, used through its sub-code
+                        continue
+                    codes = [code for code in codes if code not in used_codes]
+                    if not codes:
+                        continue
+                text = f"# type: ignore[{', '.join(codes)}]" if codes is not None else "# type: ignore"
+                useless_suppressions.append(Suppression(m.group(1), text, int(m.group(2))))
+        return useless_suppressions
     
     def write_warning_list(self, warnings, commit_results_dir):
         '''
@@ -70,14 +133,56 @@ class GetMypyWarnings(GetWarningsSuper):
         super(GetMypyWarnings, self).write_warning_list(warnings, commit_results_dir)
 
 
-def main(repo_dir, commit_id, results_dir):
-    init = GetMypyWarnings(repo_dir, commit_id, results_dir)
+def get_source_files(repo_dir):
+    '''
+    Return the files "mypy ./" checks in repo_dir (with its configuration, eg,. "exclude"), a set of normalized paths.
+    Mypy gives the same warnings in these files when it checks only some of them, by following their imports,
+    but a file it doesn't find in "./" is checked when passed explicitly.
+    None if Mypy can't tell, or if two files are the same module, which stops "mypy ./".
+    Mypy reads its configuration from the working directory, so it runs in another process, in repo_dir.
+    '''
+    result = subprocess.run([sys.executable, "-c", SOURCE_FILES_SCRIPT], cwd=repo_dir,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    if result.returncode != 0: # eg,. mypy is installed in another environment, or a bad configuration
+        return None
+    sources = json.loads(result.stdout)
+    modules = [module for module, _ in sources]
+    if len(set(modules)) != len(modules) or any(path is None for _, path in sources):
+        return None
+    return {normpath(path) for _, path in sources}
+
+
+# prints the (module, path) of the sources of "mypy ./", exits with 1 if Mypy fails
+SOURCE_FILES_SCRIPT = '''
+import sys
+sys.path.pop(0) # the working directory, a module of the repository must not replace mypy's modules
+import json
+try:
+    from mypy.main import process_options
+    sources, _ = process_options(["./"])
+except (Exception, SystemExit): # Mypy exits on bad configurations
+    sys.exit(1)
+print(json.dumps([[source.module, source.path] for source in sources]))
+'''
+
+
+def main(repo_dir, commit_id, results_dir, unused_ignores=False, mypy_daemon=None, files=None, shadow_files=None):
+    '''
+    With unused_ignores, also return the useless suppressions Mypy reports (and write them to a csv file).
+    With files, check only those files, and their imports, instead of all files.
+    With shadow_files, check the content of the shadow files instead of the files in the repository.
+    '''
+    init = GetMypyWarnings(repo_dir, commit_id, results_dir, unused_ignores, mypy_daemon, files, shadow_files)
     report, commit_results_dir = init.run_checker()
     warnings = init.read_reports(report)
     init.write_warning_list(warnings, commit_results_dir)
+    if unused_ignores:
+        useless_suppressions = init.read_useless_suppressions(report)
+        write_suppressions_to_file(useless_suppressions, join(commit_results_dir, f"{commit_id}_useless_suppressions.csv"))
+        return useless_suppressions
 
 
 if __name__=="__main__":
     args = parser.parse_args()
-    main(args.repo_dir, args.commit_id, args.results_dir)
+    main(args.repo_dir, args.commit_id, args.results_dir, args.unused_ignores)
     
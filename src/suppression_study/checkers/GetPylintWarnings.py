@@ -1,13 +1,20 @@
 import argparse
 from suppression_study.checkers.GetWarningsSuper import GetWarningsSuper
-from suppression_study.warnings.Warning import Warning
-import os
+from suppression_study.checkers.IncrementalPylint import IncrementalPylint
+from suppression_study.checkers.PylintMessages import (
+    PYLINT_MAX_EXIT_STATUS, get_warnings_from_messages, iter_messages_from_json_output)
+from suppression_study.checkers.WarningCache import WarningCache
+from suppression_study.utils.FunctionsCommon import get_commit_list
 
 
 parser = argparse.ArgumentParser(description="Gather all Pylint warnings in a specific commit")
 parser.add_argument("--repo_dir", help="Directory with the repository to check", required=True)
-parser.add_argument("--commit_id", help="Specify which commit to run checkers", required=True)
+parser.add_argument("--commit_id", help="Specify which commit to run checkers")
+parser.add_argument("--commits_file", help=".csv file with the commits to run checkers on (instead of --commit_id), "
+                    "only the files changed since the previous commit in the file are checked again")
 parser.add_argument("--results_dir", help="Directory where to put the results", required=True)
+parser.add_argument("--warning_cache", help="SQLite file to keep the messages of every file version in, "
+                    "file versions linted before, in any run, are not linted again")
 
 
 class GetPylintWarnings(GetWarningsSuper): 
@@ -15,14 +22,16 @@ class GetPylintWarnings(GetWarningsSuper):
     By receiving a repository and a commit, this script will run Pylint checker 
     on the specified commit, and return a warning list (written to a csv file.).
     '''
-    def __init__(self, repo_dir, commit_id, results_dir):
+    def __init__(self, repo_dir, commit_id, results_dir, pylint_worker=None):
         self.repo_dir = repo_dir
         self.commit_id = commit_id
         self.results_dir = results_dir
+        # optional, a PylintWorker (or IncrementalPylint) to send the checks to, instead of running a new pylint process
+        self.pylint_worker = pylint_worker
     
     def run_checker(self):
         '''
-        Run Pylint checker, Return a report file
+        Run Pylint checker, Return an iterator over its messages (read while Pylint runs, no report file)
 
         Option: choose to disable a specific message category or not 
         [I]nformational messages that Pylint emits (do not contribute to your analysis score)
@@ -34,90 +43,28 @@ class GetPylintWarnings(GetWarningsSuper):
         here do not consider I.
         '''
         checker = "pylint"
-        command_line = "pylint --recursive=y --disable=I ./" # --enable=I0020
-        report, commit_results_dir = super(GetPylintWarnings, self).run_checker(checker, command_line)
+        command_line = "pylint --recursive=y --disable=I --output-format=json ./" # --enable=I0020
+        output_lines, commit_results_dir = super(GetPylintWarnings, self).run_checker_streaming(
+                checker, command_line, PYLINT_MAX_EXIT_STATUS)
 
-        return report, commit_results_dir
+        return iter_messages_from_json_output(output_lines), commit_results_dir
 
-    def read_reports(self, report):
+    def run_checker_in_worker(self):
         '''
-        Read reports, Return a warning list.
-        Pylint report format: [all C, W, E, F, and part of R]
-            eg,. folder1/bar.py:1:0: C0104: Disallowed name "bar" (disallowed-name)
-
-        [R]efactor categories:
-        Format 1] tests/unit/daemon.py:6:0: R0402: Use 'from xx import ff' instead (consider-using-from-import)
-                  tests/unit/daemon.py:15:0: R0401: Cyclic import (xx.remote.base -> xx.remote.local) (cyclic-import)
-        Format 2] test.py:1:0: R0801: Similar lines in 2 files
-                    ==xx.remote.gs:[166:180]
-                    ==xx.remote.s3:[212:226]
-                                    continue
-
-                                if to_info['scheme'] != 'local':
-                                    raise NotImplementedError
-
-                                msg = "Downloading '{}/{}' to '{}'".format(from_info['bucket'],
-                                                                        from_info['path'],
-                                                                        to_info['path'])
-                                logger.debug(msg)
-
-                                tmp_file = self.tmp_file(to_info['path'])
-                                if not name:
-                                    name = os.path.basename(to_info['path'])
-                    (duplicate-code)
+        Like run_checker, but in the pylint_worker
         '''
-        warnings = [] 
-        message_types = ("R", "C", "W", "E", "F")
-        r_format_2 = False # if a warning_type is R
-        r_file_path = "" # to temporally store the file_path of a R type message
-        r_line_number = ""
-
-        with open(report, "r") as f:
-            lines = f.readlines()
-        all_line_num = len(lines)
-        for line, line_index in zip(lines, range(all_line_num)):
-            if line.count(":") > 3:  # in general, with 4 ":".
-                contents = line.split(":")
-                warning_code = contents[3].strip()
-                if warning_code.startswith(message_types):
-                    # exactly the line show warning messages, not source code
-                    if r_format_2 == True:
-                        # finish the previous warning_type extraction
-                        r_warning_type = lines[line_index-1].split("(")[-1].replace(")", "").strip()
-                        assert r_warning_type != ""
-                        warning_object = Warning(r_file_path, r_warning_type, r_line_number)
-                        warnings.append(warning_object)
-                        r_format_2 = False
+        return super(GetPylintWarnings, self).run_checker_in_worker(
+                "pylint", self.pylint_worker, ["./"], ["--recursive=y", "--disable=I"])
 
-                    file_path = contents[0].strip()
-                    line_number = int(contents[1].strip())
-                    # specific warning type
-                    warning_type = line.split("(")[-1].replace(")", "").strip()
-                    # special process for R format 2
-                    if warning_code.startswith("R") and warning_type == line.strip():
-                        r_format_2 = True
-                        # keep extracted file_path and line_number
-                        r_file_path = file_path
-                        r_line_number = line_number
-                    else:
-                        assert warning_type != ""
-                        warning_object = Warning(file_path, warning_type, line_number)
-                        warnings.append(warning_object)
-            elif r_format_2 == True and line_index == all_line_num - 1:
-                # last line of this report, and still a R massage haven't get its warning type.
-                '''
-                End of Pylint report:
-                    [last message] util.py:1:0: R0401: Cyclic import xxx (cyclic-import)
-                    [empty line]
-                    -----------------------------------
-                    Your code has been rated at 7.22/10
-                to get the last message line, current line_index - 3
-                '''
-                r_warning_type = lines[line_index-1].split("(")[-1].replace(")", "").strip()
-                assert r_warning_type != ""
-                warning_object = Warning(r_file_path, r_warning_type, r_line_number)
-                warnings.append(warning_object)
-        return warnings
+    def read_reports(self, messages):
+        '''
+        Read the messages, Return a warning list.
+        A message is [path, line, msg_id, symbol, msg], [all C, W, E, F, and part of R]
+            eg,. ["folder1/bar.py", 1, "C0104", "disallowed-name", "Disallowed name \"bar\""]
+        Multi-line messages are a single message as well,
+            eg,. ["test.py", 1, "R0801", "duplicate-code", "Similar lines in 2 files\n==xx.remote.gs:[166:180]\n..."]
+        '''
+        return get_warnings_from_messages(messages)
     
     def write_warning_list(self, warnings, commit_results_dir):
         '''
@@ -126,13 +73,35 @@ class GetPylintWarnings(GetWarningsSuper):
         super(GetPylintWarnings, self).write_warning_list(warnings, commit_results_dir)
 
 
-def main(repo_dir, commit_id, results_dir):
-    init = GetPylintWarnings(repo_dir, commit_id, results_dir)
-    report, commit_results_dir = init.run_checker()
-    if os.path.getsize(report):
-        warnings = init.read_reports(report)
-        init.write_warning_list(warnings, commit_results_dir)
+def main(repo_dir, commit_id, results_dir, pylint_worker=None):
+    init = GetPylintWarnings(repo_dir, commit_id, results_dir, pylint_worker)
+    if pylint_worker is not None:
+        messages, commit_results_dir = init.run_checker_in_worker()
+    else:
+        messages, commit_results_dir = init.run_checker()
+    warnings = init.read_reports(messages)
+    init.write_warning_list(warnings, commit_results_dir)
+
+
+def main_for_commits(repo_dir, commit_ids, results_dir, pylint_worker=None, warning_cache=None):
+    '''
+    Like main, for every commit in commit_ids, but lint only what changed since the previous commit,
+    or, with a WarningCache, what was not linted before, see IncrementalPylint.
+    Neighbouring commits in commit_ids should be close in the history.
+    '''
+    incremental_pylint = IncrementalPylint(pylint_worker, warning_cache)
+    for commit_id in commit_ids:
+        main(repo_dir, commit_id, results_dir, incremental_pylint)
 
 if __name__=="__main__":
     args = parser.parse_args()
-    main(args.repo_dir, args.commit_id, args.results_dir)   
\ No newline at end of file
+    warning_cache = WarningCache(args.warning_cache) if args.warning_cache else None
+    if args.commits_file:
+        main_for_commits(args.repo_dir, get_commit_list(args.commits_file), args.results_dir,
+                warning_cache=warning_cache)
+    elif warning_cache is not None:
+        main(args.repo_dir, args.commit_id, args.results_dir, IncrementalPylint(warning_cache=warning_cache))
+    else:
+        main(args.repo_dir, args.commit_id, args.results_dir)
+    if warning_cache is not None:
+        warning_cache.close()   
\ No newline at end of file
@@ -1,10 +1,10 @@
 from typing import List
 import argparse
-import re
 from os.path import exists, join
 from suppression_study.checkers.GetPylintWarnings import GetPylintWarnings
-from suppression_study.suppression.Suppression import Suppression
-from suppression_study.warnings.Warning import Warning
+from suppression_study.checkers.IncrementalPylint import IncrementalPylint
+from suppression_study.checkers.PylintMessages import (
+    PYLINT_MAX_EXIT_STATUS, get_suppression_warning_pairs_from_messages, iter_messages_from_json_output)
 from suppression_study.warnings.WarningSuppressionUtil import write_mapping_to_csv
 
 
@@ -24,65 +24,50 @@ class GetSuppressedPylintWarnings(GetPylintWarnings):
     which allows us to get the list of suppressed warnings.   
     """
 
-    def __init__(self, repo_dir, commit_id, results_dir, file_specific, relevant_files): 
+    def __init__(self, repo_dir, commit_id, results_dir, file_specific, relevant_files, pylint_worker=None): 
         # relevant_files is a set. It is valid >=python 3.9 as relevant_files: set[str] and <3.9 relevant_files: Set[str]
         self.repo_dir = repo_dir
         self.commit_id = commit_id
         self.results_dir = results_dir
         self.file_specific, = file_specific, 
         self.relevant_files = relevant_files
+        self.pylint_worker = pylint_worker
+
+    def get_files_to_analyze(self):
+        if self.relevant_files:
+            return [f for f in self.relevant_files if exists(join(self.repo_dir, f))]
+        return ["./"] # for running tests
 
     def run_checker(self):
+        '''
+        Run Pylint with suppressed-message enabled, Return an iterator over its messages
+        (read while Pylint runs, no report file)
+        '''
         checker = "pylint"
-        report = None
-        commit_results_dir = None
-        
-        # the default output path from checkers/GetWarningsSuper.py
-        default_report_path = join(self.results_dir, "checker_results", checker, f"{self.commit_id}_report.txt")
-        if not exists(default_report_path):
-            if self.relevant_files:
-                files_to_analyze = [
-                    f for f in self.relevant_files if exists(join(self.repo_dir, f))]
-                command_line = f"pylint --recursive=y --disable=I --enable=I0020 {' '.join(files_to_analyze)}"
-            else: # for running tests
-                command_line = f"pylint --recursive=y --disable=I --enable=I0020 ./"
-
-            report, commit_results_dir = super(
-                GetPylintWarnings, self).run_checker(checker, command_line, self.file_specific)
-
-        return report, commit_results_dir
-
-    def read_reports(self, report):
-        suppression_warning_pairs = []
-        with open(report, "r") as f:
-            lines = f.readlines()
-            for line in lines:
-                line = line.strip()
-                if line.endswith("(suppressed-message)"):
-                    # [file for file in self.relevant_files if file in line] and 
-                    assert line.count(":") == 4
-                    file_path, line_number, _, _, rest = line.split(":")
-                    m = re.search(
-                        " Suppressed '(.+?)' \(from line (.+?)\)", rest)
-                    assert m
-                    warning_type = m.group(1)
-                    suppression_line_number = m.group(2)
-
-                    suppression = Suppression(
-                        file_path, f"# pylint: disable={warning_type}", int(suppression_line_number))
-                    warning = Warning(
-                        file_path, warning_type, int(line_number))
-                    suppression_warning_pairs.append([suppression, warning])
-                elif "Parsing failed" in line:
-                    # print(f"Parsing failed: {report}")
-                    suppression_warning_pairs = None
-                    break
-
-        return suppression_warning_pairs
-
-
-def main(repo_dir, commit_id, results_dir, relevant_files: List[str] = None):
-    # avoid covering the existing check reports.
+        command_line = f"pylint --recursive=y --disable=I --enable=I0020 --output-format=json " \
+                f"{' '.join(self.get_files_to_analyze())}"
+        output_lines, commit_results_dir = super(
+            GetPylintWarnings, self).run_checker_streaming(checker, command_line, PYLINT_MAX_EXIT_STATUS)
+
+        return iter_messages_from_json_output(output_lines), commit_results_dir
+
+    def run_checker_in_worker(self):
+        '''
+        Like run_checker, but in the pylint_worker
+        '''
+        return super(GetPylintWarnings, self).run_checker_in_worker(
+                "pylint", self.pylint_worker, self.get_files_to_analyze(),
+                ["--recursive=y", "--disable=I", "--enable=I0020"])
+
+    def read_reports(self, messages):
+        '''
+        Read the messages, Return the [suppression, warning] pairs, None if Pylint failed to parse a file.
+        '''
+        return get_suppression_warning_pairs_from_messages(messages)
+
+
+def main(repo_dir, commit_id, results_dir, relevant_files: List[str] = None, pylint_worker=None):
+    # avoid covering the existing check results.
     # file_specific: file name and its first layer parent folder name as a symbol to identify different reports
     # e.g., all/repo/a.py --> repo_a
     file_specific = None
@@ -90,17 +75,32 @@ def main(repo_dir, commit_id, results_dir, relevant_files: List[str] = None):
         file_specific = "_".join(relevant_files[0].rsplit("/", 3)[1:]).rsplit(".", 1)[0]
 
     tool = GetSuppressedPylintWarnings(
-        repo_dir, commit_id, results_dir, file_specific, relevant_files, )
-    report, _ = tool.run_checker()
-
-    suppression_warning_pairs = []
-    if report:
-        suppression_warning_pairs = tool.read_reports(report)
-        if suppression_warning_pairs:
-            write_mapping_to_csv(suppression_warning_pairs, results_dir, commit_id, file_specific)
+        repo_dir, commit_id, results_dir, file_specific, relevant_files, pylint_worker)
+    if not tool.get_files_to_analyze():
+        return [] # none of the relevant files exists
+    if pylint_worker is not None:
+        messages, _ = tool.run_checker_in_worker()
+    else:
+        messages, _ = tool.run_checker()
+
+    suppression_warning_pairs = tool.read_reports(messages)
+    if suppression_warning_pairs:
+        write_mapping_to_csv(suppression_warning_pairs, results_dir, commit_id, file_specific)
     return suppression_warning_pairs
 
 
+def main_for_commits(repo_dir, commit_ids, results_dir, relevant_files: List[str] = None, pylint_worker=None,
+        warning_cache=None):
+    '''
+    Like main, for every commit in commit_ids, but lint only what changed since the previous commit,
+    or, with a WarningCache, what was not linted before, see IncrementalPylint.
+    Return a dict: commit -> suppression_warning_pairs.
+    '''
+    incremental_pylint = IncrementalPylint(pylint_worker, warning_cache)
+    return {commit_id: main(repo_dir, commit_id, results_dir, relevant_files, incremental_pylint)
+            for commit_id in commit_ids}
+
+
 if __name__ == "__main__":
     args = parser.parse_args()
     main(args.repo_dir, args.commit_id, args.results_dir)
@@ -20,6 +20,42 @@ class GetWarningsSuper():
         Use the same output folder architecture for all the checkers and repositories,
         Only different in checkers and command_line 
         '''
+        self.checkout_commit()
+        commit_results_dir = self.get_commit_results_dir(checker)
+        if file_specific:
+            report = join(commit_results_dir, f"{self.commit_id}_report_{file_specific}.txt")
+        else:
+            report = join(commit_results_dir, f"{self.commit_id}_report.txt")
+        
+        result = subprocess.run(command_line, cwd=self.repo_dir, shell=True, stdout=subprocess.PIPE, universal_newlines=True)
+        output_txt = result.stdout
+        with open(report, "w") as f:
+            f.writelines(output_txt)
+
+        return report, commit_results_dir
+
+    def run_checker_streaming(self, checker, command_line, max_exit_status=0):
+        '''
+        Like run_checker, but without a report file,
+        Return an iterator over the lines the checker writes to its standard output, while it runs,
+        and the commit_results_dir
+        The iterator raises RuntimeError at the end if the checker exits with a status above max_exit_status.
+        '''
+        self.checkout_commit()
+        commit_results_dir = self.get_commit_results_dir(checker)
+        return iter_command_output(command_line, self.repo_dir, max_exit_status), commit_results_dir
+
+    def run_checker_in_worker(self, checker, worker, files, options):
+        '''
+        Like run_checker, but send the files to a long-lived checker worker (eg,. PylintWorker),
+        Return the messages of the checker instead of a report file, and the commit_results_dir
+        '''
+        self.checkout_commit()
+        commit_results_dir = self.get_commit_results_dir(checker)
+        messages = worker.check(self.repo_dir, files, options)
+        return messages, commit_results_dir
+
+    def checkout_commit(self):
         # checkout the target commit, but only if we're not yet at this commit anyway
         # (the check is needed because we may otherwise overwrite local changes,
         # e.g., made by SuppressionRemover)
@@ -28,21 +64,12 @@ class GetWarningsSuper():
             target_repo = Repo(self.repo_dir)
             target_repo.git.checkout(self.commit_id, force=True)
 
+    def get_commit_results_dir(self, checker):
         # used to store checker results and extracted warning csv file
         commit_results_dir = join(self.results_dir, "checker_results", checker)
         if not os.path.exists(commit_results_dir):
             os.makedirs(commit_results_dir)
-        if file_specific:
-            report = join(commit_results_dir, f"{self.commit_id}_report_{file_specific}.txt")
-        else:
-            report = join(commit_results_dir, f"{self.commit_id}_report.txt")
-        
-        result = subprocess.run(command_line, cwd=self.repo_dir, shell=True, stdout=subprocess.PIPE, universal_newlines=True)
-        output_txt = result.stdout
-        with open(report, "w") as f:
-            f.writelines(output_txt)
-
-        return report, commit_results_dir
+        return commit_results_dir
 
     def write_warning_list(self, warnings, commit_results_dir):
         '''
@@ -51,4 +78,28 @@ class GetWarningsSuper():
         with open(join(commit_results_dir, self.commit_id + "_warnings.csv"), "w") as csvfile:
             csv_writer = csv.writer(csvfile)
             for single_warning in warnings:
-                csv_writer.writerow([single_warning.path, single_warning.kind, single_warning.line])
\ No newline at end of file
+                csv_writer.writerow([single_warning.path, single_warning.kind, single_warning.line])
+
+
+def iter_command_output(command_line, cwd, max_exit_status=0):
+    '''
+    Run the command, yield its standard output (UTF-8) line by line.
+    Stops the command if the caller stops reading before the end.
+    After the last line, raise RuntimeError if the command exited with a status above max_exit_status,
+    or was killed, eg,. a checker that crashed after writing part of its output.
+    '''
+    # exec: the shell becomes the command, so that kill stops the command itself
+    process = subprocess.Popen(f"exec {command_line}", cwd=cwd, shell=True, stdout=subprocess.PIPE,
+            encoding="utf-8")
+    stopped = True
+    try:
+        for line in process.stdout:
+            yield line
+        stopped = False
+    finally:
+        if stopped and process.poll() is None:
+            process.kill() # the caller stopped reading
+        process.stdout.close()
+        process.wait()
+    if not 0 <= process.returncode <= max_exit_status:
+        raise RuntimeError(f"{command_line} failed in {cwd} with exit status {process.returncode}")
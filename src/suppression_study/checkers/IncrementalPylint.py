@@ -0,0 +1,561 @@
+'''
+Pylint over a sequence of checkouts (eg,. a range of commits), re-linting only what changed.
+Between neighbouring commits almost all files are unchanged, their messages are reused as they are,
+so line numbers stay exact. Re-linted are the files whose content changed,
+and the files that import them, directly or through other files, as Pylint's inference follows imports.
+The run on some files checks one more file in every package root no re-linted file is in,
+so that Pylint puts the same directories on sys.path as in a run on all files, see add_package_root_paths.
+
+Every file gets a key from its blob id and the blob ids of the files it imports, directly or through
+other files, messages are stored per key: in memory, for the previous checkout only,
+or in a WarningCache, for any checkout linted before, in this run or an earlier one.
+
+Checks that look at all files together, duplicate-code and cyclic-import, cannot be split per file,
+they run in a separate pass over all files, with every other message disabled. The pass only runs
+when its messages may have changed: cyclic-import messages are stored under a digest of the imports in all files,
+duplicate-code messages under a digest of the similar lines in all files, which are found with Pylint's own code
+in this process, comparing again only the pairs of files with a changed file, see get_similarities.
+Everything is re-linted from scratch when a Pylint configuration file, the set of __init__.py files
+(module names), the files to check, or the options change.
+All this depends on Pylint internals, with a Pylint version other than SUPPORTED_PYLINT_VERSION,
+every check is a run on all files.
+'''
+
+import ast
+import codecs
+import hashlib
+from importlib.metadata import version
+from io import BytesIO
+import json
+import os
+from os.path import abspath, exists, join
+import re
+import shlex
+import subprocess
+import sys
+import tokenize
+
+try: # Pylint internals, see SUPPORTED_PYLINT_VERSION
+    from pylint.checkers.similar import LineSet, Similar, hash_lineset
+except ImportError:
+    LineSet = Similar = hash_lineset = None
+
+from suppression_study.checkers.GetWarningsSuper import iter_command_output
+from suppression_study.checkers.PylintMessages import PYLINT_MAX_EXIT_STATUS, iter_messages_from_json_output
+
+
+# the Pylint version pinned in pyproject.toml, the only one the incremental checks run with:
+# get_similarities calls the private Similar._find_common, and add_package_root_paths and get_ignore_pattern
+# follow how Pylint puts package roots on sys.path and matches --ignore-paths
+SUPPORTED_PYLINT_VERSION = "2.17.4"
+CROSS_FILE_SYMBOLS = ("duplicate-code", "cyclic-import")
+# names in a pragma that may turn a cross file check off or on, lower case
+CROSS_FILE_PRAGMA_NAMES = {
+    "duplicate-code": {"duplicate-code", "r0801", "similarities", "r", "all", "skip-file", "disable-all"},
+    "cyclic-import": {"cyclic-import", "r0401", "imports", "r", "all", "skip-file", "disable-all"},
+}
+# read by Pylint from the working directory, the repository root
+CONFIG_FILES = (".pylintrc", "pylintrc", "pyproject.toml", "setup.cfg", "tox.ini")
+PRAGMA_PATTERN = re.compile(r"#\s*pylint\s*:([^\n#]*)")
+
+
+class IncrementalPylint():
+    '''
+    Has the check method of PylintWorker, so it can be used wherever a pylint_worker is accepted.
+    Runs Pylint in the given pylint_worker, or in a new "pylint" process per run.
+    '''
+
+    def __init__(self, pylint_worker=None, warning_cache=None):
+        self.pylint_worker = pylint_worker
+        # optional, a WarningCache to keep the messages in, across checkouts and runs
+        self.warning_cache = warning_cache
+        self.checker_version = get_checker_version()
+        self.incremental = version("pylint") == SUPPORTED_PYLINT_VERSION and Similar is not None
+        if not self.incremental:
+            print(f"Pylint {version('pylint')} is not {SUPPORTED_PYLINT_VERSION}, checking all files every time.")
+        self.request = None # (repo_dir, files, options, config_hash) of the last check
+        self.stored_messages = {} # file key -> messages, of the last check
+        self.other_messages = [] # messages about no file in the repository, eg,. about the command line
+        self.imports_cache = {} # blob id -> imports in the file, see get_imports
+        self.cross_file_info_cache = {} # blob id -> what the cross file checks see of the file, see get_cross_file_info
+        # for get_similarities: the config hash they are for, a Similar with the options of the duplicate-code check,
+        # (path, blob id) -> (LineSet, hashes of its chunks of min_lines lines),
+        # and ((path, blob id), (path, blob id)) -> similar lines, of the last check
+        self.similarity_config_hash = None
+        self.similar = None
+        self.line_sets = {}
+        self.pair_similarities = {}
+
+    def check(self, repo_dir, files, options):
+        '''
+        Like PylintWorker.check, return the messages of Pylint on the files in repo_dir, as they are now.
+        '''
+        if not self.incremental:
+            return self.run(repo_dir, files, options)
+        repo_dir = abspath(repo_dir)
+        blobs = get_working_tree_blobs(repo_dir)
+        config_hash = get_config_hash(files, options, blobs)
+        request = (repo_dir, list(files), list(options), config_hash)
+        if request != self.request:
+            self.stored_messages = {}
+            self.other_messages = []
+
+        file_keys = {path: key for path, key in self.get_file_keys(repo_dir, blobs).items() if is_checked(path, files)}
+        cross_file_keys = self.get_cross_file_keys(repo_dir, file_keys, blobs, config_hash, options)
+        keys = list(file_keys.values()) + list(cross_file_keys.values())
+        found_messages = self.get_stored_messages(config_hash, keys)
+        new_messages = {}
+
+        paths_to_lint = sorted(path for path, key in file_keys.items() if key not in found_messages)
+        if paths_to_lint:
+            paths_to_lint = add_package_root_paths(paths_to_lint, file_keys, blobs)
+        ignore_pattern = get_ignore_pattern(paths_to_lint) if len(paths_to_lint) < len(file_keys) else None
+        if paths_to_lint and ignore_pattern is None: # all files, or paths the pattern cannot take
+            messages = self.run(repo_dir, files, options)
+            new_messages = self.group_messages(messages, file_keys, file_keys, cross_file_keys)
+        elif paths_to_lint:
+            messages = self.run(repo_dir, files, options + [
+                    f"--disable={','.join(CROSS_FILE_SYMBOLS)}", f"--ignore-paths={ignore_pattern}"])
+            new_messages = self.group_messages(messages, file_keys, paths_to_lint, None)
+        missing_symbols = [symbol for symbol, key in cross_file_keys.items()
+                if key not in found_messages and key not in new_messages]
+        if missing_symbols:
+            messages = self.run(repo_dir, files, get_cross_file_options(options, missing_symbols))
+            for symbol in missing_symbols:
+                new_messages[cross_file_keys[symbol]] = [message for message in messages
+                        if get_cross_file_symbol(message) == symbol]
+
+        self.put_stored_messages(config_hash, new_messages)
+        found_messages.update(new_messages)
+        self.request = request
+        self.stored_messages = {key: found_messages[key] for key in keys}
+
+        all_messages = [message for path in sorted(file_keys) for message in found_messages[file_keys[path]]]
+        cross_file_messages = [message for key in cross_file_keys.values() for message in found_messages[key]]
+        return all_messages + self.other_messages + cross_file_messages
+
+    def group_messages(self, messages, file_keys, linted_paths, cross_file_keys):
+        '''
+        Return a dict: file key -> messages, for the linted_paths (possibly no messages),
+        and for the cross_file_keys (cross file symbol -> key), if not None. Keep the other messages in other_messages.
+        '''
+        grouped_messages = {file_keys[path]: [] for path in linted_paths}
+        if cross_file_keys is not None:
+            grouped_messages.update((key, []) for key in cross_file_keys.values())
+        self.other_messages = []
+        for message in messages:
+            cross_file_symbol = get_cross_file_symbol(message)
+            if cross_file_keys is not None and cross_file_symbol is not None:
+                grouped_messages[cross_file_keys[cross_file_symbol]].append(message)
+            elif message[0] in file_keys:
+                # may also be a file not in linted_paths, see get_ignore_pattern
+                grouped_messages.setdefault(file_keys[message[0]], []).append(message)
+            else:
+                self.other_messages.append(message)
+        return grouped_messages
+
+    def get_stored_messages(self, config_hash, keys):
+        if self.warning_cache is None:
+            return {key: self.stored_messages[key] for key in keys if key in self.stored_messages}
+        return self.warning_cache.get_many("pylint", self.checker_version, config_hash, keys)
+
+    def put_stored_messages(self, config_hash, key_to_messages):
+        if self.warning_cache is not None and key_to_messages:
+            self.warning_cache.put_many("pylint", self.checker_version, config_hash, key_to_messages)
+
+    def run(self, repo_dir, files, options):
+        if self.pylint_worker is not None:
+            return self.pylint_worker.check(repo_dir, files, options)
+        command_line = shlex.join(["pylint", "--output-format=json"] + options + files)
+        return list(iter_messages_from_json_output(iter_command_output(command_line, repo_dir, PYLINT_MAX_EXIT_STATUS)))
+
+    def get_file_keys(self, repo_dir, blobs):
+        '''
+        Return a dict: path -> key, for the Python files.
+        The key is the blob id of the file, and a digest of the paths and blob ids of the files it imports,
+        directly or through other files. Every file an imported name may stand for counts as imported.
+        '''
+        python_paths = sorted(path for path in blobs if path.endswith(".py"))
+        module_name_to_paths = {}
+        for path in python_paths:
+            for module_name in get_module_names(path):
+                module_name_to_paths.setdefault(module_name, []).append(path)
+        imported_paths = {}
+        for path in python_paths:
+            imported_paths[path] = sorted({imported_path
+                    for module_name in self.get_imported_module_names(repo_dir, path, blobs[path])
+                    for imported_path in module_name_to_paths.get(module_name, ()) if imported_path != path})
+        digests = get_dependency_digests(python_paths, imported_paths, blobs)
+        return {path: f"{blobs[path]}:{digests[path]}" for path in python_paths}
+
+    def get_imported_module_names(self, repo_dir, path, blob):
+        if blob not in self.imports_cache:
+            self.imports_cache[blob] = get_imports(join(repo_dir, path))
+        package_parts = path.split("/")[:-1]
+        module_names = set()
+        for level, module, names in self.imports_cache[blob]:
+            parts = module.split(".") if module else []
+            if level:
+                # relative import, the package counted from the file's directory
+                if level - 1 > len(package_parts):
+                    continue
+                parts = package_parts[:len(package_parts) - (level - 1)] + parts
+            for i in range(1, len(parts) + 1):
+                module_names.add(".".join(parts[:i]))
+            for name in names: # from m import x, x may be a module as well
+                module_names.add(".".join(parts + [name]))
+        return module_names
+
+    def get_cross_file_keys(self, repo_dir, file_keys, blobs, config_hash, options):
+        '''
+        Return a dict: cross file symbol -> key, for the messages of the cross file checks on the checked files.
+        cyclic-import messages depend on the imports in the checked files, and on which modules there are,
+        duplicate-code messages on the similar lines in the checked files, see get_similarities.
+        A file with a pragma that may turn a check off or on counts with its blob id for that check.
+        Both also depend on the paths of the checked files, the messages are about the last one Pylint checks.
+        '''
+        paths = sorted(file_keys)
+        infos = {path: self.get_cross_file_info(repo_dir, path, blobs[path]) for path in paths}
+        module_paths = sorted(path for path in blobs if path.endswith(".py"))
+        imports = [[path, blobs[path] if infos[path][1] & CROSS_FILE_PRAGMA_NAMES["cyclic-import"] else infos[path][0]]
+                for path in paths]
+        if any(info[1] & CROSS_FILE_PRAGMA_NAMES["duplicate-code"] for info in infos.values()):
+            similarities = [[path, blobs[path]] for path in paths]
+        else:
+            similarities = self.get_similarities(repo_dir, [path for path in paths if infos[path][0] is not None],
+                    blobs, config_hash, options)
+        return {"duplicate-code": "duplicate-code:" + get_digest([paths, similarities]),
+                "cyclic-import": "cyclic-import:" + get_digest([paths, module_paths, imports])}
+
+    def get_cross_file_info(self, repo_dir, path, blob):
+        '''
+        Return (imports, pragma names) of the file: the imports with the statements around them
+        (see get_import_structure), None if Python cannot parse the file,
+        and the lower case names in the file's Pylint pragmas.
+        '''
+        if blob not in self.cross_file_info_cache:
+            with open(join(repo_dir, path), "rb") as f:
+                source = f.read()
+            try:
+                imports = get_import_structure(ast.parse(source))
+            except (SyntaxError, ValueError):
+                imports = None
+            pragma_names = {name.lower() for pragma in PRAGMA_PATTERN.findall(source.decode(errors="replace"))
+                    for name in re.findall(r"[\w-]+", pragma)}
+            self.cross_file_info_cache[blob] = (imports, pragma_names)
+        return self.cross_file_info_cache[blob]
+
+    def get_similarities(self, repo_dir, paths, blobs, config_hash, options):
+        '''
+        Return the similar lines Pylint's duplicate-code check finds in each pair of the files, a sorted list.
+        The files are compared like Pylint does, with its own code and with the options of the check,
+        but only the pairs with a file that is new or changed since the last check are compared again,
+        and only if they have a chunk of min_lines lines in common, as Pylint looks for similar lines from those.
+        Pylint groups the similar lines of all pairs into its messages, so these are the same while the list is.
+        '''
+        if config_hash != self.similarity_config_hash:
+            self.similarity_config_hash = config_hash
+            self.similar = Similar(*get_similarity_options(repo_dir, options))
+            self.line_sets = {}
+            self.pair_similarities = {}
+        files = [(path, blobs[path]) for path in paths]
+        new_files = sorted(file for file in files if file not in self.line_sets)
+        self.line_sets = {file: self.line_sets[file] if file in self.line_sets else
+                get_line_set(repo_dir, file[0], self.similar.namespace) for file in files}
+        self.pair_similarities = {pair: similarities for pair, similarities in self.pair_similarities.items()
+                if pair[0] in self.line_sets and pair[1] in self.line_sets}
+        compared_files = set()
+        for new_file in new_files:
+            compared_files.add(new_file)
+            for file in files:
+                if file in compared_files or self.line_sets[new_file][1].isdisjoint(self.line_sets[file][1]):
+                    continue
+                pair = tuple(sorted([new_file, file]))
+                # private in Pylint, it only runs with SUPPORTED_PYLINT_VERSION
+                commonalities = self.similar._find_common(self.line_sets[pair[0]][0], self.line_sets[pair[1]][0])
+                similarities = [[commonality.cmn_lines_nb,
+                        commonality.fst_file_start, commonality.fst_file_end,
+                        commonality.snd_file_start, commonality.snd_file_end,
+                        commonality.fst_lset.real_lines[commonality.fst_file_start:commonality.fst_file_end],
+                        commonality.snd_lset.real_lines[commonality.snd_file_start:commonality.snd_file_end]]
+                        for commonality in commonalities]
+                if similarities:
+                    self.pair_similarities[pair] = similarities
+        return sorted([pair[0][0], pair[1][0], similarities] for pair, similarities in self.pair_similarities.items())
+
+    def close(self):
+        if self.pylint_worker is not None:
+            self.pylint_worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def get_working_tree_blobs(repo_dir):
+    '''
+    Return the blob ids of the Python files and Pylint configuration files in repo_dir, as they are now:
+    from the index for unmodified files, hashed for the modified and untracked ones (but not the ignored ones).
+    '''
+    pathspecs = ["*.py"] + list(CONFIG_FILES)
+    staged_result = subprocess.run(["git", "ls-files", "-z", "-s", "--"] + pathspecs, cwd=repo_dir,
+            stdout=subprocess.PIPE, universal_newlines=True)
+    blobs = {}
+    for line in staged_result.stdout.split("\0")[:-1]:
+        info, path = line.split("\t", 1)
+        blobs[path] = info.split()[1]
+
+    modified_result = subprocess.run(["git", "ls-files", "-z", "-m", "-o", "--exclude-standard", "--"] + pathspecs,
+            cwd=repo_dir, stdout=subprocess.PIPE, universal_newlines=True)
+    modified_paths = []
+    for path in modified_result.stdout.split("\0")[:-1]:
+        blobs.pop(path, None)
+        if exists(join(repo_dir, path)):
+            modified_paths.append(path)
+    if modified_paths:
+        hash_result = subprocess.run(["git", "hash-object", "--stdin-paths"], cwd=repo_dir,
+                input="\n".join(modified_paths) + "\n", stdout=subprocess.PIPE, universal_newlines=True)
+        blobs.update(zip(modified_paths, hash_result.stdout.split()))
+    return blobs
+
+
+def get_checker_version():
+    return f"{version('pylint')}, astroid {version('astroid')}, python {sys.version_info[0]}.{sys.version_info[1]}"
+
+
+def get_config_hash(files, options, blobs):
+    '''
+    Return a digest of what the messages of every file depend on, besides the file and its imports:
+    the files to check, the options, the configuration files, and which directories are packages.
+    '''
+    config = [list(files), list(options), sorted((path, blobs[path]) for path in CONFIG_FILES if path in blobs),
+            sorted(path for path in blobs if path == "__init__.py" or path.endswith("/__init__.py"))]
+    return hashlib.sha1(json.dumps(config).encode()).hexdigest()
+
+
+def get_digest(content):
+    return hashlib.sha1(json.dumps(content).encode()).hexdigest()
+
+
+def get_dependency_digests(paths, imported_paths, blobs):
+    '''
+    Return a dict: path -> digest of the paths and blob ids of all files reachable through imported_paths.
+    Files importing each other (a strongly connected component) share one digest,
+    the components are found with Tarjan's algorithm, which finishes a component after all it imports.
+    '''
+    digests = {}
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    for root in paths:
+        if root in index:
+            continue
+        work = [(root, iter(imported_paths[root]))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            path, imported = work[-1]
+            next_path = next(imported, None)
+            if next_path is not None:
+                if next_path not in index:
+                    index[next_path] = lowlink[next_path] = len(index)
+                    stack.append(next_path)
+                    on_stack.add(next_path)
+                    work.append((next_path, iter(imported_paths[next_path])))
+                elif next_path in on_stack:
+                    lowlink[path] = min(lowlink[path], index[next_path])
+                continue
+            work.pop()
+            if work:
+                lowlink[work[-1][0]] = min(lowlink[work[-1][0]], lowlink[path])
+            if lowlink[path] == index[path]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == path:
+                        break
+                component_set = set(component)
+                content = [sorted((member, blobs[member]) for member in component),
+                        sorted({digests[imported_path] for member in component
+                                for imported_path in imported_paths[member] if imported_path not in component_set})]
+                digest = hashlib.sha1(json.dumps(content).encode()).hexdigest()
+                for member in component:
+                    digests[member] = digest
+    return digests
+
+
+def get_imports(file):
+    '''
+    Return the imports in the file, a list of (level, module, names),
+    eg,. "from ..a import b, c" -> (2, "a", ["b", "c"]), "import a.b" -> (0, "a.b", []).
+    '''
+    try:
+        with open(file, "rb") as f:
+            tree = ast.parse(f.read())
+    except (SyntaxError, ValueError):
+        return []
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend((0, alias.name, []) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append((node.level, node.module, [alias.name for alias in node.names if alias.name != "*"]))
+    return imports
+
+
+def get_import_structure(tree):
+    '''
+    Return the imports in the tree with the statements they are in, what Pylint's import graph may depend on,
+    eg,. an import in "if TYPE_CHECKING:" or in a function does not count for cyclic-import.
+    A list of [import, [statement, ...]], the import as dumped by ast, if statements by their test,
+    other statements (and parts of them, eg,. except clauses) by their type.
+    '''
+    imports = []
+    work = [(tree, [])]
+    while work:
+        node, statements = work.pop()
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.Import, ast.ImportFrom)):
+                imports.append([ast.dump(child), statements])
+            elif not isinstance(child, ast.expr): # expressions have no statements in them
+                statement = ast.dump(child.test) if isinstance(child, (ast.If, ast.While)) else type(child).__name__
+                work.append((child, statements + [statement]))
+    imports.sort()
+    return imports
+
+
+def get_similarity_options(repo_dir, options):
+    '''
+    Return the options of Pylint's duplicate-code check, from the command line options and the configuration files,
+    as the arguments of Similar: min_lines, ignore_comments, ignore_docstrings, ignore_imports, ignore_signatures.
+    '''
+    result = subprocess.run(["pylint"] + options + ["--generate-toml-config"], cwd=repo_dir,
+            stdout=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"pylint --generate-toml-config failed in {repo_dir}")
+    values = {}
+    in_section = False
+    for line in result.stdout.splitlines():
+        if line.startswith("["):
+            in_section = line.strip() == "[tool.pylint.similarities]"
+        elif in_section and "=" in line and not line.startswith("#"):
+            name, value = line.split("=", 1)
+            values[name.strip()] = value.strip()
+    return (int(values["min-similarity-lines"]),) + tuple(values[name] == "true"
+            for name in ["ignore-comments", "ignore-docstrings", "ignore-imports", "ignore-signatures"])
+
+
+def get_line_set(repo_dir, path, namespace):
+    '''
+    Return the LineSet of the file, its lines as Pylint's duplicate-code check reads and strips them,
+    and the hashes of its chunks of min_similarity_lines lines.
+    '''
+    with open(join(repo_dir, path), "rb") as f:
+        source = f.read()
+    encoding = tokenize.detect_encoding(BytesIO(source).readline)[0]
+    try:
+        lines = codecs.getreader(encoding)(BytesIO(source)).readlines()
+    except UnicodeDecodeError:
+        lines = []
+    line_set = LineSet(path, lines, namespace.ignore_comments, namespace.ignore_docstrings, namespace.ignore_imports,
+            namespace.ignore_signatures)
+    return line_set, {hash(chunk) for chunk in hash_lineset(line_set, namespace.min_similarity_lines)[0]}
+
+
+def get_module_names(path):
+    '''
+    Return the names the file may be imported by, eg,. "src/pkg/a.py" -> "src.pkg.a", "pkg.a", "a",
+    as the directory Python searches the modules in is not known.
+    '''
+    parts = path[:-len(".py")].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return {".".join(parts[i:]) for i in range(len(parts))}
+
+
+def is_checked(path, files):
+    for file in files:
+        file = os.path.normpath(file)
+        if file == "." or path == file or path.startswith(file + "/"):
+            return True
+    return False
+
+
+def get_package_root(path, blobs):
+    '''
+    Return the directory Pylint puts on sys.path for the file: the first directory, from the file's own upwards,
+    that is not a package (has no __init__.py), "" for the repository root or above.
+    '''
+    parts = path.split("/")[:-1]
+    while parts and "/".join(parts + ["__init__.py"]) in blobs:
+        parts.pop()
+    return "/".join(parts)
+
+
+def add_package_root_paths(paths, all_paths, blobs):
+    '''
+    Return the paths, and for every package root of all_paths that none of the paths is in, the first path in it.
+    A run on all files has the package roots of all files on sys.path, so a run on some files must have them too,
+    eg,. for "sub/c.py" to import the sibling package "pkg". The added files are just checked as well.
+    '''
+    roots = {get_package_root(path, blobs) for path in paths}
+    added_paths = []
+    for path in sorted(all_paths):
+        root = get_package_root(path, blobs)
+        if root not in roots:
+            roots.add(root)
+            added_paths.append(path)
+    return sorted(paths + added_paths)
+
+
+def get_ignore_pattern(paths):
+    '''
+    Return a value for Pylint's --ignore-paths that ignores all but the paths and their parent directories,
+    None if a path has a character the pattern cannot take, "" if there are no paths.
+    Pylint turns "/" and "\\" in the pattern into path separators, and matches either form,
+    so the pattern has neither: separators are matched by ".", other characters escaped as [c].
+    This may let a few more paths through, eg,. "src_a.py" for "src/a.py", they are just checked as well.
+    '''
+    if not paths:
+        return ""
+    allowed = {"[.]"}
+    for path in paths:
+        if any(c in path for c in "\\],^"):
+            return None
+        parts = path.split("/")
+        for i in range(1, len(parts) + 1):
+            allowed.add("".join(c if c.isalnum() or c in "_-" else "." if c == "/" else f"[{c}]"
+                    for c in "/".join(parts[:i])))
+    # subpaths of packages come with "./" before them
+    return f"(?!(?:[.].)?(?:{'|'.join(sorted(allowed))})$)"
+
+
+def get_cross_file_options(options, cross_file_symbols):
+    '''
+    Return the options of the pass that only runs the given cross file checks,
+    keep suppressed-message if enabled, for the suppressions of cross file messages.
+    '''
+    enabled = [code for option in options if option.startswith("--enable=")
+            for code in option[len("--enable="):].split(",")]
+    symbols = list(cross_file_symbols)
+    if "I0020" in enabled or "suppressed-message" in enabled:
+        symbols.append("suppressed-message")
+    return options + ["--disable=all", f"--enable={','.join(symbols)}"]
+
+
+def get_cross_file_symbol(message):
+    '''
+    Return the cross file check the message is from, or about (suppressed-message), None for other messages.
+    '''
+    _, _, _, symbol, msg = message
+    for cross_file_symbol in CROSS_FILE_SYMBOLS:
+        if symbol == cross_file_symbol or \
+                (symbol == "suppressed-message" and f"Suppressed '{cross_file_symbol}'" in msg):
+            return cross_file_symbol
+    return None
@@ -0,0 +1,122 @@
+'''
+A mypy daemon (dmypy) that stays alive while one checkout of a repository is checked many times,
+eg,. after each removal of suppressions in WarningSuppressionMapper, where only a few lines change between runs.
+The first check analyses everything, later checks only recheck what changed (fine-grained incremental mode).
+
+The daemon serves a single checkout: it is stopped when asked to check another repository or commit,
+and when the MypyDaemon is closed. Its status file is in a temporary directory, not in the repository.
+
+The daemon finds changed files by their size and their modification time in whole seconds,
+so it misses a change that keeps the size within the same second, eg,. removing "# type: ignore[assignment]"
+from one line and then, after restoring the file, from another line. Before each check, such files get
+a modification time one second later than the one the daemon saw.
+'''
+
+import os
+from os.path import abspath, exists, join
+import shutil
+import subprocess
+import tempfile
+
+
+PATHSPECS = ["*.py", "*.pyi"]
+
+
+class MypyDaemon():
+    '''
+    Use it as a context manager, or call close, to stop the daemon.
+    '''
+
+    def __init__(self, timeout=3600):
+        # the daemon stops by itself after timeout seconds without a request, eg,. if this process is killed
+        self.timeout = timeout
+        self.checkout = None # (repo_dir, commit_id) the running daemon serves
+        self.status_dir = None
+        self.index_blobs = {} # path -> blob id in the index, ie,. in the commit
+        self.file_states = {} # path -> (modification time in seconds, size, blob id) at the last check
+
+    def get_command_line(self, repo_dir, commit_id, options, files=("./",)):
+        '''
+        Return the command line to run in repo_dir, instead of "mypy <options> <files>", options and files are lists.
+        The output is the same as Mypy's, the first check may also print "Daemon started".
+        Call it when commit_id is checked out, right before running the command.
+        '''
+        checkout = (abspath(repo_dir), commit_id)
+        if self.checkout != checkout:
+            self.stop()
+            self.status_dir = tempfile.mkdtemp()
+            self.checkout = checkout
+            self.read_file_states()
+        else:
+            self.update_file_states()
+        return " ".join(["dmypy", "--status-file", self.get_status_file(), "run", "--timeout", str(self.timeout), "--"]
+                        + list(options) + list(files))
+
+    def get_status_file(self):
+        return join(self.status_dir, "dmypy.json")
+
+    def read_file_states(self):
+        repo_dir = self.checkout[0]
+        result = subprocess.run(["git", "ls-files", "-z", "-s", "--"] + PATHSPECS, cwd=repo_dir,
+                stdout=subprocess.PIPE, universal_newlines=True)
+        self.index_blobs = {}
+        for line in result.stdout.split("\0")[:-1]:
+            info, path = line.split("\t", 1)
+            self.index_blobs[path] = info.split()[1]
+        modified_blobs = self.get_modified_blobs(self.get_modified_paths())
+        self.file_states = {}
+        for path, blob in self.index_blobs.items():
+            file = join(repo_dir, path)
+            if exists(file):
+                stat = os.stat(file)
+                self.file_states[path] = (int(stat.st_mtime), stat.st_size, modified_blobs.get(path, blob))
+
+    def update_file_states(self):
+        '''
+        Find the files changed since the last check: modified now, or modified at the last check.
+        Make sure the daemon sees the change, and remember the new states.
+        '''
+        changed_paths = set(self.get_modified_paths())
+        changed_paths.update(path for path, (_, _, blob) in self.file_states.items() if blob != self.index_blobs.get(path))
+        changed_paths = [path for path in changed_paths if path in self.file_states and exists(join(self.checkout[0], path))]
+        for path, blob in self.get_modified_blobs(changed_paths).items():
+            file = join(self.checkout[0], path)
+            stat = os.stat(file)
+            mtime, size, old_blob = self.file_states[path]
+            if blob != old_blob and int(stat.st_mtime) == mtime and stat.st_size == size:
+                os.utime(file, (mtime + 1, mtime + 1))
+                stat = os.stat(file)
+            self.file_states[path] = (int(stat.st_mtime), stat.st_size, blob)
+
+    def get_modified_paths(self):
+        result = subprocess.run(["git", "ls-files", "-z", "-m", "--"] + PATHSPECS, cwd=self.checkout[0],
+                stdout=subprocess.PIPE, universal_newlines=True)
+        return [path for path in result.stdout.split("\0")[:-1] if exists(join(self.checkout[0], path))]
+
+    def get_modified_blobs(self, paths):
+        if not paths:
+            return {}
+        result = subprocess.run(["git", "hash-object", "--stdin-paths"], cwd=self.checkout[0],
+                input="\n".join(paths) + "\n", stdout=subprocess.PIPE, universal_newlines=True)
+        return dict(zip(paths, result.stdout.split()))
+
+    def stop(self):
+        if self.checkout is None:
+            return
+        if exists(self.get_status_file()):
+            subprocess.run(["dmypy", "--status-file", self.get_status_file(), "stop"], cwd=self.checkout[0],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(self.status_dir, ignore_errors=True)
+        self.checkout = None
+        self.status_dir = None
+        self.index_blobs = {}
+        self.file_states = {}
+
+    def close(self):
+        self.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,90 @@
+'''
+Pylint messages as [path, line, msg_id, symbol, msg] lists, from the JSON output of "pylint --output-format=json"
+or from a PylintWorker, and the warnings and suppression-warning pairs they stand for.
+'''
+
+import json
+import re
+
+from suppression_study.suppression.Suppression import Suppression
+from suppression_study.warnings.Warning import Warning
+
+
+# Pylint exits with the bit mask of the message categories it reported (1 to 31),
+# higher statuses are usage errors (32) or crashes
+PYLINT_MAX_EXIT_STATUS = 31
+
+
+def iter_messages_from_json_output(output_lines):
+    '''
+    Parse the JSON output of Pylint while it is written, yield the messages one by one.
+    The output is one array of flat message objects, eg,.
+        [
+            {
+                "type": "convention",
+                ...
+                "path": "src/a.py",
+                "symbol": "line-too-long",
+                "message": "Line too long (122/100)",
+                "message-id": "C0301"
+            },
+            ...
+        ]
+    '''
+    decoder = json.JSONDecoder()
+    buffer = ""
+    for line in output_lines:
+        buffer += line
+        # an object can only be complete on a line that closes it
+        if line.rstrip().endswith(("}", "},", "]")):
+            buffer = yield from decode_complete_messages(decoder, buffer)
+    buffer = yield from decode_complete_messages(decoder, buffer)
+    if buffer.strip(" \t\n[],"):
+        raise ValueError(f"Unexpected Pylint output: {buffer[:200]}")
+
+
+def decode_complete_messages(decoder, buffer):
+    '''
+    Yield the messages of the complete objects at the start of the buffer, return the rest of the buffer.
+    '''
+    start = 0
+    while True:
+        while start < len(buffer) and buffer[start] in " \t\n[],":
+            start += 1
+        if start == len(buffer):
+            return ""
+        try:
+            message, start = decoder.raw_decode(buffer, start)
+        except json.JSONDecodeError:
+            return buffer[start:] # incomplete, wait for more lines
+        yield [message["path"], message["line"], message["message-id"], message["symbol"], message["message"]]
+
+
+def get_warnings_from_messages(messages):
+    '''
+    Return the warnings of the messages, a list of Warning.
+    Consider all message categories but [I]nformational:
+    [R]efactor, [C]onvention, [W]arning, [E]rror and [F]atal.
+    '''
+    message_types = ("R", "C", "W", "E", "F")
+    return [Warning(path, symbol, line) for path, line, msg_id, symbol, _ in messages
+            if msg_id.startswith(message_types)]
+
+
+def get_suppression_warning_pairs_from_messages(messages):
+    '''
+    Return the [suppression, warning] pairs of the suppressed-message messages (I0020).
+    None if Pylint failed to parse a file.
+    '''
+    suppression_warning_pairs = []
+    for path, line, _, symbol, msg in messages:
+        if "Parsing failed" in msg:
+            return None
+        if symbol == "suppressed-message":
+            m = re.search(r"Suppressed '(.+?)' \(from line (.+?)\)", msg)
+            assert m
+            warning_type = m.group(1)
+            suppression = Suppression(path, f"# pylint: disable={warning_type}", int(m.group(2)))
+            warning = Warning(path, warning_type, line)
+            suppression_warning_pairs.append([suppression, warning])
+    return suppression_warning_pairs
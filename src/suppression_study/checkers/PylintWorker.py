@@ -0,0 +1,148 @@
+'''
+A long-lived Pylint process that lints many checkouts, one request after another.
+Running "pylint" once per commit pays interpreter startup, plugin loading and astroid bootstrap every time,
+the worker pays it once, and keeps the astroid trees of modules outside the checked repository
+(eg,. the standard library) across requests.
+
+The client (PylintWorker) talks to the worker over a pipe, one JSON line per request and per response:
+    request: {"repo_dir": ..., "files": [...], "options": [...]}
+    response: {"messages": [[path, line, msg_id, symbol, msg], ...]} or {"error": ...}
+The messages are in the form PylintMessages reads.
+'''
+
+import json
+import os
+from os.path import abspath, join
+import subprocess
+import sys
+import traceback
+
+
+class PylintWorker():
+    '''
+    Start a worker process on first use, send it (checkout, file list) requests.
+    Use it as a context manager, or call close, to stop the worker.
+    '''
+
+    def __init__(self):
+        self.process = None
+
+    def start(self):
+        self.process = subprocess.Popen([sys.executable, "-m", "suppression_study.checkers.PylintWorker"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
+
+    def check(self, repo_dir, files, options):
+        '''
+        Run Pylint in repo_dir on files (paths relative to repo_dir, eg,. "./") with the command line options,
+        return the messages: a list of [path, line, msg_id, symbol, msg].
+        The files are read as they are in repo_dir, check out the commit to lint before.
+        '''
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        request = {"repo_dir": abspath(repo_dir), "files": files, "options": options}
+        self.process.stdin.write(json.dumps(request) + "\n")
+        self.process.stdin.flush()
+        response_line = self.process.stdout.readline()
+        if not response_line:
+            self.process = None
+            raise RuntimeError(f"Pylint worker stopped while checking {repo_dir}")
+        response = json.loads(response_line)
+        if "error" in response:
+            raise RuntimeError(f"Pylint worker failed on {repo_dir}: {response['error']}")
+        return response["messages"]
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def forget_repo_modules(repo_dir):
+    '''
+    Drop everything astroid cached about modules in repo_dir, their files change between requests.
+    Modules from elsewhere, eg,. the standard library, stay cached.
+    '''
+    # pylint: disable=import-outside-toplevel
+    import astroid
+    from astroid.context import _invalidate_cache
+    from astroid.inference_tip import clear_inference_tip_cache
+
+    repo_prefix = abspath(repo_dir) + os.sep
+    manager = astroid.MANAGER
+    for name, module in list(manager.astroid_cache.items()):
+        if module.file is None:
+            if name not in sys.builtin_module_names:
+                del manager.astroid_cache[name] # eg,. namespace packages, may be directories in repo_dir
+        elif abspath(module.file).startswith(repo_prefix):
+            del manager.astroid_cache[name]
+    manager._mod_file_cache.clear() # module name -> file, files may be added or removed
+    clear_inference_tip_cache()
+    _invalidate_cache()
+
+
+def get_python_path_entries():
+    return [entry for entry in os.environ.get("PYTHONPATH", "").split(os.pathsep) if entry]
+
+
+def get_base_sys_path():
+    '''
+    Return sys.path without the entries the worker got from where it was started:
+    first the working directory ("-m"), then PYTHONPATH. The same directories may come again later,
+    eg,. from an editable install, those stay.
+    '''
+    return sys.path[1 + len(get_python_path_entries()):]
+
+
+def get_pylint_sys_path(repo_dir, base_sys_path):
+    '''
+    Return the sys.path of a "pylint" process started in repo_dir, with the same environment,
+    so that imports resolve to the modules in repo_dir, not to the ones next to the worker.
+    '''
+    return [abspath(join(repo_dir, entry)) for entry in get_python_path_entries()] + base_sys_path
+
+
+def run_pylint(repo_dir, files, options, base_sys_path):
+    # pylint: disable=import-outside-toplevel
+    from pylint.lint import Run
+    from pylint.reporters import CollectingReporter
+
+    current_dir = os.getcwd()
+    current_sys_path = sys.path
+    os.chdir(repo_dir) # paths in messages and rcfile lookup are relative to the working directory
+    sys.path = get_pylint_sys_path(repo_dir, base_sys_path)
+    try:
+        reporter = CollectingReporter() # strips the working directory from paths when created
+        Run(options + files, reporter=reporter, exit=False)
+    finally:
+        os.chdir(current_dir)
+        sys.path = current_sys_path
+        forget_repo_modules(repo_dir)
+    return [[message.path, message.line, message.msg_id, message.symbol, message.msg] for message in reporter.messages]
+
+
+def serve():
+    '''
+    Answer requests from stdin until it is closed.
+    '''
+    responses = sys.stdout
+    sys.stdout = sys.stderr # anything Pylint prints must not mix with the responses
+    base_sys_path = get_base_sys_path()
+    for request_line in sys.stdin:
+        request = json.loads(request_line)
+        try:
+            response = {"messages": run_pylint(request["repo_dir"], request["files"], request["options"], base_sys_path)}
+        except (Exception, SystemExit): # Pylint exits on bad options
+            response = {"error": traceback.format_exc()}
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,153 @@
+'''
+A persistent, content-addressed cache of checker messages per file, in an SQLite database.
+An entry maps (checker, checker version, configuration hash, file key) to the messages about one file,
+eg,. the warnings and suppressed-message messages of Pylint, see IncrementalPylint for the keys.
+Identical file versions are linted once, across commits, experiments and reruns.
+
+The database is kept below a size limit by evicting the least recently used entries.
+Run this module to print statistics about a cache file, or to clear it.
+'''
+
+import argparse
+import json
+import sqlite3
+import time
+
+
+parser = argparse.ArgumentParser(description="Statistics about a warning cache file")
+parser.add_argument("--cache_file", help="SQLite file of the warning cache", required=True)
+parser.add_argument("--clear", action="store_true", help="Remove all entries")
+parser.add_argument("--max_size", type=int, help="Evict the least recently used entries, "
+                    "until the messages take at most this many megabytes")
+
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024 # bytes of messages, 1GB
+
+
+class WarningCache():
+    '''
+    Open (or create) the cache in cache_file. max_size limits the bytes of messages, max_entries the entries.
+    '''
+
+    def __init__(self, cache_file, max_size=DEFAULT_MAX_SIZE, max_entries=None):
+        self.cache_file = cache_file
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(cache_file)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                checker TEXT, checker_version TEXT, config_hash TEXT, file_key TEXT,
+                messages TEXT, size INTEGER, last_used REAL,
+                PRIMARY KEY (checker, checker_version, config_hash, file_key));
+            CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER);
+        ''')
+        self.connection.commit()
+        self.last_time = self.connection.execute("SELECT COALESCE(MAX(last_used), 0) FROM entries").fetchone()[0]
+
+    def get_time(self):
+        # strictly increasing, so that the order of uses is kept even with a coarse clock
+        self.last_time = max(time.time(), self.last_time + 1e-6)
+        return self.last_time
+
+    def get_many(self, checker, checker_version, config_hash, file_keys):
+        '''
+        Return the cached messages of the file_keys, a dict: file_key -> messages, without the missing keys.
+        '''
+        found = {}
+        for file_key in set(file_keys):
+            row = self.connection.execute(
+                "SELECT messages FROM entries WHERE checker=? AND checker_version=? AND config_hash=? AND file_key=?",
+                (checker, checker_version, config_hash, file_key)).fetchone()
+            if row is not None:
+                found[file_key] = json.loads(row[0])
+        now = self.get_time()
+        self.connection.executemany(
+            "UPDATE entries SET last_used=? WHERE checker=? AND checker_version=? AND config_hash=? AND file_key=?",
+            [(now, checker, checker_version, config_hash, file_key) for file_key in found])
+        self.add_to_counter("hits", len(found))
+        self.add_to_counter("misses", len(set(file_keys)) - len(found))
+        self.connection.commit()
+        return found
+
+    def put_many(self, checker, checker_version, config_hash, file_key_to_messages):
+        now = self.get_time()
+        rows = []
+        for file_key, messages in file_key_to_messages.items():
+            messages_json = json.dumps(messages)
+            rows.append((checker, checker_version, config_hash, file_key, messages_json, len(messages_json), now))
+        self.connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self.evict()
+        self.connection.commit()
+
+    def evict(self):
+        '''
+        Remove the least recently used entries, until the cache is within max_size and max_entries.
+        '''
+        entries, size = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if size <= self.max_size and (self.max_entries is None or entries <= self.max_entries):
+            return
+        to_evict = []
+        for rowid, entry_size in self.connection.execute("SELECT rowid, size FROM entries ORDER BY last_used"):
+            if size <= self.max_size and (self.max_entries is None or entries <= self.max_entries):
+                break
+            to_evict.append((rowid,))
+            size -= entry_size
+            entries -= 1
+        self.connection.executemany("DELETE FROM entries WHERE rowid=?", to_evict)
+        self.add_to_counter("evictions", len(to_evict))
+
+    def add_to_counter(self, name, value):
+        self.connection.execute("INSERT OR IGNORE INTO counters VALUES (?, 0)", (name,))
+        self.connection.execute("UPDATE counters SET value=value+? WHERE name=?", (value, name))
+
+    def get_stats(self):
+        '''
+        Return a dict with the number of entries and their size (bytes of messages),
+        the hits, misses and evictions so far, and the entries per checker and checker version.
+        '''
+        entries, size = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        stats = {"entries": entries, "size": size}
+        for name in ["hits", "misses", "evictions"]:
+            row = self.connection.execute("SELECT value FROM counters WHERE name=?", (name,)).fetchone()
+            stats[name] = row[0] if row else 0
+        stats["entries_per_checker"] = {f"{checker} {checker_version}": checker_entries
+                for checker, checker_version, checker_entries in self.connection.execute(
+                    "SELECT checker, checker_version, COUNT(*) FROM entries GROUP BY checker, checker_version")}
+        return stats
+
+    def clear(self):
+        self.connection.execute("DELETE FROM entries")
+        self.connection.execute("DELETE FROM counters")
+        self.connection.commit()
+        self.connection.execute("VACUUM")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main(cache_file, clear=False, max_size=None):
+    with WarningCache(cache_file) as cache:
+        if clear:
+            cache.clear()
+        if max_size is not None:
+            cache.max_size = max_size * 1024 * 1024
+            cache.evict()
+            cache.connection.commit()
+        stats = cache.get_stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = f"{100 * stats['hits'] / lookups:.1f}%" if lookups else "-"
+    print(f"{cache_file}: {stats['entries']} entries, {stats['size'] / (1024 * 1024):.1f} MB of messages")
+    print(f"hits: {stats['hits']}, misses: {stats['misses']}, hit rate: {hit_rate}, evictions: {stats['evictions']}")
+    for checker, checker_entries in sorted(stats["entries_per_checker"].items()):
+        print(f"    {checker}: {checker_entries} entries")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    main(args.cache_file, args.clear, args.max_size)
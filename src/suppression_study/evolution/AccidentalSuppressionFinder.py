@@ -8,6 +8,9 @@ import ast
 import os
 from os.path import join, exists
 from typing import List
+from suppression_study.checkers.IncrementalPylint import IncrementalPylint
+from suppression_study.checkers.PylintWorker import PylintWorker
+from suppression_study.checkers.WarningCache import WarningCache
 from suppression_study.evolution.ExtractHistory import read_histories_from_json
 from suppression_study.utils.FunctionsCommon import get_commit_list
 from suppression_study.warnings.WarningSuppressionMapper import main as compute_warning_suppression_mapping
@@ -30,6 +33,12 @@ parser.add_argument(
     "--results_dir", help="Directory where to put the results", required=True)
 parser.add_argument("--file_name_specific", default=None,
                     help="file specific for mapping, useless and useful suppression files", required=False)
+parser.add_argument("--pylint_worker", action="store_true",
+                    help="Send all Pylint runs to one long-lived Pylint process, instead of a new process per commit")
+parser.add_argument("--incremental_pylint", action="store_true",
+                    help="Run Pylint again only on the files changed since the previous Pylint run")
+parser.add_argument("--warning_cache", help="SQLite file to keep the Pylint messages of every file version in, "
+                    "across runs, implies --incremental_pylint")
 
 
 def find_relevant_range_of_commits(suppression_history, commits):
@@ -92,7 +101,7 @@ def find_relevant_commits(repo_dir: str, history: List[ChangeEvent], commits: Li
     return result # the commits that changes the relevant files.
 
 
-def get_suppression_warning_pairs(repo_dir, commit, relevant_files, results_dir, is_file_specific):
+def get_suppression_warning_pairs(repo_dir, commit, relevant_files, results_dir, is_file_specific, pylint_worker=None):
     # TODO mypy support
     file_specific = None
     if not is_file_specific: # now the is_file_specific is None
@@ -103,12 +112,14 @@ def get_suppression_warning_pairs(repo_dir, commit, relevant_files, results_dir,
         
     if not exists(file):
         compute_warning_suppression_mapping(
-            repo_dir, commit, "pylint", results_dir, relevant_files=relevant_files, file_specific=file_specific)
+            repo_dir, commit, "pylint", results_dir, relevant_files=relevant_files, file_specific=file_specific,
+            pylint_worker=pylint_worker)
     pairs = read_mapping_from_csv(file=file)
     return pairs
 
 
-def check_for_accidental_suppressions(repo_dir, history, relevant_commits, relevant_files, results_dir, is_file_specific):
+def check_for_accidental_suppressions(repo_dir, history, relevant_commits, relevant_files, results_dir, is_file_specific,
+        pylint_worker=None):
     accidentally_suppressed_warnings = []
     previous_commit = None
     warnings_suppressed_at_previous_commit = None
@@ -139,7 +150,7 @@ def check_for_accidental_suppressions(repo_dir, history, relevant_commits, relev
         # if not "<Parsing failed>" in warnings_suppressed_at_previous_commit 
         if commit in commits:
             suppression_warning_pairs = get_suppression_warning_pairs(
-                repo_dir, commit, relevant_files, results_dir, is_file_specific)
+                repo_dir, commit, relevant_files, results_dir, is_file_specific, pylint_worker)
             if suppression_warning_pairs:
                 # find warnings that the suppression suppresses at the current point in time
                 warnings_suppressed_at_commit = []
@@ -179,7 +190,8 @@ def check_for_accidental_suppressions(repo_dir, history, relevant_commits, relev
     return accidentally_suppressed_warnings
 
 
-def main(repo_dir, commits_file, history_file, results_dir, is_file_specific):
+def main(repo_dir, commits_file, history_file, results_dir, is_file_specific, use_pylint_worker=False,
+        use_incremental_pylint=False, warning_cache_file=None):
     # read the list of commit ids
     commits = get_commit_list(commits_file)
 
@@ -187,18 +199,29 @@ def main(repo_dir, commits_file, history_file, results_dir, is_file_specific):
     histories = read_histories_from_json(history_file)
     print(f"Read {len(histories)} suppression histories.")
 
+    pylint_worker = PylintWorker() if use_pylint_worker else None
+    warning_cache = WarningCache(warning_cache_file) if warning_cache_file else None
+    if use_incremental_pylint or warning_cache is not None:
+        pylint_worker = IncrementalPylint(pylint_worker, warning_cache)
     all_accidentally_suppressed_warnings = []
-    # go through all suppression histories
-    for history_idx, history in enumerate(histories):
-        # find the files and commits that are relevant for the suppression
-        relevant_files = find_files_in_history(history)
-        relevant_commits = find_relevant_commits(repo_dir, history, commits)
-        print(f"Found {len(relevant_commits)} relevant commits.")
-
-        accidentally_suppressed_warnings = check_for_accidental_suppressions(
-            repo_dir, history, relevant_commits, relevant_files, results_dir, is_file_specific)
-        all_accidentally_suppressed_warnings.extend(accidentally_suppressed_warnings)
-        print(f"Done with {history_idx + 1}/{len(histories)} histories. Found {len(accidentally_suppressed_warnings)} accidentally suppressed warnings.\n")
+    try:
+        # go through all suppression histories
+        for history_idx, history in enumerate(histories):
+            # find the files and commits that are relevant for the suppression
+            relevant_files = find_files_in_history(history)
+            relevant_commits = find_relevant_commits(repo_dir, history, commits)
+            print(f"Found {len(relevant_commits)} relevant commits.")
+
+            accidentally_suppressed_warnings = check_for_accidental_suppressions(
+                repo_dir, history, relevant_commits, relevant_files, results_dir, is_file_specific, pylint_worker)
+            all_accidentally_suppressed_warnings.extend(accidentally_suppressed_warnings)
+            print(f"Done with {history_idx + 1}/{len(histories)} histories. Found {len(accidentally_suppressed_warnings)} accidentally suppressed warnings.\n")
+    finally:
+        # stop the worker process, also when a check fails
+        if pylint_worker is not None:
+            pylint_worker.close()
+        if warning_cache is not None:
+            warning_cache.close()
 
     # write results to file
     print(f"Write all {len(all_accidentally_suppressed_warnings)} accidental suppressions.")
@@ -209,4 +232,5 @@ def main(repo_dir, commits_file, history_file, results_dir, is_file_specific):
 
 if __name__ == "__main__":
     args = parser.parse_args()
-    main(args.repo_dir, args.commits_file, args.history_file, args.results_dir, args.file_name_specific)
\ No newline at end of file
+    main(args.repo_dir, args.commits_file, args.history_file, args.results_dir, args.file_name_specific, args.pylint_worker,
+         args.incremental_pylint, args.warning_cache)
\ No newline at end of file
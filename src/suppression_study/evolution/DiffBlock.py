@@ -1,3 +1,4 @@
+from bisect import bisect_right
 from suppression_study.evolution.ChangeEvent import ChangeEvent, get_change_event_dict
 from suppression_study.suppression.FormatSuppressionCommon import get_suppression_from_source_code, get_suppressor
 
@@ -105,4 +106,79 @@ class DiffBlock():
             else:
                 self.current_hunk_line_range = []
                 self.next_source_code = []
-                self.current_source_code = []
\ No newline at end of file
+                self.current_source_code = []
+
+
+class FileDiffBlocks():
+    '''
+    The diff of one file, split into hunks once, to get the delete events of all suppressions of the file,
+    the same events as one DiffBlock per suppression, without parsing the diff again for each suppression.
+
+    Like DiffBlock, only the first hunk that changes old lines is compared (see get_delete_event):
+    DiffBlock stops at the end of that hunk, so suppressions in later hunks get no delete event.
+    With all_hunks, each suppression is compared to the hunk that includes its line, meant for zero-context diffs,
+    where that is the hunk that changes the line.
+    '''
+
+    def __init__(self, next_commit, next_date, diff_contents, specific_numeric_maps, all_hunks=False):
+        self.next_commit = next_commit
+        self.next_date = next_date
+        self.specific_numeric_maps = specific_numeric_maps
+        self.all_hunks = all_hunks
+
+        # the hunks that change old lines, ordered by old line: (start, end), and their removed and added code
+        self.hunk_starts = []
+        self.hunk_ranges = []
+        self.hunk_source_code = [] # (current_source_code, next_source_code)
+        source_code = None
+        for diff_line in diff_contents.split("\n"):
+            diff_line = diff_line.strip()
+            if diff_line.startswith("@@"):
+                # eg,. @@ -168,14 +168,13 @@, or @@ -168 +168 @@ for a single line
+                current_lines_tmp = diff_line.split(" ")[1].lstrip("-").split(",")
+                start = int(current_lines_tmp[0])
+                step = int(current_lines_tmp[1]) if len(current_lines_tmp) > 1 else 1
+                if step == 0:
+                    source_code = None # only adds lines, after line start
+                    continue
+                self.hunk_starts.append(start)
+                self.hunk_ranges.append((start, start + step))
+                source_code = ([], [])
+                self.hunk_source_code.append(source_code)
+            elif source_code is not None:
+                if diff_line.startswith("+"):
+                    source_code[1].append(self.get_suppression_text(diff_line.replace("+", "", 1).strip()))
+                if diff_line.startswith("-"):
+                    source_code[0].append(self.get_suppression_text(diff_line.replace("-", "", 1).strip()))
+
+    def get_suppression_text(self, code):
+        # compared to the raw warning type of a suppression as text, see DiffBlock.get_delete_event
+        return str(get_suppression_from_source_code(get_suppressor(code), "#", code, self.specific_numeric_maps))
+
+    def find_hunk(self, line):
+        # the index of the hunk that includes line, or None
+        index = bisect_right(self.hunk_starts, line) - 1
+        if index >= 0 and line < self.hunk_ranges[index][1]:
+            return index
+        return None
+
+    def get_delete_events(self, suppressions, target_raw_warning_types):
+        '''
+        Return the delete event of each suppression (a dict, see get_change_event_dict), or None,
+        target_raw_warning_types: the single warning type of each suppression.
+        '''
+        return [self.get_delete_event(suppression, target_raw_warning_type)
+                for suppression, target_raw_warning_type in zip(suppressions, target_raw_warning_types)]
+
+    def get_delete_event(self, suppression, target_raw_warning_type):
+        hunk_index = self.find_hunk(suppression.line)
+        if hunk_index is None or (hunk_index != 0 and not self.all_hunks):
+            return None # not in the first hunk that changes old lines, like DiffBlock
+        current_source_code, next_source_code = self.hunk_source_code[hunk_index]
+        # the suppression exists in the current commit, but not in the next commit
+        if any(target_raw_warning_type in text for text in current_source_code) and \
+                not any(target_raw_warning_type in text for text in next_source_code):
+            delete_event_object = ChangeEvent(self.next_commit, self.next_date, suppression.path,
+                    suppression.text, suppression.line, "delete")
+            return get_change_event_dict(delete_event_object)
+        return None
@@ -8,9 +8,13 @@ from suppression_study.evolution.ChangeEvent import ChangeEvent
 
 from suppression_study.evolution.GetSuppressionDeleteHistories import GetSuppressionDeleteHistories
 from suppression_study.evolution.GitLogFromFinalStatus import GitLogFromFinalStatus
+from suppression_study.evolution.ReverseBlameDeleteHistories import ReverseBlameDeleteHistories
 from suppression_study.evolution.Select1000Commits import select_1000_commits
+from suppression_study.evolution.SuppressionLineTracker import SuppressionLineTracker
+from suppression_study.suppression.GrepSuppressionPython import iter_commit_suppressions
 from suppression_study.suppression.NumericSpecificTypeMap import get_warning_kind_to_numeric_code
 from suppression_study.suppression.Suppression import read_suppressions_from_file
+from suppression_study.suppression.SuppressionSnapshotStore import SuppressionSnapshotStore
 from suppression_study.utils.FunctionsCommon import get_commit_date_lists
 
 parser = argparse.ArgumentParser(description="Extract change histories of all suppressions at the repository level")
@@ -19,6 +23,20 @@ parser.add_argument(
     "--selected_1000_commits_csv", help="Expected .csv file, which stores selected commit IDs", required=True
 )
 parser.add_argument("--results_dir", help="Directory where to put the results", required=True)
+parser.add_argument("--snapshot_store", help="SQLite snapshot store with the suppressions of the selected commits, "
+                    "used instead of the .csv files in <results_dir>/grep, created if it does not exist")
+parser.add_argument("--streaming", help="Compute the suppressions of the selected commits in-process while extracting, "
+                    "without writing <results_dir>/grep", action="store_true")
+parser.add_argument("--blame", help="Find the add events with one git blame run per file, "
+                    "git log -L only runs for the suppressions blame can't tell", action="store_true")
+parser.add_argument("--delete_events", help="How to find the delete events: diff all commit pairs, "
+                    "and compare the first hunk of a file, with 3 context lines (default), "
+                    "diff all commit pairs, and compare the hunk that changes the line, with no context lines, "
+                    "reverse blame the suppression lines, for the same events as diff_all_hunks, "
+                    "or both of the latter, to report where they differ",
+                    choices=["diff", "diff_all_hunks", "reverse_blame", "verify"], default="diff")
+parser.add_argument("--line_tracking", help="Find the add and delete events of all suppressions at once, "
+                    "by moving their lines through the diffs of the selected commits, oldest to newest", action="store_true")
 
 
 def read_histories_from_json(json_file):
@@ -39,7 +57,7 @@ def read_histories_from_json(json_file):
 
 def sort_by_date(all_histories):
     # sort the histories events by datetime
-    all_histories.sort(key=lambda x: x[list(x.keys())[0]][0]["date"])
+    all_histories.sort(key=get_history_order)
     for idx, x in enumerate(all_histories):
         assert len(x) == 1
         old_suppression_id = list(x.keys())[0]
@@ -48,25 +66,80 @@ def sort_by_date(all_histories):
         x.clear()
         x[new_suppression_id] = val
 
+def get_history_order(history_wrapper):
+    '''
+    Sort by the date of the add event, then by the add event and the whole history,
+    so that histories with the same date get the same order (and "# S<n>" ids)
+    whatever the order of the suppressions they are extracted from, eg,. the rows of a suppression .csv file.
+    '''
+    history = list(history_wrapper.values())[0]
+    add_event = history[0]
+    return (add_event["date"], add_event["file_path"], str(add_event["line_number"]), add_event["warning_type"],
+            json.dumps(history, sort_keys=True))
+
 def write_all_histories_to_json(history_json_file, all_histories):  
     with open(history_json_file, "w", newline="\n") as ds:
         json.dump(all_histories, ds, indent=4, ensure_ascii=False)
 
-def main(repo_dir, selected_1000_commits_csv, results_dir):
+def pass_suppression_sets(commit_suppressions, last_suppressions):
+    '''
+    Yield the suppressions of (commit, suppressions) pairs, oldest to newest,
+    and keep the newest commit that has suppressions in last_suppressions: [commit, suppressions].
+    '''
+    for commit, suppressions in commit_suppressions:
+        if suppressions is not None:
+            last_suppressions[:] = [commit, suppressions]
+        yield suppressions
+
+def get_delete_events(delete_events, *args, **kwargs):
+    '''
+    Return the delete events of GetSuppressionDeleteHistories, or of ReverseBlameDeleteHistories,
+    delete_events: "diff", "diff_all_hunks" (see all_hunks of GetSuppressionDeleteHistories), "reverse_blame",
+    which has the events of "diff_all_hunks", or "verify" to compare both, and use the former.
+    '''
+    if delete_events == "diff":
+        return GetSuppressionDeleteHistories(*args, **kwargs).track_commits_forward()
+    if delete_events == "diff_all_hunks":
+        return GetSuppressionDeleteHistories(*args, all_hunks=True, **kwargs).track_commits_forward()
+    reverse_blame = ReverseBlameDeleteHistories(*args, **kwargs)
+    if delete_events == "reverse_blame":
+        return reverse_blame.track_commits_forward()
+    differences, delete_event_suppression_commit_list = reverse_blame.verify()
+    for missed_by, last_exists_commit, delete_event in differences:
+        print(f"Missed by {missed_by}: {delete_event}, last exists in {last_exists_commit}")
+    print(f"{len(differences)} delete events differ.")
+    return delete_event_suppression_commit_list
+
+def main(repo_dir, selected_1000_commits_csv, results_dir, snapshot_store_file=None, streaming=False, blame=False,
+        delete_events="diff", line_tracking=False):
     # Get commit list and suppression for selected commits.
     if not exists(selected_1000_commits_csv):
         select_1000_commits(repo_dir, selected_1000_commits_csv)
     selected_1000_commits_list, selected_1000_dates_list = get_commit_date_lists(selected_1000_commits_csv)
+    if streaming:
+        extract_histories_streaming(repo_dir, selected_1000_commits_list, selected_1000_dates_list, results_dir, blame,
+                delete_events, line_tracking)
+        return
     # Grep for suppressions in all relevant commits
     suppression_result = join(results_dir, "grep")
-    if not exists(suppression_result):
+    snapshot_store = None
+    if snapshot_store_file:
+        if not exists(snapshot_store_file):
+            subprocess.run(
+                ["python", "-m", "suppression_study.suppression.GrepSuppressionPython",
+                "--repo_dir=" + repo_dir,
+                "--commit_id=" + selected_1000_commits_csv,
+                "--results_dir=" + results_dir,
+                "--snapshot_store=" + snapshot_store_file])
+        snapshot_store = SuppressionSnapshotStore(snapshot_store_file)
+    elif not exists(suppression_result):
         subprocess.run(
             ["python", "-m", "suppression_study.suppression.GrepSuppressionPython",
             "--repo_dir=" + repo_dir,
             "--commit_id=" + selected_1000_commits_csv,
             "--results_dir=" + results_dir])
 
-    if not os.listdir(suppression_result):
+    if snapshot_store is None and not os.listdir(suppression_result):
         os.rmdir(suppression_result)
         print("No suppression found in this repository by running GrepSuppressionPython.")
         return
@@ -74,12 +147,23 @@ def main(repo_dir, selected_1000_commits_csv, results_dir):
     # get never removed suppressions
     never_removed_suppressions = ""
     last_commit_with_suppression = ""
-    for commit in selected_1000_commits_list: # newest to oldest
-        commit_suppression_csv = join(suppression_result, f"{commit}_suppression.csv")
-        if exists(commit_suppression_csv):
-            never_removed_suppressions = read_suppressions_from_file(commit_suppression_csv)
-            last_commit_with_suppression = commit
-            break
+    if snapshot_store is not None:
+        # oldest to newest, keep the suppressions of the newest commit that has suppressions
+        for commit, suppressions in zip(reversed(selected_1000_commits_list),
+                snapshot_store.iter_suppressions_of(list(reversed(selected_1000_commits_list)))):
+            if suppressions is not None:
+                never_removed_suppressions = suppressions
+                last_commit_with_suppression = commit
+        if last_commit_with_suppression == "":
+            print("No suppression found in this repository by running GrepSuppressionPython.")
+            return
+    else:
+        for commit in selected_1000_commits_list: # newest to oldest
+            commit_suppression_csv = join(suppression_result, f"{commit}_suppression.csv")
+            if exists(commit_suppression_csv):
+                never_removed_suppressions = read_suppressions_from_file(commit_suppression_csv)
+                last_commit_with_suppression = commit
+                break
 
     assert never_removed_suppressions != ""
     assert last_commit_with_suppression != ""
@@ -90,20 +174,71 @@ def main(repo_dir, selected_1000_commits_csv, results_dir):
     # change commits and dates lists to from oldest to newest
     selected_1000_commits_list.reverse()
     selected_1000_dates_list.reverse()
-    delete_event_suppression_commit_list = GetSuppressionDeleteHistories(
-        repo_dir, selected_1000_commits_list, selected_1000_dates_list, suppression_result, specific_numeric_maps
-    ).track_commits_forward()
+    if line_tracking:
+        histories = SuppressionLineTracker(repo_dir, selected_1000_commits_list, selected_1000_dates_list,
+                suppression_result, specific_numeric_maps, snapshot_store).track_histories()
+        write_history_lists(histories, results_dir)
+        return
+    delete_event_suppression_commit_list = get_delete_events(delete_events,
+        repo_dir, selected_1000_commits_list, selected_1000_dates_list, suppression_result, specific_numeric_maps,
+        snapshot_store
+    )
+
+    write_histories(repo_dir, never_removed_suppressions, last_commit_with_suppression,
+            delete_event_suppression_commit_list, specific_numeric_maps, results_dir, blame)
+
+def extract_histories_streaming(repo_dir, selected_1000_commits_list, selected_1000_dates_list, results_dir, blame=False,
+        delete_events="diff", line_tracking=False):
+    '''
+    Like main, but the suppressions of the selected commits are computed in-process, 
+    in a single pass that feeds GetSuppressionDeleteHistories, no suppression file is written or read.
+    '''
+    specific_numeric_maps = get_warning_kind_to_numeric_code()
+    last_suppressions = []
+    suppression_sets = pass_suppression_sets(
+        iter_commit_suppressions(repo_dir, selected_1000_commits_list), last_suppressions)
+
+    # change commits and dates lists to from oldest to newest
+    selected_1000_commits_list.reverse()
+    selected_1000_dates_list.reverse()
+    if line_tracking:
+        histories = SuppressionLineTracker(repo_dir, selected_1000_commits_list, selected_1000_dates_list, None,
+                specific_numeric_maps, suppression_sets=suppression_sets).track_histories()
+    else:
+        delete_event_suppression_commit_list = get_delete_events(delete_events,
+            repo_dir, selected_1000_commits_list, selected_1000_dates_list, None, specific_numeric_maps,
+            suppression_sets=suppression_sets
+        )
+    for _ in suppression_sets: # the newest commit is not compared to a later one
+        pass
+
+    if not last_suppressions:
+        print("No suppression found in this repository by running GrepSuppressionPython.")
+        return
+    if line_tracking:
+        os.makedirs(results_dir, exist_ok=True)
+        write_history_lists(histories, results_dir)
+        return
+    last_commit_with_suppression, never_removed_suppressions = last_suppressions
+    os.makedirs(results_dir, exist_ok=True)
+    write_histories(repo_dir, never_removed_suppressions, last_commit_with_suppression,
+            delete_event_suppression_commit_list, specific_numeric_maps, results_dir, blame)
 
+def write_histories(repo_dir, never_removed_suppressions, last_commit_with_suppression,
+        delete_event_suppression_commit_list, specific_numeric_maps, results_dir, blame=False):
     # get add events (for both delete and never removed suppressions)
     # finally get the histories: 1) add event 2) add delete events
     evolution_init = GitLogFromFinalStatus(repo_dir, never_removed_suppressions, 
-            delete_event_suppression_commit_list, specific_numeric_maps)
+            delete_event_suppression_commit_list, specific_numeric_maps, blame)
     only_add_event_histories = evolution_init.git_log_never_removed_suppression(last_commit_with_suppression)
     add_delete_histories = evolution_init.git_log_deleted_suppression()
+    write_history_lists(only_add_event_histories + add_delete_histories, results_dir)
 
+def write_history_lists(histories, results_dir):
+    # histories: [add event, remaining or delete event] of each suppression
     all_histories = []
     history_index = 0
-    for suppression_history in (only_add_event_histories + add_delete_histories):
+    for suppression_history in histories:
         all_histories.append({f"# S{history_index}" : suppression_history})
         history_index+=1
 
@@ -118,7 +253,8 @@ if __name__ == "__main__":
     args = parser.parse_args()
     print("Running...")
     start_time = datetime.datetime.now()
-    main(args.repo_dir, args.selected_1000_commits_csv, args.results_dir)
+    main(args.repo_dir, args.selected_1000_commits_csv, args.results_dir, args.snapshot_store, args.streaming, args.blame, args.delete_events,
+            args.line_tracking)
     end_time = datetime.datetime.now()
     executing_time = (end_time - start_time).seconds
     print(f"Executing time: {executing_time} seconds")
@@ -1,13 +1,21 @@
+import codecs
 import os
 import subprocess
+import tempfile
 from suppression_study.evolution.ChangeEvent import ChangeEvent, get_change_event_dict
-from suppression_study.evolution.DiffBlock import DiffBlock
+from suppression_study.evolution.DiffBlock import FileDiffBlocks
+from suppression_study.suppression.GrepSuppressionSuper import parse_diff_git_path
 from os.path import join
 
 from suppression_study.suppression.Suppression import (
     get_raw_warning_type_from_formatted_suppression_text, read_suppressions_from_file)
 
 
+# Matches every line that get_suppressor (FormatSuppressionCommon) accepts, as a POSIX extended expression.
+# Commits whose diffs add or remove no such line cannot delete a suppression.
+SUPPRESSION_LINE_PATTERN = "pylint:.*disable|disable.*pylint:"
+
+
 class DeleteEventAndSuppression:
     def __init__(self, delete_event, suppression, last_exists_commit):
         self.delete_event = delete_event
@@ -20,14 +28,148 @@ class GetSuppressionDeleteHistories:
     By receiving a repository and a commit list,
     1) return a history list that includes all never removed suppressions
     2) return a history list that includes all deleted suppressions and their delete events
+
+    By default, the diffs have 3 context lines, and a suppression is only compared to the first hunk of its file
+    that changes old lines (see FileDiffBlocks), even if its own line is a context line, or in a later hunk.
+    With all_hunks, the diffs have no context lines, and a suppression is compared to the hunk that changes its line.
     '''
 
-    def __init__(self, repo_dir, selected_1000_commits_list, selected_1000_dates_list, grep_folder, specific_numeric_maps):
+    def __init__(self, repo_dir, selected_1000_commits_list, selected_1000_dates_list, grep_folder, specific_numeric_maps,
+            snapshot_store=None, pickaxe_prefilter=True, suppression_sets=None, all_hunks=False):
         self.repo_dir = repo_dir
         self.selected_1000_commits_list = selected_1000_commits_list
         self.selected_1000_dates_list = selected_1000_dates_list
         self.grep_folder = grep_folder
         self.specific_numeric_maps = specific_numeric_maps
+        # optional, a SuppressionSnapshotStore to read the suppressions from, instead of the .csv files in grep_folder
+        self.snapshot_store = snapshot_store
+        # optional, an iterator over the suppressions of selected_1000_commits_list (oldest to newest),
+        # eg,. from GrepSuppressionPython.iter_commit_suppressions, read instead of any file
+        self.suppression_sets = suppression_sets
+        # only diff the commits that add or remove suppression lines, see get_commits_changing_suppressions
+        self.pickaxe_prefilter = pickaxe_prefilter
+        self.all_hunks = all_hunks
+
+    def iter_suppression_sets(self):
+        '''
+        Yield the suppressions of every commit in selected_1000_commits_list (oldest to newest),
+        a list of Suppression, or None if the commit has no suppression file.
+        '''
+        if self.suppression_sets is not None:
+            # not "yield from", closing this generator must not close suppression_sets, the caller may read on
+            for suppression_set in self.suppression_sets:
+                yield suppression_set
+        elif self.snapshot_store is None:
+            for commit in self.selected_1000_commits_list:
+                suppression_csv = join(self.grep_folder, f"{commit}_suppression.csv")
+                yield read_suppressions_from_file(suppression_csv) if os.path.exists(suppression_csv) else None
+        else:
+            yield from self.snapshot_store.iter_suppressions_of(self.selected_1000_commits_list)
+
+    def get_commits_changing_suppressions(self):
+        '''
+        Return the indices of the commits in selected_1000_commits_list whose changes,
+        compared to the previous commit in the list, add or remove a suppression line.
+        All commits are found in a single "git log -G" pass (pickaxe) over the first parent history.
+        Return None if the commit list does not follow the first parents, then every commit needs to be checked.
+        '''
+        commit_range = f"{self.selected_1000_commits_list[0]}..{self.selected_1000_commits_list[-1]}"
+        first_parent_command = ["git", "log", "--first-parent", "--reverse", "--format=%H", commit_range]
+        first_parent_result = subprocess.run(first_parent_command, cwd=self.repo_dir,
+            stdout=subprocess.PIPE, universal_newlines=True)
+        # -m: also check the diffs of merge commits, to their first parent
+        pickaxe_command = ["git", "log", "--first-parent", "-m", "--no-renames", "--format=%H",
+            "-G", SUPPRESSION_LINE_PATTERN, commit_range, "--", "*.py"]
+        pickaxe_result = subprocess.run(pickaxe_command, cwd=self.repo_dir,
+            stdout=subprocess.PIPE, universal_newlines=True)
+        pickaxe_commits = set(pickaxe_result.stdout.split())
+
+        # a sampled commit list can skip commits, check the skipped ones as well
+        changing_commit_indices = set()
+        next_index = 1
+        changes_suppressions = False
+        for commit in first_parent_result.stdout.split():
+            if next_index == len(self.selected_1000_commits_list):
+                break
+            if commit in pickaxe_commits:
+                changes_suppressions = True
+            if commit.startswith(self.selected_1000_commits_list[next_index]):
+                if changes_suppressions:
+                    changing_commit_indices.add(next_index)
+                changes_suppressions = False
+                next_index += 1
+
+        if next_index < len(self.selected_1000_commits_list):
+            return None
+        return changing_commit_indices
+
+    def iter_commit_pair_diffs(self, commit_pairs, unified=None):
+        '''
+        Yield (deleted files, {file path -> diff}) for each (current commit, next commit) in commit_pairs, in order.
+        All pairs are diffed by a single "git diff-tree --stdin" run, with rename detection, read as a stream.
+        deleted files: the paths of the files deleted in next commit, one per line,
+        as "git diff --name-only --diff-filter=D" prints them.
+        diff: the diff of a file, under its path in current commit, as "git diff <current> <next> -- <path>" prints it,
+        or, for a renamed Python file, as "git diff <current>:<path> <next>:<new path>" (same hunks).
+        unified: optional, the number of context lines, as for "git diff --unified=<n>".
+        '''
+        if not commit_pairs:
+            return
+        commits = list(dict.fromkeys(commit for commit_pair in commit_pairs for commit in commit_pair))
+        rev_parse_result = subprocess.run(["git", "rev-parse"] + commits, cwd=self.repo_dir,
+            stdout=subprocess.PIPE, universal_newlines=True)
+        commit_to_hash = dict(zip(commits, rev_parse_result.stdout.split()))
+
+        # diff-tree prints the full hash of the next commit before the diff of each pair, with --always also for no diff
+        pair_headers = [commit_to_hash[next_commit] for _, next_commit in commit_pairs]
+        with tempfile.TemporaryFile() as pairs_file:
+            pairs_file.write("".join(f"{commit_to_hash[next_commit]} {commit_to_hash[current_commit]}\n"
+                for current_commit, next_commit in commit_pairs).encode())
+            pairs_file.seek(0)
+            diff_tree_command = ["git", "-c", "core.quotePath=false", "diff-tree", "--stdin", "--always", "-r", "-M",
+                "--raw", "-p", "--no-color", "--no-ext-diff"]
+            if unified is not None:
+                diff_tree_command.append(f"--unified={unified}")
+            process = subprocess.Popen(diff_tree_command, cwd=self.repo_dir, stdin=pairs_file, stdout=subprocess.PIPE)
+
+        pair_index = 0
+        deleted_files = []
+        rename_headers = {} # "a/<old path> b/<new path>" of a "diff --git" line -> old path
+        path_to_diff_lines = {}
+        diff_lines = None
+        for line in process.stdout:
+            text = line.decode(errors="replace").rstrip("\n")
+            if pair_index < len(pair_headers) and text == pair_headers[pair_index]:
+                if pair_index > 0:
+                    yield get_commit_pair_diff(deleted_files, path_to_diff_lines)
+                pair_index += 1
+                deleted_files = []
+                rename_headers = {}
+                path_to_diff_lines = {}
+                diff_lines = None
+            elif text.startswith("diff --git "):
+                paths = text[len("diff --git "):]
+                path = rename_headers.get(paths)
+                if path is None: # not renamed, both paths are the same
+                    path = parse_diff_git_path(paths)
+                diff_lines = path_to_diff_lines.setdefault(path, [])
+                diff_lines.append(line)
+            elif diff_lines is not None:
+                diff_lines.append(line)
+            elif text.startswith(":"):
+                # raw output, before the diffs, eg,. ":100644 100644 <blob> <blob> R094\tsrc/a.py\tsrc/b/a.py"
+                status, *paths = text.split("\t")
+                status = status.split(" ")[-1]
+                paths = [unquote_git_path(path) for path in paths]
+                if status == "D":
+                    deleted_files.append(paths[0])
+                elif status.startswith("R") and paths[0].endswith(".py"):
+                    rename_headers[f"{quote_git_path('a/' + paths[0])} {quote_git_path('b/' + paths[1])}"] = paths[0]
+        if pair_index > 0:
+            yield get_commit_pair_diff(deleted_files, path_to_diff_lines)
+        process.stdout.close()
+        if process.wait() != 0 or pair_index < len(pair_headers):
+            raise RuntimeError(f"git diff-tree failed in {self.repo_dir}")
 
     def track_commits_forward(self):
         '''
@@ -37,70 +179,83 @@ class GetSuppressionDeleteHistories:
         delete_event_suppression_commit_list = []
 
         max_commits_num = len(self.selected_1000_commits_list) - 1
+        changing_commit_indices = None
+        if self.pickaxe_prefilter and max_commits_num > 0:
+            changing_commit_indices = self.get_commits_changing_suppressions()
+        suppression_sets = self.iter_suppression_sets()
+        commit_pairs = [(self.selected_1000_commits_list[i], self.selected_1000_commits_list[i + 1])
+                for i in range(0, max_commits_num) if changing_commit_indices is None or i + 1 in changing_commit_indices]
+        commit_pair_diffs = self.iter_commit_pair_diffs(commit_pairs, unified=0 if self.all_hunks else None)
         for i in range(0, max_commits_num):  # Start from  oldest
             current_commit = self.selected_1000_commits_list[i]
             next_commit = self.selected_1000_commits_list[i + 1]
             next_date = self.selected_1000_dates_list[i + 1]
 
-            # get file delete cases
-            get_deleted_files_command = f"git diff --name-only --diff-filter=D {current_commit} {next_commit}"
-            deleted_result = subprocess.run(get_deleted_files_command, cwd=self.repo_dir, shell=True,
-                stdout=subprocess.PIPE, universal_newlines=True)
-            deleted_files = deleted_result.stdout
-
-            # get file renamed cases
-            get_renamed_files_command = f"git diff --name-status --diff-filter=R {current_commit} {next_commit}"
-            renamed_result = subprocess.run(get_renamed_files_command, cwd=self.repo_dir, shell=True,
-                stdout=subprocess.PIPE, universal_newlines=True)
-            renamed_files = renamed_result.stdout
-            file_paths_in_current_commit = []
-            file_paths_in_next_commit = []
-
-            if renamed_files:
-                rename_cases = renamed_files.strip().split("\n")
-                for rename in rename_cases:
-                    # R094    src/traverse.py src/common/traverse.py
-                    tmp = rename.split("\t")
-                    if tmp[1].endswith(".py"):
-                        file_paths_in_current_commit.append(tmp[1])
-                        file_paths_in_next_commit.append(tmp[2])
+            suppression_set = next(suppression_sets)
+            if changing_commit_indices is not None and i + 1 not in changing_commit_indices:
+                continue # no suppression line changed, the suppressions carry over unchanged
+            if suppression_set is None:
+                next(commit_pair_diffs) # diffed anyway, skip it
+                continue
+
+            deleted_files, path_to_diff = next(commit_pair_diffs)
+
+            # the suppressions of each file are compared to the diff of the file at once
+            path_to_suppressions = {}
+            for suppression in suppression_set:
+                if suppression.path not in deleted_files:
+                    path_to_suppressions.setdefault(suppression.path, []).append(suppression)
+            path_to_delete_events = {}
+            for path, suppressions in path_to_suppressions.items():
+                # a renamed file has its diff under its path in current_commit
+                file_diff_blocks = FileDiffBlocks(next_commit, next_date, path_to_diff.get(path, ""), self.specific_numeric_maps,
+                        self.all_hunks)
+                raw_warning_types = [get_raw_warning_type_from_formatted_suppression_text(s.text) for s in suppressions]
+                path_to_delete_events[path] = iter(file_diff_blocks.get_delete_events(suppressions, raw_warning_types))
 
             last_exists_commit = ""
-            current_suppression_csv = join(self.grep_folder, f"{current_commit}_suppression.csv")
-            if os.path.exists(current_suppression_csv):
-                suppression_set = read_suppressions_from_file(current_suppression_csv)
-                previous_file = ""
-                diff_result = ""
-                for suppression in suppression_set:
-                    current_file = suppression.path
-                    file_delete_mark = current_file in deleted_files
-                    if file_delete_mark == True:
-                        delete_event_object = ChangeEvent(
-                                next_commit, next_date, current_file, suppression.text, suppression.line, "file delete")
-                        delete_event_ready_to_json = get_change_event_dict(delete_event_object)
-                        last_exists_commit = current_commit
-                    else:
-                        raw_warning_type = get_raw_warning_type_from_formatted_suppression_text(suppression.text)
-                        # no file rename
-                        if current_file != previous_file: # for the same file, run git diff only once
-                            commit_diff_command = f"git diff {current_commit} {next_commit} -- {current_file}"
-                            # file rename
-                            if current_file in file_paths_in_current_commit:
-                                current_file_index = file_paths_in_current_commit.index(current_file)
-                                file_path_in_next_commit = file_paths_in_next_commit[current_file_index]
-                                commit_diff_command = f"git diff {current_commit}:{current_file} {next_commit}:{file_path_in_next_commit}"
-                            diff_result = subprocess.run(commit_diff_command, cwd=self.repo_dir, shell=True,
-                                stdout=subprocess.PIPE, universal_newlines=True)
-                        diff_contents = diff_result.stdout
-                        delete_event_ready_to_json = DiffBlock(
-                            next_commit, next_date, diff_contents, suppression, raw_warning_type, self.specific_numeric_maps
-                        ).from_diff_block_to_delete_event()
-                        last_exists_commit = current_commit
-
-                    if delete_event_ready_to_json:
-                        delete_event_and_suppression = DeleteEventAndSuppression(
-                            delete_event_ready_to_json, suppression, last_exists_commit
-                        )
-                        delete_event_suppression_commit_list.append(delete_event_and_suppression)
-                    previous_file = current_file
+            for suppression in suppression_set:
+                current_file = suppression.path
+                file_delete_mark = current_file in deleted_files
+                if file_delete_mark == True:
+                    delete_event_object = ChangeEvent(
+                            next_commit, next_date, current_file, suppression.text, suppression.line, "file delete")
+                    delete_event_ready_to_json = get_change_event_dict(delete_event_object)
+                    last_exists_commit = current_commit
+                else:
+                    delete_event_ready_to_json = next(path_to_delete_events[current_file]) # in the order of suppression_set
+                    last_exists_commit = current_commit
+
+                if delete_event_ready_to_json:
+                    delete_event_and_suppression = DeleteEventAndSuppression(
+                        delete_event_ready_to_json, suppression, last_exists_commit
+                    )
+                    delete_event_suppression_commit_list.append(delete_event_and_suppression)
         return delete_event_suppression_commit_list
+
+
+def get_commit_pair_diff(deleted_files, path_to_diff_lines):
+    # as text, with the line endings of "universal_newlines", like the output of a single "git diff"
+    path_to_diff = {}
+    for path, diff_lines in path_to_diff_lines.items():
+        diff = b"".join(diff_lines).decode(errors="replace")
+        path_to_diff[path] = diff.replace("\r\n", "\n").replace("\r", "\n")
+    return "".join(f"{path}\n" for path in deleted_files), path_to_diff
+
+
+def unquote_git_path(path):
+    if path.startswith("\"") and path.endswith("\""):
+        return codecs.escape_decode(path[1:-1].encode())[0].decode(errors="replace")
+    return path
+
+
+def quote_git_path(path):
+    '''
+    Quote a path like git does with core.quotePath=false: only if it has a control character, a quote or a backslash.
+    '''
+    if not any(c in "\"\\" or ord(c) < 0x20 or ord(c) == 0x7f for c in path):
+        return path
+    escapes = {"\a": "\\a", "\b": "\\b", "\t": "\\t", "\n": "\\n", "\v": "\\v", "\f": "\\f", "\r": "\\r",
+        "\"": "\\\"", "\\": "\\\\"}
+    quoted = "".join(escapes.get(c, f"\\{ord(c):03o}" if ord(c) < 0x20 or ord(c) == 0x7f else c) for c in path)
+    return f"\"{quoted}\""
@@ -0,0 +1,204 @@
+import datetime
+import subprocess
+
+from suppression_study.evolution.CommitBlock import CommitBlock
+from suppression_study.evolution.GetSuppressionDeleteHistories import unquote_git_path
+from suppression_study.suppression.FormatSuppressionCommon import get_suppressor
+from suppression_study.suppression.GrepSuppressionSuper import iter_git_output_lines, read_hunk
+from suppression_study.suppression.Suppression import get_raw_warning_type_from_formatted_suppression_text
+
+
+class GitBlameAddEvents():
+    '''
+    Find the add events of the suppressions of a commit with one "git blame" run per file,
+    instead of one "git log -L" run per suppression line (see GitLogFromFinalStatus.run_git_log).
+
+    "git log -L<line>,<line>:<file> --first-parent" lists the commits that changed the line, newest first,
+    and the add event is the newest commit whose change adds the warning type of the suppression to the line.
+    The newest commit that changed the line is the one "git blame --first-parent" reports for the line.
+    If its change adds the warning type, that is the add event, made from the same commit block as for git log -L.
+    Otherwise, the add event is older, and the suppression gets None, to be found with git log -L.
+    The same for lines that blame attributes to a merge commit, or to a file that was copied,
+    which git log -L follows to the original file.
+    '''
+
+    def __init__(self, repo_dir, specific_numeric_maps):
+        self.repo_dir = repo_dir
+        self.specific_numeric_maps = specific_numeric_maps
+
+    def get_add_events(self, commit, suppressions):
+        '''
+        Return the add event of each suppression in commit (a dict, see get_change_event_dict),
+        or None if git log -L is needed to find it.
+        '''
+        path_to_lines = {}
+        for suppression in suppressions:
+            path_to_lines.setdefault(suppression.path, set()).add(suppression.line)
+        path_to_blame = {path: self.blame(commit, path, lines) for path, lines in path_to_lines.items()}
+
+        blamed_commits = {blame_line["commit"] for blame in path_to_blame.values() for blame_line in blame.values()}
+        commit_infos = self.get_commit_infos(blamed_commits)
+        commit_to_paths = {}
+        for blame in path_to_blame.values():
+            for blame_line in blame.values():
+                if blame_line.get("previous"):
+                    commit_to_paths.setdefault(blame_line["commit"], set()).add(blame_line["previous"][1])
+                commit_to_paths.setdefault(blame_line["commit"], set()).add(blame_line["filename"])
+        commit_to_file_hunks = self.get_hunks(commit_to_paths, commit_infos)
+
+        add_events = []
+        for suppression in suppressions:
+            blame_line = path_to_blame[suppression.path].get(suppression.line)
+            commit_block = None
+            if blame_line is not None:
+                commit_block = self.get_commit_block(
+                        blame_line, commit_infos, commit_to_file_hunks.get(blame_line["commit"], {}))
+            add_event = None
+            if commit_block is not None:
+                add_event = CommitBlock(commit_block, get_suppressor(suppression.text),
+                        get_raw_warning_type_from_formatted_suppression_text(suppression.text), suppression.path,
+                        self.specific_numeric_maps).from_single_commit_block_to_add_event()
+            add_events.append(add_event)
+        return add_events
+
+    def blame(self, commit, path, lines):
+        '''
+        Return the blame of the lines of path in commit, a dict: line -> dict with
+        "commit", "original line" (in that commit), "author-time", "author-tz", "filename" (in that commit),
+        "previous" ((parent commit, file path in it), None if the commit adds the file) and "code".
+        Empty if blame fails, eg,. for a file git doesn't track.
+        '''
+        blame_command = ["git", "-c", "core.quotePath=false", "blame", "--line-porcelain", "--first-parent"]
+        for line in sorted(lines):
+            blame_command.append(f"-L{line},{line}")
+        blame_command += [commit, "--", path]
+        result = subprocess.run(blame_command, cwd=self.repo_dir, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        if result.returncode != 0:
+            return {}
+
+        line_to_blame = {}
+        blame_line = None
+        for line in iter_git_output_lines(result.stdout.splitlines(keepends=True)):
+            if blame_line is None:
+                # <commit> <original line> <final line> [<number of lines>]
+                header = line.split(" ")
+                blame_line = {"commit": header[0], "original line": int(header[1]), "previous": None}
+                line_to_blame[int(header[2])] = blame_line
+            elif line.startswith("\t"):
+                blame_line["code"] = line[1:]
+                blame_line = None
+            else:
+                key, _, value = line.partition(" ")
+                if key in ("author-time", "author-tz"):
+                    blame_line[key] = value
+                elif key == "filename":
+                    blame_line[key] = unquote_git_path(value)
+                elif key == "previous":
+                    previous_commit, previous_path = value.split(" ", 1)
+                    blame_line[key] = (previous_commit, unquote_git_path(previous_path))
+        return line_to_blame
+
+    def get_commit_infos(self, commits):
+        '''
+        Return a dict: commit -> (number of parents, {file path -> change status}),
+        with rename and copy detection, like git log -C -M.
+        '''
+        if not commits:
+            return {}
+        log_command = ["git", "-c", "core.quotePath=false", "log", "--no-walk=unsorted", "--format=%x00%H %P",
+                "--raw", "-C", "-M"] + sorted(commits)
+        result = subprocess.run(log_command, cwd=self.repo_dir, stdout=subprocess.PIPE)
+        commit_infos = {}
+        path_to_status = None
+        for line in iter_git_output_lines(result.stdout.splitlines(keepends=True)):
+            if line.startswith("\0"):
+                commit, *parents = line[1:].split(" ")
+                path_to_status = {}
+                commit_infos[commit] = (len(parents), path_to_status)
+            elif line.startswith(":") and path_to_status is not None:
+                # eg,. ":100644 100644 <blob> <blob> R094\tsrc/a.py\tsrc/b/a.py"
+                status, *paths = line.split("\t")
+                path_to_status[unquote_git_path(paths[-1])] = status.split(" ")[-1][0]
+        return commit_infos
+
+    def get_hunks(self, commit_to_paths, commit_infos):
+        '''
+        Return a dict: commit -> {file path -> hunks of the zero-context diff of the file in the commit},
+        for commits that are not merges, a hunk is (old_start, old_count, new_start, new_count, removed lines).
+        '''
+        commits = sorted(commit for commit in commit_to_paths if commit_infos.get(commit, (0, {}))[0] == 1)
+        if not commits:
+            return {}
+        paths = sorted({path for commit in commits for path in commit_to_paths[commit]})
+        log_command = ["git", "-c", "core.quotePath=false", "log", "--no-walk=unsorted", "--format=%x00%H",
+                "-p", "--unified=0", "-M", "--no-color", "--no-ext-diff"] + commits + ["--"] + paths
+        process = subprocess.Popen(log_command, cwd=self.repo_dir, stdout=subprocess.PIPE)
+        lines = iter_git_output_lines(process.stdout)
+
+        commit_to_file_hunks = {}
+        file_to_hunks = None
+        hunks = None
+        for line in lines:
+            if line.startswith("\0"):
+                file_to_hunks = commit_to_file_hunks.setdefault(line[1:], {})
+                hunks = None
+            elif line.startswith("diff --git "):
+                hunks = None
+            elif line.startswith("+++ ") and file_to_hunks is not None:
+                # "+++ b/<path>", quoted as "b/<path>" if needed
+                path = unquote_git_path(line[len("+++ "):])
+                hunks = file_to_hunks.setdefault(path[2:], []) if path != "/dev/null" else None
+            elif line.startswith("@@ ") and hunks is not None:
+                old_start, old_count, new_start, new_count, removed_lines, _ = read_hunk(line, lines)
+                hunks.append((old_start, old_count, new_start, new_count, removed_lines))
+        process.stdout.close()
+        process.wait()
+        return commit_to_file_hunks
+
+    def get_commit_block(self, blame_line, commit_infos, file_to_hunks):
+        '''
+        Return the lines of a "git log -L" commit block for the blamed line (see AnalyzeGitlogReport),
+        with the change of the commit to the line, or None if git log -L is needed.
+        '''
+        commit = blame_line["commit"]
+        parents_num, path_to_status = commit_infos.get(commit, (0, {}))
+        status = path_to_status.get(blame_line["filename"])
+        previous = blame_line["previous"]
+        if parents_num > 1 or status is None or status == "C":
+            return None # a merge commit, or a copied file, git log -L may follow its original
+        if (status == "A") != (previous is None):
+            return None # blame and the diff don't agree whether the commit adds the file
+
+        line = blame_line["original line"]
+        line_hunk = None
+        for hunk in file_to_hunks.get(blame_line["filename"], []):
+            old_start, old_count, new_start, new_count, removed_lines = hunk
+            if new_start <= line < new_start + new_count:
+                line_hunk = hunk
+                break
+        if line_hunk is None:
+            return None
+        old_start, old_count, new_start, new_count, removed_lines = line_hunk
+
+        commit_block = [f"commit {commit}", f"Date:   {format_git_date(blame_line['author-time'], blame_line['author-tz'])}"]
+        commit_block.append("--- /dev/null" if previous is None else f"--- a/{previous[1]}")
+        commit_block.append(f"+++ b/{blame_line['filename']}")
+        commit_block.append(f"@@ -{old_start},{old_count} +{line},1 @@")
+        commit_block += [f"-{code}" for code in removed_lines]
+        commit_block.append(f"+{blame_line['code']}")
+        # like AnalyzeGitlogReport
+        return [line.strip() for line in commit_block if line.strip()]
+
+
+def format_git_date(timestamp, timezone):
+    '''
+    Format a date like git log does by default, eg,. "Tue Jul 4 10:50:41 2023 +0200",
+    timestamp: seconds since the epoch, timezone: eg,. "+0200".
+    '''
+    offset = int(timezone[1:3]) * 60 + int(timezone[3:5])
+    if timezone.startswith("-"):
+        offset = -offset
+    date = datetime.datetime.fromtimestamp(int(timestamp), datetime.timezone(datetime.timedelta(minutes=offset)))
+    weekday = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][date.weekday()]
+    month = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"][date.month - 1]
+    return f"{weekday} {month} {date.day} {date:%H:%M:%S} {date.year} {timezone}"
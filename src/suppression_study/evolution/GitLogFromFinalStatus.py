@@ -2,18 +2,25 @@ import subprocess
 
 from suppression_study.evolution.AnalyzeGitlogReport import AnalyzeGitlogReport
 from suppression_study.evolution.ChangeEvent import ChangeEvent, get_change_event_dict
+from suppression_study.evolution.GitBlameAddEvents import GitBlameAddEvents
 from suppression_study.suppression.FormatSuppressionCommon import get_suppressor
 from suppression_study.suppression.Suppression import get_raw_warning_type_from_formatted_suppression_text
 from git.repo import Repo
 
 
 class GitLogFromFinalStatus():
+    '''
+    With blame, the add events are found with one git blame run per file (see GitBlameAddEvents),
+    and git log -L only runs for the suppressions blame can't tell.
+    '''
 
-    def __init__(self, repo_dir, never_removed_suppressions, delete_event_suppression_commit_list, specific_numeric_maps):
+    def __init__(self, repo_dir, never_removed_suppressions, delete_event_suppression_commit_list, specific_numeric_maps,
+            blame=False):
         self.repo_dir = repo_dir
         self.never_removed_suppressions = never_removed_suppressions
         self.delete_event_suppression_commit_list = delete_event_suppression_commit_list
         self.specific_numeric_maps = specific_numeric_maps
+        self.blame = blame
 
         self.only_add_event_histories = []
         self.add_delete_histories = []
@@ -52,6 +59,12 @@ class GitLogFromFinalStatus():
 
         return expected_add_event, log_result
     
+    def get_blame_add_events(self, commit, suppressions):
+        # the add events found with git blame, None for the suppressions to run git log for
+        if self.blame:
+            return GitBlameAddEvents(self.repo_dir, self.specific_numeric_maps).get_add_events(commit, suppressions)
+        return [None] * len(suppressions)
+
     def git_log_never_removed_suppression(self, last_commit_with_suppression):
         ''' 
         all the suppression here are only with 1 warning type
@@ -63,16 +76,21 @@ class GitLogFromFinalStatus():
             true, run git log command to get results
         '''
         self.repo_base.git.checkout(last_commit_with_suppression, force=True)
+        blame_add_events = self.get_blame_add_events(last_commit_with_suppression, self.never_removed_suppressions)
 
         previous_file_and_line = ""
         log_result = ""
-        for suppression in self.never_removed_suppressions:
+        for suppression, blame_add_event in zip(self.never_removed_suppressions, blame_add_events):
             run_command_mark = False
             file_and_line = f"{suppression.path} {suppression.line}"
             if file_and_line != previous_file_and_line:
                 run_command_mark = True
             # expected_add_event is a dict, and ready to write to history json file.
-            expected_add_event, log_result = self.run_git_log(suppression, log_result, run_command_mark)
+            if blame_add_event is not None:
+                expected_add_event = blame_add_event
+            else:
+                expected_add_event, log_result = self.run_git_log(suppression, log_result, run_command_mark)
+                previous_file_and_line = file_and_line
             # all the suppression level events in histories is a list
             # 1) [add event, remaining event]
             # 2) [add event, delete event]
@@ -80,7 +98,6 @@ class GitLogFromFinalStatus():
             remaining_event = ChangeEvent(last_commit_with_suppression, None, suppression.path, suppression.text, suppression.line, "remaining")
             remaining_event_json_str = get_change_event_dict(remaining_event)
             self.only_add_event_histories.append([expected_add_event, remaining_event_json_str])
-            previous_file_and_line = file_and_line
 
         return self.only_add_event_histories
 
@@ -88,9 +105,18 @@ class GitLogFromFinalStatus():
         previous_file_and_line = ""
         previous_checkout_commit = ""
         log_result = ""
+        commit_to_suppressions = {}
+        for delete_info in self.delete_event_suppression_commit_list:
+            commit_to_suppressions.setdefault(delete_info.last_exists_commit, []).append(delete_info.suppression)
+        commit_to_blame_add_events = {}
         for delete_info in self.delete_event_suppression_commit_list:
             if delete_info.last_exists_commit != previous_checkout_commit:
                 self.repo_base.git.checkout(delete_info.last_exists_commit, force=True)
+                if delete_info.last_exists_commit not in commit_to_blame_add_events:
+                    commit_to_blame_add_events[delete_info.last_exists_commit] = iter(self.get_blame_add_events(
+                            delete_info.last_exists_commit, commit_to_suppressions[delete_info.last_exists_commit]))
+                if self.blame:
+                    previous_file_and_line = "" # the log result is for another commit
 
             delete_suppression = delete_info.suppression
             run_command_mark = False
@@ -98,10 +124,12 @@ class GitLogFromFinalStatus():
             if file_and_line != previous_file_and_line:
                 run_command_mark = True
 
-            expected_add_event, log_result = self.run_git_log(delete_suppression, log_result, run_command_mark)
+            expected_add_event = next(commit_to_blame_add_events[delete_info.last_exists_commit])
+            if expected_add_event is None:
+                expected_add_event, log_result = self.run_git_log(delete_suppression, log_result, run_command_mark)
+                previous_file_and_line = file_and_line
             delete_event = delete_info.delete_event
             self.add_delete_histories.append([expected_add_event, delete_event])
-            previous_file_and_line = file_and_line
             previous_checkout_commit = delete_info.last_exists_commit
 
         return self.add_delete_histories
\ No newline at end of file
@@ -0,0 +1,202 @@
+from collections import Counter
+import json
+import subprocess
+from suppression_study.evolution.ChangeEvent import ChangeEvent, get_change_event_dict
+from suppression_study.evolution.DiffBlock import FileDiffBlocks
+from suppression_study.evolution.GetSuppressionDeleteHistories import (DeleteEventAndSuppression,
+    GetSuppressionDeleteHistories, unquote_git_path)
+from suppression_study.suppression.GrepSuppressionSuper import iter_git_output_lines
+from suppression_study.suppression.Suppression import Suppression, get_raw_warning_type_from_formatted_suppression_text
+
+
+class ReverseBlameDeleteHistories(GetSuppressionDeleteHistories):
+    '''
+    Find the delete events of GetSuppressionDeleteHistories.track_commits_forward
+    without diffing every commit pair: a reverse blame ("git blame --reverse --first-parent") of the suppression lines
+    of a file, from a commit of the window to its newest commit, tells the last commit in which each line survived.
+    Only the pairs after those commits are diffed, to tell whether the line was deleted, or only changed.
+    The diffs have no context lines, and the hunk that changes the line is compared, not only the first hunk
+    of the file, so the events are the ones of GetSuppressionDeleteHistories with all_hunks, see verify.
+
+    The suppression lines of the window's first commit are blamed per file, and again, from a later commit,
+    the lines of a file whose suppressions changed, eg,. added, or changed lines, which start a new line history.
+    A line blamed several times is identified by the commit, file and line where it last survived.
+
+    The selected commits need to be consecutive first parent commits, like Select1000Commits selects them,
+    otherwise GetSuppressionDeleteHistories.track_commits_forward is used, with all_hunks.
+    '''
+
+    def __init__(self, repo_dir, selected_1000_commits_list, selected_1000_dates_list, grep_folder, specific_numeric_maps,
+            snapshot_store=None, pickaxe_prefilter=True, suppression_sets=None):
+        super().__init__(repo_dir, selected_1000_commits_list, selected_1000_dates_list, grep_folder,
+                specific_numeric_maps, snapshot_store, pickaxe_prefilter, suppression_sets, all_hunks=True)
+
+    def track_commits_forward(self):
+        commit_to_index = self.get_commit_indices()
+        if commit_to_index is None:
+            print("The selected commits are not consecutive first parent commits, diffing all commit pairs.")
+            return super().track_commits_forward()
+
+        # per commit, {file path -> suppressions}, a file's unchanged suppressions are shared with the previous commit
+        commit_file_suppressions = []
+        jobs = set() # (commit index, file path) to blame
+        previous_file_suppressions = {}
+        for commit_index, suppression_set in enumerate(self.iter_suppression_sets()):
+            file_suppressions = {}
+            for suppression in suppression_set or []:
+                file_suppressions.setdefault(suppression.path, []).append(suppression)
+            for path, suppressions in file_suppressions.items():
+                previous_suppressions = previous_file_suppressions.get(path, [])
+                if previous_suppressions == suppressions:
+                    file_suppressions[path] = previous_suppressions
+                elif sorted(s.text for s in previous_suppressions) != sorted(s.text for s in suppressions):
+                    # added suppressions, or changed suppression lines, which also end a blamed line
+                    jobs.add((commit_index, path))
+            commit_file_suppressions.append(file_suppressions)
+            previous_file_suppressions = file_suppressions
+
+        # (last commit index, file path, line, suppression text, occurrence) -> the suppression, in the last commit it survived in
+        ended_suppressions = {}
+        pairs_to_check = {} # last commit index -> ended suppressions, with their path in the next commit
+        done_jobs = set()
+        delete_event_suppressions = []
+        while jobs:
+            for commit_index, path in sorted(jobs - done_jobs):
+                done_jobs.add((commit_index, path))
+                suppressions = commit_file_suppressions[commit_index].get(path, [])
+                if not suppressions or commit_index == len(self.selected_1000_commits_list) - 1:
+                    continue # nothing to blame, or all suppressions survive the window
+                line_to_blame = self.reverse_blame(commit_index, path, {s.line for s in suppressions})
+                occurrences = {} # a line can have the same suppression twice, eg,. "disable=W0612,unused-variable"
+                for suppression in suppressions:
+                    last_commit, last_path, last_line, next_path = line_to_blame[suppression.line]
+                    last_index = commit_to_index[last_commit]
+                    if last_index == len(self.selected_1000_commits_list) - 1:
+                        continue # survives the window
+                    occurrence = occurrences.get((suppression.line, suppression.text), 0)
+                    occurrences[(suppression.line, suppression.text)] = occurrence + 1
+                    key = (last_index, last_path, last_line, suppression.text, occurrence)
+                    if key not in ended_suppressions:
+                        ended_suppressions[key] = Suppression(last_path, suppression.text, last_line)
+                        pairs_to_check.setdefault(last_index, []).append((ended_suppressions[key], next_path))
+            jobs = set()
+
+            # diff the pairs after the last commits, a changed suppression line, deleted or not, starts a new blame
+            pair_indices = sorted(pairs_to_check)
+            commit_pairs = [(self.selected_1000_commits_list[i], self.selected_1000_commits_list[i + 1])
+                    for i in pair_indices]
+            for last_index, (deleted_files, path_to_diff) in zip(pair_indices,
+                    self.iter_commit_pair_diffs(commit_pairs, unified=0)):
+                next_commit = self.selected_1000_commits_list[last_index + 1]
+                next_date = self.selected_1000_dates_list[last_index + 1]
+                deleted_files = set(deleted_files.splitlines())
+                path_to_diff_blocks = {}
+                for suppression, next_path in pairs_to_check[last_index]:
+                    if suppression.path in deleted_files:
+                        delete_event_object = ChangeEvent(next_commit, next_date, suppression.path,
+                                suppression.text, suppression.line, "file delete")
+                        delete_event_suppressions.append((last_index, suppression, get_change_event_dict(delete_event_object)))
+                        continue
+                    jobs.add((last_index + 1, next_path))
+                    if suppression.path not in path_to_diff_blocks:
+                        path_to_diff_blocks[suppression.path] = FileDiffBlocks(next_commit, next_date,
+                                path_to_diff.get(suppression.path, ""), self.specific_numeric_maps, all_hunks=True)
+                    delete_event = path_to_diff_blocks[suppression.path].get_delete_event(suppression,
+                            get_raw_warning_type_from_formatted_suppression_text(suppression.text))
+                    if delete_event:
+                        delete_event_suppressions.append((last_index, suppression, delete_event))
+            pairs_to_check = {}
+
+        # in the order of track_commits_forward: by commit, then as in the commit's suppressions
+        commit_positions = {}
+        delete_event_suppressions.sort(key=lambda delete_event_suppression: get_commit_order(
+                delete_event_suppression, commit_file_suppressions, commit_positions))
+        return [DeleteEventAndSuppression(delete_event, suppression, self.selected_1000_commits_list[last_index])
+                for last_index, suppression, delete_event in delete_event_suppressions]
+
+    def get_commit_indices(self):
+        '''
+        Return a dict: full commit hash -> index in selected_1000_commits_list,
+        or None if the list is not a run of consecutive first parent commits.
+        '''
+        commits = self.selected_1000_commits_list
+        rev_parse_result = subprocess.run(["git", "rev-parse"] + commits, cwd=self.repo_dir,
+            stdout=subprocess.PIPE, universal_newlines=True)
+        full_commits = rev_parse_result.stdout.split()
+        if len(commits) > 1:
+            first_parent_command = ["git", "rev-list", "--first-parent", "--reverse", f"{commits[0]}..{commits[-1]}"]
+            first_parent_result = subprocess.run(first_parent_command, cwd=self.repo_dir,
+                stdout=subprocess.PIPE, universal_newlines=True)
+            if first_parent_result.stdout.split() != full_commits[1:]:
+                return None
+        return {commit: index for index, commit in enumerate(full_commits)}
+
+    def reverse_blame(self, commit_index, path, lines):
+        '''
+        Return a dict: line of path in the commit -> (last commit that has the line unchanged, file path in it,
+        line in it, file path in the next commit), up to the newest commit of the window.
+        '''
+        commit_range = f"{self.selected_1000_commits_list[commit_index]}..{self.selected_1000_commits_list[-1]}"
+        blame_command = ["git", "-c", "core.quotePath=false", "blame", "--reverse", "--first-parent", "--line-porcelain"]
+        for line in sorted(lines):
+            blame_command.append(f"-L{line},{line}")
+        blame_command += [commit_range, "--", path]
+        result = subprocess.run(blame_command, cwd=self.repo_dir, stdout=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"git blame --reverse failed for {path} in {self.repo_dir}")
+
+        line_to_blame = {}
+        header = None
+        for line in iter_git_output_lines(result.stdout.splitlines(keepends=True)):
+            if header is None:
+                # <last commit> <line in last commit> <line in commit> [<number of lines>]
+                header = line.split(" ")
+                last_path = next_path = None
+            elif line.startswith("\t"):
+                # no "previous" if the next commit deletes the file
+                line_to_blame[int(header[2])] = (header[0], last_path, int(header[1]), next_path or last_path)
+                header = None
+            elif line.startswith("filename "):
+                last_path = unquote_git_path(line[len("filename "):])
+            elif line.startswith("previous "):
+                next_path = unquote_git_path(line[len("previous "):].split(" ", 1)[1])
+        return line_to_blame
+
+    def verify(self):
+        '''
+        Compare the delete events to the ones of GetSuppressionDeleteHistories.track_commits_forward with all_hunks,
+        which diffs all commit pairs, return the differences, as (engine that misses the event, last commit, delete event), and the forward events.
+        '''
+        if self.suppression_sets is not None: # both engines read the suppressions
+            self.suppression_sets = list(self.suppression_sets)
+        forward = GetSuppressionDeleteHistories(self.repo_dir, self.selected_1000_commits_list,
+            self.selected_1000_dates_list, self.grep_folder, self.specific_numeric_maps, self.snapshot_store,
+            self.pickaxe_prefilter, self.suppression_sets, all_hunks=True).track_commits_forward()
+        reverse_blame = self.track_commits_forward()
+        forward_keys = get_delete_event_keys(forward)
+        reverse_blame_keys = get_delete_event_keys(reverse_blame)
+        differences = [("reverse blame", key[0], json.loads(key[1])) for key in forward_keys - reverse_blame_keys]
+        differences += [("forward", key[0], json.loads(key[1])) for key in reverse_blame_keys - forward_keys]
+        return differences, forward
+
+
+def get_delete_event_keys(delete_event_suppression_commit_list):
+    # a multiset of (last commit, delete event as JSON), to compare the events of two engines
+    return Counter((d.last_exists_commit, json.dumps(d.delete_event, sort_keys=True))
+            for d in delete_event_suppression_commit_list)
+
+
+def get_commit_order(delete_event_suppression, commit_file_suppressions, commit_positions):
+    '''
+    Return the sort key of a (last commit index, suppression, delete event): the commit index,
+    then the position of the suppression in the commit's suppressions,
+    commit_positions: commit index -> {suppression -> position}, filled as needed.
+    '''
+    last_index, suppression, _ = delete_event_suppression
+    if last_index not in commit_positions:
+        commit_positions[last_index] = {}
+        for suppressions in commit_file_suppressions[last_index].values():
+            for s in suppressions:
+                commit_positions[last_index].setdefault(s, len(commit_positions[last_index]))
+    return (last_index, commit_positions[last_index].get(suppression, -1))
+
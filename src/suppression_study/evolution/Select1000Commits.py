@@ -5,26 +5,31 @@ import shutil
 import subprocess
 import tempfile
 
+from suppression_study.suppression.GrepSuppressionPython import GrepSuppressionPython
+from suppression_study.suppression.GrepSuppressionSuper import get_git_grep_keywords
 from suppression_study.utils.FunctionsCommon import get_commit_list, write_commit_info_to_csv
 from suppression_study.utils.GitRepoUtils import repo_dir_to_name
 
 
 def get_commits_first_use_suppression(repo_dir, all_main_commit_id_list_startsfrom_oldest, all_main_commit_num, main_commits_suppression_folder):
     # Return the first commit that firstly introduces suppressions and its index
+    if main_commits_suppression_folder:
+        for commit, commit_index in zip(all_main_commit_id_list_startsfrom_oldest, range(all_main_commit_num)):
+            suppression_csv_file = join(main_commits_suppression_folder, f"{commit}_suppression.csv")
+            if os.path.exists(suppression_csv_file) and os.path.getsize(suppression_csv_file):
+                return commit, commit_index  # first_suppression_commit and its index
+        return
+
     with tempfile.TemporaryDirectory() as tmp_dir:
         grep_suppression_folder = join(tmp_dir, "grep")
-        # Get the first commit that start using suppressions.
-        for commit, commit_index in zip(all_main_commit_id_list_startsfrom_oldest, range(all_main_commit_num)):
-            suppression_csv_file_name = f"{commit}_suppression.csv"
-            if main_commits_suppression_folder:
-                suppression_csv_file = join(main_commits_suppression_folder, suppression_csv_file_name)
-            else:
-                subprocess.run(
-                    ["python", "-m", "suppression_study.suppression.GrepSuppressionPython",
-                    "--repo_dir=" + repo_dir,
-                    "--commit_id=" + commit,
-                    "--results_dir=" + tmp_dir,])
-                suppression_csv_file = join(grep_suppression_folder, suppression_csv_file_name)
+        grep_init = GrepSuppressionPython(repo_dir, None, grep_suppression_folder, scan_mode="git-grep")
+        # Only check the commits that can start using suppressions, from oldest to newest.
+        for commit_index in get_commit_indices_changing_grep_results(repo_dir,
+                all_main_commit_id_list_startsfrom_oldest, grep_init.filter_keywords):
+            commit = all_main_commit_id_list_startsfrom_oldest[commit_index]
+            grep_init.commit_id = commit
+            grep_init.grep_suppression_for_specific_commit()
+            suppression_csv_file = join(grep_suppression_folder, f"{commit}_suppression.csv")
                 
             if os.path.exists(suppression_csv_file) and os.path.getsize(suppression_csv_file):
                 return commit, commit_index  # first_suppression_commit and its index
@@ -34,6 +39,31 @@ def get_commits_first_use_suppression(repo_dir, all_main_commit_id_list_startsfr
                 shutil.rmtree(grep_suppression_folder)
 
 
+def get_commit_indices_changing_grep_results(repo_dir, all_main_commit_id_list_startsfrom_oldest, filter_keywords):
+    '''
+    Return the indices of the oldest commit and of the commits whose diffs add or remove a line that
+    GrepSuppressionPython finds, from oldest to newest. All of them are found with a single "git log -G" run.
+    Whether a commit has suppressions only depends on the found lines and their files,
+    so the first commit with suppressions is one of these commits.
+    '''
+    commit_indices = {commit: commit_index for commit_index, commit in enumerate(all_main_commit_id_list_startsfrom_oldest)}
+    commit_id_lengths = {len(commit) for commit in all_main_commit_id_list_startsfrom_oldest}
+    # -m: also check the diffs of merge commits, to their first parent
+    pickaxe_command = ["git", "log", "--first-parent", "-m", "--no-renames", "--reverse", "--format=%H",
+            "-G", get_git_grep_keywords(filter_keywords), all_main_commit_id_list_startsfrom_oldest[-1], "--", "*.py"]
+    pickaxe_result = subprocess.run(pickaxe_command, cwd=repo_dir, stdout=subprocess.PIPE, universal_newlines=True)
+
+    candidate_indices = [0]
+    for full_commit in pickaxe_result.stdout.split():
+        for commit_id_length in commit_id_lengths:
+            commit_index = commit_indices.get(full_commit[:commit_id_length])
+            if commit_index is not None:
+                if commit_index > 0: # the oldest commit is always checked
+                    candidate_indices.append(commit_index)
+                break
+    return candidate_indices
+
+
 def select_1000_commits(repo_dir, selected_1000_commits_csv, overall_information_csv=None):
     # overall_information_csv is designed to record the start and end of the selected 1000 commits.
     # especially when run this function on all repositories. [Actual usage example: experiment/Get1000Commits.py]
@@ -0,0 +1,245 @@
+from bisect import bisect_right
+from itertools import accumulate
+import subprocess
+from suppression_study.evolution.ChangeEvent import ChangeEvent, get_change_event_dict
+from suppression_study.evolution.CommitBlock import CommitBlock
+from suppression_study.evolution.GetSuppressionDeleteHistories import GetSuppressionDeleteHistories, unquote_git_path
+from suppression_study.evolution.GitLogFromFinalStatus import GitLogFromFinalStatus
+from suppression_study.suppression.FormatSuppressionCommon import get_suppression_from_source_code, get_suppressor
+from suppression_study.suppression.GrepSuppressionSuper import read_hunk
+from suppression_study.suppression.Suppression import get_raw_warning_type_from_formatted_suppression_text
+
+
+class TrackedSuppression:
+    def __init__(self, suppression, add_event):
+        self.first_suppression = suppression
+        self.suppression = suppression # in the current commit
+        self.add_event = add_event # None for the suppressions of the window's first commit
+        self.middle_status_chain = [] # [file path, commit, line] in each later commit, until the delete
+
+
+class SuppressionLineTracker(GetSuppressionDeleteHistories):
+    '''
+    Track the lines of all suppressions through the commit window at once, oldest to newest,
+    to get their add events, delete events and the lines in between (middle_status_chain),
+    instead of diffing each commit pair per file (GetSuppressionDeleteHistories),
+    and running git log -L per suppression (GitLogFromFinalStatus).
+
+    The zero-context diffs of the commit pairs are read once, from a single "git diff-tree --stdin" run,
+    and each suppression line is moved through the hunks of its file, eg,. 3 lines down if lines were added above it.
+    A suppression whose line is changed, and whose warning type is not on an added line of the hunk, is deleted.
+    The pairs that add or remove no suppression line (see get_commits_changing_suppressions) are not diffed:
+    the suppressions of each file keep their order, so they are matched by position.
+    The suppressions of the next commit that no tracked suppression moves to are added in that commit.
+
+    Unlike git log -L, a suppression copied from another file is added with the copy.
+    The add events of the suppressions of the window's first commit are found with GitLogFromFinalStatus.
+    '''
+
+    def __init__(self, repo_dir, selected_1000_commits_list, selected_1000_dates_list, grep_folder, specific_numeric_maps,
+            snapshot_store=None, pickaxe_prefilter=True, suppression_sets=None):
+        super().__init__(repo_dir, selected_1000_commits_list, selected_1000_dates_list, grep_folder,
+                specific_numeric_maps, snapshot_store, pickaxe_prefilter, suppression_sets)
+        self.tracked_suppressions = []
+        self.histories = [] # [add event, delete event or remaining event]
+        self.merge_commits = set()
+
+    def track_histories(self, middle_status_chain=False):
+        '''
+        Return the histories of all suppressions: [add event, delete event], or [add event, remaining event]
+        for the suppressions of the newest commit with suppressions.
+        middle_status_chain: add the file path, commit and line of the suppression in each commit after it was added
+        to its add event, as ExtractHistoryWithChain does. The file path is "" if it is the path in the last event.
+        '''
+        max_commits_num = len(self.selected_1000_commits_list) - 1
+        changing_commit_indices = None
+        if self.pickaxe_prefilter and max_commits_num > 0:
+            changing_commit_indices = self.get_commits_changing_suppressions()
+        commit_pairs = [(self.selected_1000_commits_list[i], self.selected_1000_commits_list[i + 1])
+                for i in range(0, max_commits_num) if changing_commit_indices is None or i + 1 in changing_commit_indices]
+        commit_pair_diffs = self.iter_commit_pair_diffs(commit_pairs, unified=0)
+        self.merge_commits = self.get_merge_commits()
+        suppression_sets = self.iter_suppression_sets()
+
+        first_suppressions = next(suppression_sets) or []
+        self.tracked_suppressions = [TrackedSuppression(suppression, None) for suppression in first_suppressions]
+        last_commit_with_suppression = self.selected_1000_commits_list[0] if first_suppressions else None
+        for i in range(0, max_commits_num): # Start from oldest
+            next_suppressions = next(suppression_sets) or []
+            if next_suppressions:
+                last_commit_with_suppression = self.selected_1000_commits_list[i + 1]
+            if changing_commit_indices is not None and i + 1 not in changing_commit_indices:
+                self.match_by_position(i, next_suppressions)
+            else:
+                deleted_files, path_to_diff = next(commit_pair_diffs)
+                self.move_through_diffs(i, next_suppressions, set(deleted_files.splitlines()), path_to_diff)
+
+        for tracked in self.tracked_suppressions:
+            remaining_event = ChangeEvent(last_commit_with_suppression, None, tracked.suppression.path,
+                    tracked.suppression.text, tracked.suppression.line, "remaining")
+            self.histories.append([tracked, get_change_event_dict(remaining_event)])
+
+        # suppressions of the first commit, added before the window
+        first_commit_histories = [history for history in self.histories if history[0].add_event is None]
+        if first_commit_histories:
+            add_event_histories = GitLogFromFinalStatus(self.repo_dir,
+                    [tracked.first_suppression for tracked, _ in first_commit_histories], [], self.specific_numeric_maps,
+                    blame=True).git_log_never_removed_suppression(self.selected_1000_commits_list[0])
+            for (tracked, _), (add_event, _) in zip(first_commit_histories, add_event_histories):
+                tracked.add_event = add_event
+
+        histories = []
+        for tracked, last_event in self.histories:
+            add_event = dict(tracked.add_event)
+            if add_event["change_operation"] == "merge add":
+                add_event["file_path"] = tracked.suppression.path # like CommitBlock, the path in the last event
+            if middle_status_chain:
+                simplified_middle_line_chain = [["" if path == last_event["file_path"] else path, commit, line]
+                        for path, commit, line in tracked.middle_status_chain]
+                add_event.update({"middle_status_chain": str(simplified_middle_line_chain)})
+            histories.append([add_event, last_event])
+        return histories
+
+    def get_merge_commits(self):
+        # the selected commits that are merge commits, their adds are merge adds, like git log -L reports them
+        if len(self.selected_1000_commits_list) < 2:
+            return set()
+        commit_range = f"{self.selected_1000_commits_list[0]}..{self.selected_1000_commits_list[-1]}"
+        merges_result = subprocess.run(["git", "rev-list", "--merges", "--first-parent", commit_range],
+            cwd=self.repo_dir, stdout=subprocess.PIPE, universal_newlines=True)
+        abbreviation_lengths = {len(commit) for commit in self.selected_1000_commits_list}
+        merge_commit_prefixes = {merge_commit[:length] for merge_commit in merges_result.stdout.split()
+                for length in abbreviation_lengths}
+        return merge_commit_prefixes.intersection(self.selected_1000_commits_list)
+
+    def match_by_position(self, i, next_suppressions):
+        # no suppression line is added or removed, the suppressions of each file are in the same order
+        path_to_next_suppressions = {}
+        for suppression in next_suppressions:
+            path_to_next_suppressions.setdefault(suppression.path, []).append(suppression)
+        path_to_moved_suppressions = {}
+        for tracked in self.tracked_suppressions:
+            path_to_moved_suppressions.setdefault(tracked.suppression.path, []).append((tracked, tracked.suppression.line))
+        moved_suppressions = []
+        for path, suppressions in path_to_moved_suppressions.items():
+            suppressions.sort(key=lambda moved: moved[1]) # stable, same line in the order of the suppression text
+            next_file_suppressions = sorted(path_to_next_suppressions.get(path, []), key=lambda s: s.line)
+            if [tracked.suppression.text for tracked, _ in suppressions] == [s.text for s in next_file_suppressions]:
+                moved_suppressions += [(tracked, s.line) for (tracked, _), s in zip(suppressions, next_file_suppressions)]
+            else: # eg,. missing suppression results, matched by line, if at all
+                moved_suppressions += suppressions
+        self.update_tracked_suppressions(i, next_suppressions, moved_suppressions, {})
+
+    def move_through_diffs(self, i, next_suppressions, deleted_files, path_to_diff):
+        path_to_file_line_map = {}
+        moved_suppressions = [] # (tracked suppression, line in the next commit, None if deleted)
+        file_deleted_suppressions = set()
+        for tracked in self.tracked_suppressions:
+            path = tracked.suppression.path
+            if path in deleted_files:
+                file_deleted_suppressions.add(tracked)
+                moved_suppressions.append((tracked, None))
+                continue
+            if path not in path_to_file_line_map:
+                path_to_file_line_map[path] = FileLineMap(path, path_to_diff.get(path, ""), self.specific_numeric_maps)
+            raw_warning_type = get_raw_warning_type_from_formatted_suppression_text(tracked.suppression.text)
+            moved_suppressions.append((tracked, path_to_file_line_map[path].map_line(tracked.suppression.line, raw_warning_type)))
+
+        # the path of each file in the next commit, for renamed files, and the added files
+        next_paths = {path: file_line_map.next_path for path, file_line_map in path_to_file_line_map.items()}
+        added_files = {path for path, diff in path_to_diff.items() if "\nnew file mode " in diff}
+        self.update_tracked_suppressions(i, next_suppressions, moved_suppressions, next_paths,
+                file_deleted_suppressions, added_files)
+
+    def update_tracked_suppressions(self, i, next_suppressions, moved_suppressions, next_paths,
+            file_deleted_suppressions=(), added_files=()):
+        '''
+        Continue the tracked suppressions that moved to a suppression of the next commit,
+        delete the others, and track the suppressions of the next commit no tracked suppression moved to.
+        '''
+        next_commit = self.selected_1000_commits_list[i + 1]
+        next_date = self.selected_1000_dates_list[i + 1]
+        next_suppression_indices = {}
+        for index, suppression in enumerate(next_suppressions):
+            next_suppression_indices.setdefault((suppression.path, suppression.line, suppression.text), []).append(index)
+
+        matched_indices = set()
+        tracked_suppressions = []
+        for tracked, next_line in moved_suppressions:
+            suppression = tracked.suppression
+            next_path = next_paths.get(suppression.path, suppression.path)
+            indices = next_suppression_indices.get((next_path, next_line, suppression.text)) if next_line else None
+            if indices:
+                index = indices.pop(0)
+                matched_indices.add(index)
+                tracked.suppression = next_suppressions[index]
+                tracked.middle_status_chain.append([next_path, next_commit, next_line])
+                tracked_suppressions.append(tracked)
+            else:
+                change_operation = "file delete" if tracked in file_deleted_suppressions else "delete"
+                delete_event_object = ChangeEvent(next_commit, next_date, suppression.path, suppression.text,
+                        suppression.line, change_operation)
+                tracked.middle_status_chain.append([next_path, next_commit, suppression.line])
+                self.histories.append([tracked, get_change_event_dict(delete_event_object)])
+
+        for index, suppression in enumerate(next_suppressions):
+            if index not in matched_indices:
+                change_operation = "file add" if suppression.path in added_files else "add"
+                line = suppression.line
+                if next_commit in self.merge_commits:
+                    change_operation = "merge add"
+                    line = "merge unknown"
+                suppression_text = CommitBlock([], get_suppressor(suppression.text),
+                        get_raw_warning_type_from_formatted_suppression_text(suppression.text), suppression.path,
+                        self.specific_numeric_maps).get_suppression_text()
+                add_event_object = ChangeEvent(next_commit, next_date, suppression.path, suppression_text,
+                        line, change_operation)
+                tracked_suppressions.append(TrackedSuppression(suppression, get_change_event_dict(add_event_object)))
+        self.tracked_suppressions = tracked_suppressions
+
+
+class FileLineMap:
+    '''
+    The zero-context diff of a file in a commit pair, to map its lines in the current commit to the next commit.
+    '''
+
+    def __init__(self, path, diff_contents, specific_numeric_maps):
+        self.next_path = path
+        self.specific_numeric_maps = specific_numeric_maps
+        self.hunks = [] # (old_start, old_count, new_start, added lines)
+
+        lines = iter(diff_contents.split("\n"))
+        for line in lines:
+            if line.startswith("rename to "):
+                self.next_path = unquote_git_path(line[len("rename to "):])
+            elif line.startswith("@@ "):
+                old_start, old_count, new_start, _, _, added_lines = read_hunk(line, lines)
+                self.hunks.append((old_start, old_count, new_start, added_lines))
+
+        # the old lines from which on each hunk moves the lines, and by how many lines, in total
+        self.hunk_ends = [old_start + max(old_count, 1) for old_start, old_count, _, _ in self.hunks]
+        self.line_deltas = list(accumulate(len(added_lines) - old_count
+                for _, old_count, _, added_lines in self.hunks))
+
+    def map_line(self, line, raw_warning_type):
+        '''
+        Return the line in the next commit, or None if the line is changed, and no added line of the hunk
+        has the warning type.
+        '''
+        hunk_index = bisect_right(self.hunk_ends, line)
+        if hunk_index < len(self.hunks):
+            old_start, old_count, new_start, added_lines = self.hunks[hunk_index]
+            if old_start <= line < old_start + old_count: # the line is changed
+                has_warning_type = [raw_warning_type in self.get_suppression_text(code) for code in added_lines]
+                offset = line - old_start
+                if offset < len(added_lines) and has_warning_type[offset]:
+                    return new_start + offset
+                if any(has_warning_type):
+                    return new_start + has_warning_type.index(True)
+                return None
+        return line + (self.line_deltas[hunk_index - 1] if hunk_index > 0 else 0)
+
+    def get_suppression_text(self, code):
+        # compared to the raw warning type of a suppression as text, see FileDiffBlocks
+        code = code.strip()
+        return str(get_suppression_from_source_code(get_suppressor(code), "#", code, self.specific_numeric_maps))
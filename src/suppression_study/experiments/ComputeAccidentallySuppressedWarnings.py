@@ -10,6 +10,7 @@ from suppression_study.utils.GitRepoUtils import repo_dir_to_name
 class ComputeAccidentallySuppressedWarnings(Experiment):
     """
     Applies the AccidentalSuppressionFinder to the the first 1000 commits of each repository.
+    Every repository has one long-lived Pylint worker for all its Pylint runs.
 
     Depends on:
      * ComputeIntermediateChains
@@ -36,7 +37,7 @@ def run_on_repo(repo_dir):
     assert exists(history_file)
     results_dir = join("data", "results", repo_name, "accidental")
     find_accidentally_suppressed_warnings(
-        repo_dir, commits_file, history_file, results_dir, None)
+        repo_dir, commits_file, history_file, results_dir, None, use_pylint_worker=True)
 
 
 if __name__ == "__main__":
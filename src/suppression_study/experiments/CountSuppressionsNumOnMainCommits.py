@@ -12,9 +12,12 @@ class CountOfSuppressionsNumOnMainCommits(Experiment):
     Experiment that run GrepSuppressionPython on all commits. 
     Get suppressions in given repositories, and get a csv file which 
     show the number of suppressions in every commit.
+    Formatted suppressions are cached by git blob hash, the cache is shared by all repositories and reruns.
     """
 
     def run(self):
+        suppression_cache_file = join("data", "results", "suppression_cache.sqlite")
+
         # prepare repositories
         repo_dirs = self.get_repo_dirs()
         self.checkout_latest_commits()
@@ -28,7 +31,7 @@ class CountOfSuppressionsNumOnMainCommits(Experiment):
             print(f"Computed commit list for {repo_name}.")
 
             dest_dir = join("data", "results", repo_name, "main_commits_suppression_pylint")
-            args = [repo_dir, commit_list_file, dest_dir, "pylint"]
+            args = [repo_dir, commit_list_file, dest_dir, "pylint", "log", suppression_cache_file]
             args_for_all_repos.append(args)
             
         # find suppression for all commits, in parallel on different repos
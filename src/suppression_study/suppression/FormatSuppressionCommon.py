@@ -1,6 +1,10 @@
 import csv
+from functools import lru_cache
+from itertools import groupby
 import re
 
+from suppression_study.suppression.Suppression import Suppression
+
 
 '''
 These format steps can be used to format suppression from the following 3 checkers:
@@ -10,11 +14,15 @@ For Python:
 '''
 class FormatSuppressionCommon():
 
-    def __init__(self, comment_symbol, raw_suppression_results, precessed_suppression_csv, specific_numeric_maps):
+    def __init__(self, comment_symbol, raw_suppression_results, precessed_suppression_csv, specific_numeric_maps,
+            suppression_cache=None, path_to_blob=None):
         self.comment_symbol = comment_symbol
         self.raw_suppression_results = raw_suppression_results
         self.precessed_suppression_csv = precessed_suppression_csv
         self.specific_numeric_maps = specific_numeric_maps
+        # optional, a SuppressionCache and a dict: file path -> git blob hash of the file
+        self.suppression_cache = suppression_cache
+        self.path_to_blob = path_to_blob
 
     def represent_to_dict(self):
         '''
@@ -22,37 +30,8 @@ class FormatSuppressionCommon():
         each suppression has a dict --> the following raw_suppression : dict
         return a list (the elements in it are dicts).
         '''
-        raw_suppression_dict_list = []
-
         with open(self.raw_suppression_results, "r") as f:
-            '''
-            Represent raw_suppression_results to a list with several dict elements.
-            raw_suppression_results: raw results of Grep command.
-            Line format:
-                eg,. (Mypy) src/compare/find_max.py:7:        return 0  # type: ignore
-                eg,. (Pylint) src/fake/demo.py:121:   except Exception:  # pylint: disable=broad-except
-            '''
-            line = f.readline()
-            while line:
-                ''' 
-                Avoid split ":" in source code and suppression 
-                eg,. ":" in # type: ignore
-                eg,. ":" in except Exception:  # pylint: disable=broad-except
-                '''
-                splits = line.split(":", 2) 
-                file_path = splits[0]
-                line_number = splits[1]
-                code_suppression = splits[2] # In some cases, suppression mixed with source code
-                raw_suppression : dict = {
-                        "file_path" : file_path,
-                        "line_number" : line_number,
-                        "code_suppression" : str(code_suppression).strip()
-                }
-                raw_suppression_dict_list.append(raw_suppression)
-                line=f.readline()
-
-        return raw_suppression_dict_list
-
+            return list(iter_raw_suppression_dicts(f))
      
     def format_suppression_common(self):
         '''
@@ -73,20 +52,71 @@ class FormatSuppressionCommon():
 
         with open(self.precessed_suppression_csv,"w") as d:
             writer = csv.writer(d)
+            raw_suppressions = ((raw_suppression["file_path"].replace("./", "", 1), raw_suppression["line_number"],
+                    raw_suppression["code_suppression"]) for raw_suppression in self.represent_to_dict())
+            for suppression in self.iter_suppressions(raw_suppressions):
+                writer.writerow([suppression.path, suppression.text, suppression.line])
+
+    def iter_suppressions(self, raw_suppressions):
+        '''
+        Format raw suppressions in memory, yield Suppression objects.
+        raw_suppressions: (file path, line number, code) tuples, eg,. the matches of GrepSuppressionSuper.
+        '''
+        # the raw suppressions of a file are next to each other
+        for file_path, file_raw_suppressions in groupby(raw_suppressions, key=lambda r: r[0]):
+            if "/lib" in f"./{file_path}": # Hard code to exclude dir, need to manual check folder names.
+                continue
+            for suppression_text, line_number in self.format_file_suppressions(file_path, file_raw_suppressions):
+                yield Suppression(file_path, suppression_text, int(line_number))
 
-            raw_suppression_dict_list = self.represent_to_dict()
-            for raw_suppression in raw_suppression_dict_list:
-                if "/lib" in raw_suppression['file_path']: # Hard code to exclude dir, need to manual check folder names.
-                    continue
-                code_suppression = raw_suppression['code_suppression']
-                suppressor = get_suppressor(code_suppression)
-                if suppressor:
-                    preprocessed_suppression_texts = get_suppression_from_source_code(suppressor, self.comment_symbol, 
-                            code_suppression, self.specific_numeric_maps)
-                    # Reorder suppression keys and combined to a whole one
-                    file_path_info = raw_suppression['file_path'].replace("./", "", 1)
-                    for suppression_text in preprocessed_suppression_texts:
-                        writer.writerow([file_path_info, suppression_text, raw_suppression["line_number"]])
+    def format_file_suppressions(self, file_path, raw_suppressions):
+        '''
+        Format the raw suppressions of a single file,
+        return a list of [suppression_text, line_number] rows.
+        If there is a suppression_cache, the rows of a file version (blob) are formatted only once.
+        '''
+        blob = None
+        if self.suppression_cache is not None and self.path_to_blob:
+            blob = self.path_to_blob.get(file_path)
+            if blob:
+                cached_rows = self.suppression_cache.get(blob)
+                if cached_rows is not None:
+                    return cached_rows
+
+        rows = []
+        parser = get_suppression_parser(self.comment_symbol, self.specific_numeric_maps)
+        for _, line_number, code in raw_suppressions:
+            for suppression_text in parser.parse(code.strip()):
+                rows.append([suppression_text, line_number])
+
+        if blob:
+            self.suppression_cache.put(blob, rows)
+        return rows
+
+def iter_raw_suppression_dicts(raw_suppression_lines):
+    '''
+    Represent raw_suppression_lines to dicts, yield them one by one.
+    raw_suppression_lines: raw results of Grep command.
+    Line format:
+        eg,. (Mypy) src/compare/find_max.py:7:        return 0  # type: ignore
+        eg,. (Pylint) src/fake/demo.py:121:   except Exception:  # pylint: disable=broad-except
+    '''
+    for line in raw_suppression_lines:
+        ''' 
+        Avoid split ":" in source code and suppression 
+        eg,. ":" in # type: ignore
+        eg,. ":" in except Exception:  # pylint: disable=broad-except
+        '''
+        splits = line.split(":", 2) 
+        file_path = splits[0]
+        line_number = splits[1]
+        code_suppression = splits[2] # In some cases, suppression mixed with source code
+        raw_suppression : dict = {
+                "file_path" : file_path,
+                "line_number" : line_number,
+                "code_suppression" : str(code_suppression).strip()
+        }
+        yield raw_suppression
 
 def get_suppressor(suppression_text):
     # Given the text of a suppression, return the suppressor of this suppression
@@ -108,121 +138,146 @@ def get_suppression_from_source_code(suppressor, comment_symbol, code_suppressio
     if suppressor == "":
         # no suppression in current code_suppression
         return [] # return preprocessed_suppression_texts
-    
+    parser = get_suppression_parser(comment_symbol, specific_numeric_maps)
+    return list(parser.parse_suppression(suppressor, code_suppression))
+
+def get_separated_suppressions(suppression_text, specific_numeric_maps):
     '''
-    Avoid impacts from # noqa, a suppression from checker flake8
-    It can be mixed with pylint and mypy, 
-    that is, when the two suppressions appear on the same line, both suppressions can work normally.
-    eg,. # noqa # pylint: disable= no-member
-        # noqa pylint: disable= no-member
-        in this case, # pylint: disable= no-member still work as designed.
-    Here cover these cases.
+    Get single warning types and change numeric waring types to specific types,
+    see SuppressionParser.separate_suppressions
     '''
-    preprocessed_suppression = ""
+    return list(get_suppression_parser("#", specific_numeric_maps).separate_suppressions(suppression_text))
 
-    if code_suppression.startswith("# noqa"): 
-        tmp_check = code_suppression.split("pylint")[1]
-        if comment_symbol in tmp_check:
-            tmp_check = tmp_check.split(comment_symbol)[0]
-        code_suppression = f"# pylint{tmp_check}"
+def get_suppression_parser(comment_symbol, specific_numeric_maps):
+    '''
+    Return a SuppressionParser, the same one for the same comment_symbol and specific_numeric_maps object.
+    '''
+    key = (comment_symbol, id(specific_numeric_maps))
+    if key not in suppression_parsers or suppression_parsers[key].specific_numeric_maps is not specific_numeric_maps:
+        suppression_parsers[key] = SuppressionParser(comment_symbol, specific_numeric_maps)
+    return suppression_parsers[key]
 
-    if not code_suppression.startswith(suppressor): # mixed with source code or start with other comments.
-        suppression_content = ""
-        if comment_symbol in code_suppression:
-            # TODO read mypy
-            suppression_tmp = code_suppression.split("pylint:")[1]
-            if comment_symbol in suppression_tmp: # comments come after suppression
-                # may other comments follow, further solution in get_separated_suppressions
-                suppression_content = suppressor + suppression_tmp.split(comment_symbol, 1)[0]
-            else: 
-                suppression_content = suppressor + suppression_tmp
-            preprocessed_suppression = suppression_content
-        else:
-            preprocessed_suppression = None # not correct way to use pylint suppressions
+suppression_parsers = {}
+
+
+class SuppressionParser():
+    '''
+    Turn a line of source code into its normalized suppression texts, in one pass over the line.
+    Everything that does not depend on the line is prepared once:
+    a reverse index from numeric codes to specific warning types, instead of scanning specific_numeric_maps,
+    and a compiled digit pattern. Parsed lines are memoized, the same suppression lines show up in many commits.
+    specific_numeric_maps must not change after the parser is created.
+    '''
+
+    def __init__(self, comment_symbol, specific_numeric_maps, max_memoized_lines=100000):
+        self.comment_symbol = comment_symbol
+        self.specific_numeric_maps = specific_numeric_maps
+        self.numeric_to_specific = {}
+        for specific, numeric in specific_numeric_maps.items():
+            # keep the first specific type of a numeric code, as a scan over specific_numeric_maps finds
+            self.numeric_to_specific.setdefault(numeric, specific)
+        self.digit_pattern = re.compile(r"\d")
+        self.parse_suppression = lru_cache(maxsize=max_memoized_lines)(self.parse_suppression_uncached)
+
+    def parse(self, code_suppression):
+        '''
+        Return the normalized suppression texts of a line of source code (stripped), a tuple, maybe empty.
+        '''
+        suppressor = get_suppressor(code_suppression)
+        if suppressor == "":
+            return ()
+        return self.parse_suppression(suppressor, code_suppression)
+
+    def parse_suppression_uncached(self, suppressor, code_suppression):
+        comment_symbol = self.comment_symbol
+        '''
+        Avoid impacts from # noqa, a suppression from checker flake8
+        It can be mixed with pylint and mypy, 
+        that is, when the two suppressions appear on the same line, both suppressions can work normally.
+        eg,. # noqa # pylint: disable= no-member
+            # noqa pylint: disable= no-member
+            in this case, # pylint: disable= no-member still work as designed.
+        '''
+        if code_suppression.startswith("# noqa"): 
+            tmp_check = code_suppression.split("pylint", 2)[1]
+            code_suppression = "# pylint" + tmp_check.split(comment_symbol, 1)[0]
 
-    else: # starts with suppressor
-        if code_suppression.count(comment_symbol) >= 2:
-            # line has multiple comments 
-            index_of_second_comment = [m.start() for m in re.finditer(suppressor, code_suppression)][1]
-            # may other comments follow. further solution in get_separated_suppressions
+        if not code_suppression.startswith(suppressor): # mixed with source code or start with other comments.
+            _, found, suppression_tmp = code_suppression.partition("pylint:")
+            if comment_symbol not in code_suppression or not found:
+                return () # not correct way to use pylint suppressions
+            # TODO read mypy
+            suppression_tmp = suppression_tmp.split("pylint:", 1)[0]
+            # comments may come after suppression, further solution in separate_suppressions
+            preprocessed_suppression = suppressor + suppression_tmp.split(comment_symbol, 1)[0]
+        elif code_suppression.count(comment_symbol) >= 2:
+            # line has multiple comments, keep the part before the second suppressor,
+            # or before the second comment if there is no second suppressor
+            index_of_second_comment = code_suppression.find(suppressor, len(suppressor))
+            if index_of_second_comment == -1:
+                index_of_second_comment = code_suppression.find(comment_symbol, 1)
             preprocessed_suppression = code_suppression[:index_of_second_comment].strip()
-        else:
+        else: # starts with suppressor
             preprocessed_suppression = code_suppression
 
-    assert preprocessed_suppression != ""
-    
-    # further format steps, separate multiple warning types into single ones, 
-    # and change numeric types with specific types
-    preprocessed_suppression_texts = get_separated_suppressions(preprocessed_suppression, specific_numeric_maps)
+        # further format steps, separate multiple warning types into single ones, 
+        # and change numeric types with specific types
+        return self.separate_suppressions(preprocessed_suppression)
 
-    return preprocessed_suppression_texts
+    def separate_suppressions(self, suppression_text):
+        '''
+        Get single warning types and change numeric waring types to specific types
+        Suppression examples:
+        # pylint: disable= no-member, arguments-differ, invalid-name
+        # type: ignore[assignment]
 
-def get_separated_suppressions(suppression_text, specific_numeric_maps):
-    '''
-    Get single warning types and change numeric waring types to specific types
-    Suppression examples:
-    # pylint: disable= no-member, arguments-differ, invalid-name
-    # type: ignore[assignment]
-
-    For the example for Pylint:
-        [inputs]
-        suppression_text: # pylint: disable=no-member, arguments-differ
-                            # pylint: disable=W0703
-
-        [return]
-        # pylint: disable=no-member
-        # pylint: disable=arguments-differ
-        # pylint: disable=broad-except (W0703)
-    '''
-    preprocessed_suppression_texts = []
-    separator = ""
-    raw_warning_type = ""
-    suppressor_part = ""
-
-    if "=" in suppression_text:  # Pylint
-        separator = "="
-    elif "(" in suppression_text:  # Mypy
-        separator = "("
-    elif "[" in suppression_text:  # Mypy
-        separator = "["
-    else: # suppression: pylint: disable-all
-        if "disable-all" in suppression_text and "pylint" in suppression_text:
-            raw_warning_type = "all"
-            suppressor_part = "# pylint: disable"
-
-    if separator:
-        tmp = suppression_text.split(separator)
-        suppressor_part = tmp[0] # eg,. # pylint: disable
-        # raw waning type can a single one, or multiple
-        # eg,. no-member
-        # eg,. arguments-differ, invalid-name
-        raw_warning_type = tmp[1].replace("]", "", 1).strip()
-
-    last_type = ""
-    multi_raw_warning_type = []
-    if "," in raw_warning_type:
-        multi_raw_warning_type_tmp = raw_warning_type.split(",")
-        multi_raw_warning_type = [warning_type.strip() for warning_type in multi_raw_warning_type_tmp]
+        For the example for Pylint:
+            [inputs]
+            suppression_text: # pylint: disable=no-member, arguments-differ
+                                # pylint: disable=W0703
+
+            [return]
+            # pylint: disable=no-member
+            # pylint: disable=arguments-differ
+            # pylint: disable=broad-except (W0703)
+        '''
+        raw_warning_type = ""
+        suppressor_part = ""
+        if "=" in suppression_text:  # Pylint
+            separator = "="
+        elif "(" in suppression_text:  # Mypy
+            separator = "("
+        elif "[" in suppression_text:  # Mypy
+            separator = "["
+        else:
+            separator = ""
+            if "disable-all" in suppression_text and "pylint" in suppression_text: # suppression: pylint: disable-all
+                raw_warning_type = "all"
+                suppressor_part = "# pylint: disable"
+
+        if separator:
+            # eg,. # pylint: disable, and a single raw warning type, or multiple
+            # eg,. no-member
+            # eg,. arguments-differ, invalid-name
+            suppressor_part, _, tmp = suppression_text.partition(separator)
+            raw_warning_type = tmp.split(separator, 1)[0].replace("]", "", 1).strip()
+
+        if "," in raw_warning_type:
+            multi_raw_warning_type = [warning_type.strip() for warning_type in raw_warning_type.split(",")]
+        else:
+            multi_raw_warning_type = [raw_warning_type]
         last_type = multi_raw_warning_type[-1]
-    else:
-        multi_raw_warning_type.append(raw_warning_type)
-        last_type = raw_warning_type
-    
-    if " " in last_type: # mixed with natural sentences
-        multi_raw_warning_type[-1] = last_type.split(" ")[0]
-
-    # let raw warning types back to suppression format
-    for t in multi_raw_warning_type:
-        if bool(re.search(r'\d', t)) == True:
-            for specific, numeric in specific_numeric_maps.items():
-                if t == numeric:
-                    t = specific
-                    break
-                    
-        if "# pylint:" in suppressor_part:
-            suppression_text = f"{suppressor_part}={t}"
-        else: # suppressor: type: ignore from mypy
-            suppression_text = f"{suppressor_part}[{t}]"
-        preprocessed_suppression_texts.append(suppression_text)
-
-    return preprocessed_suppression_texts
\ No newline at end of file
+        if " " in last_type: # mixed with natural sentences
+            multi_raw_warning_type[-1] = last_type.split(" ")[0]
+
+        # let raw warning types back to suppression format
+        is_pylint = "# pylint:" in suppressor_part # otherwise suppressor: type: ignore from mypy
+        preprocessed_suppression_texts = []
+        for t in multi_raw_warning_type:
+            if self.digit_pattern.search(t):
+                t = self.numeric_to_specific.get(t, t)
+            if is_pylint:
+                preprocessed_suppression_texts.append(f"{suppressor_part}={t}")
+            else:
+                preprocessed_suppression_texts.append(f"{suppressor_part}[{t}]")
+        return tuple(preprocessed_suppression_texts)
@@ -6,26 +6,36 @@ import argparse
 import csv
 from suppression_study.suppression.GrepSuppressionSuper import GrepSuppressionSuper
 from suppression_study.suppression.FormatSuppressionCommon import FormatSuppressionCommon
+from suppression_study.suppression.SuppressionCache import SuppressionCache, get_suppression_cache_version
+from suppression_study.suppression.SuppressionSnapshotStore import SuppressionSnapshotStore
+from suppression_study.suppression.Suppression import write_suppressions_to_file
 import os
 from os.path import join
 
 from suppression_study.suppression.NumericSpecificTypeMap import get_warning_kind_to_numeric_code
+from suppression_study.utils.FunctionsCommon import get_commit_list
 
 
 parser = argparse.ArgumentParser(description="Find suppression in Python repositories")
 parser.add_argument("--repo_dir", help="Directory with the repository to check", required=True)
 parser.add_argument("--commit_id", help="A specific commit ID, or the .csv file which stores a list of commit IDs", required=True)
 parser.add_argument("--results_dir", help="Directory where to put the results", required=True)
+parser.add_argument("--scan_mode", help="How to read the files of a commit", default="checkout",
+                    choices=["checkout", "git-grep", "incremental", "log"])
+parser.add_argument("--suppression_cache", help="SQLite file that caches formatted suppressions by git blob hash")
+parser.add_argument("--snapshot_store", help="SQLite file to store the suppressions of all commits in, "
+                    "instead of one .csv file per commit")
 
 class GrepSuppressionPython(GrepSuppressionSuper):
 
-    def __init__(self, repo_dir, commit_id, output_path, checker=None):
+    def __init__(self, repo_dir, commit_id, output_path, checker=None, scan_mode="checkout", suppression_cache_file=None,
+            snapshot_store_file=None):
         if checker == None:
-            super().__init__("*.py", "* pylint: *disable|# type: ignore")
+            super().__init__("*.py", "* pylint: *disable|# type: ignore", scan_mode)
         elif checker == "pylint":
-            super().__init__("*.py", "* pylint: *disable")
+            super().__init__("*.py", "* pylint: *disable", scan_mode)
         elif checker == "mypy":
-            super().__init__("*.py", "# type: ignore")
+            super().__init__("*.py", "# type: ignore", scan_mode)
         else:
             raise ValueError("Checker must be 'pylint', 'mypy', or None")
         self.repo_dir = repo_dir
@@ -33,52 +43,125 @@ class GrepSuppressionPython(GrepSuppressionSuper):
         self.output_path = output_path
         self.specific_numeric_maps = get_warning_kind_to_numeric_code()
 
+        self.suppression_cache = None
+        if suppression_cache_file:
+            version = get_suppression_cache_version(self.filter_keywords, "#", self.specific_numeric_maps)
+            self.suppression_cache = SuppressionCache(suppression_cache_file, version)
+            self.track_file_blobs = True
+
+        # only used for a list of commits
+        self.snapshot_store_file = snapshot_store_file
+
+    def iter_formatted_suppressions(self, file_to_lines, commit, path_to_blob=None):
+        '''
+        Format the matches of a commit (file path -> matched lines, (line number, code) tuples) in memory,
+        yield Suppression objects.
+        path_to_blob: the blob hashes of the files for the suppression cache, read with git ls-tree if not given.
+        '''
+        if self.suppression_cache is not None and path_to_blob is None:
+            path_to_blob = self.get_file_blobs(self.repo_dir, commit, sorted(file_to_lines))
+        raw_suppressions = ((file, line_number, code) for file in sorted(file_to_lines)
+                for line_number, code in file_to_lines[file])
+        formatter = FormatSuppressionCommon("#", None, None, self.specific_numeric_maps,
+                                            self.suppression_cache, path_to_blob)
+        yield from formatter.iter_suppressions(raw_suppressions)
+
+    def iter_suppressions(self, commit):
+        '''
+        Yield the suppressions of a single commit, Suppression objects, straight from the scanner and the formatter.
+        '''
+        yield from self.iter_formatted_suppressions(self.get_raw_suppression_results(commit), commit)
+        if self.suppression_cache is not None:
+            self.suppression_cache.flush()
+
+    def iter_commit_suppressions(self, all_commits):
+        '''
+        Yield (commit, suppressions) for all_commits, from oldest to newest.
+        all_commits are newest to oldest, as in the commit .csv files.
+        suppressions: a list of Suppression, or None if the commit has no raw suppression results,
+        like a commit without a "<commit>_suppression.csv" file.
+        '''
+        for commit, file_to_lines in self.iter_raw_suppression_results(all_commits):
+            suppressions = None
+            if file_to_lines:
+                # these scan modes keep the blobs of the files from the diffs
+                path_to_blob = self.file_blobs if self.scan_mode in ("incremental", "log") else None
+                suppressions = list(self.iter_formatted_suppressions(file_to_lines, commit, path_to_blob))
+                if self.suppression_cache is not None:
+                    self.suppression_cache.flush()
+            yield commit, suppressions
+
+    def flush_suppression_cache(self):
+        if self.suppression_cache is not None:
+            self.suppression_cache.flush()
+            print(f"Suppression cache: {self.suppression_cache.get_stats()}")
+
     def grep_suppression_for_specific_commit(self):
         '''
-        Run "Grep" command to find suppression in specified commit, return a .txt file 
-        ''' 
-        raw_suppression_results = super(GrepSuppressionPython, self).grep_suppression_for_specific_commit()
-        if os.path.getsize(raw_suppression_results):
-            format_to_csv(raw_suppression_results, self.specific_numeric_maps)
-        else:
-            os.remove(raw_suppression_results)
+        Find suppression in specified commit, write a <commit>_suppression.csv file
+        (no file if the commit has no raw suppression results)
+        '''
+        if not os.path.exists(self.output_path):
+            os.makedirs(self.output_path)
+
+        file_to_lines = self.get_raw_suppression_results(self.commit_id)
+        if file_to_lines:
+            suppressions = self.iter_formatted_suppressions(file_to_lines, self.commit_id)
+            write_suppressions_to_file(suppressions, join(self.output_path, f"{self.commit_id}_suppression.csv"))
+        self.flush_suppression_cache()
 
     def grep_suppression_for_all_commits(self):
         '''
-        Run "Grep" command to find suppression in all the commits (multi-commit)
-        Return .txt files, 1 commit --> 1 .txt 
+        Find suppression in all the commits (multi-commit)
+        Write .csv files, 1 commit --> 1 <commit>_suppression.csv
         Also write a file that records how many suppression are there in these commits
-        ''' 
-        suppression_num = 0
+        With a snapshot store, the suppressions of all commits are added to the store instead of the .csv files.
+        '''
         all_suppression_nums = []
-    
-        output_txt_files : list = super(GrepSuppressionPython, self).grep_suppression_for_all_commits()
-        for raw_suppression_results in output_txt_files:
-            if os.path.getsize(raw_suppression_results):
-                format_to_csv(raw_suppression_results, self.specific_numeric_maps)
-                preprocessed_suppression_csv = raw_suppression_results.replace(".txt", "_suppression.csv")
-                # Every suppression / every line in preprocessed_suppression_csv includes only 1 warning type
-                # the length is exactly the number of suppressions
-                suppression_num = len(open(preprocessed_suppression_csv, "r").readlines())
-            else:
-                os.remove(raw_suppression_results)
-                suppression_num = 0
-            all_suppression_nums.append(suppression_num)
+        snapshot_store = None
+        if self.snapshot_store_file:
+            snapshot_store = SuppressionSnapshotStore(self.snapshot_store_file)
+        if not os.path.exists(self.output_path):
+            os.makedirs(self.output_path)
+
+        all_commits = get_commit_list(self.commit_id)
+        for commit, suppressions in self.iter_commit_suppressions(all_commits): # start from older commits
+            if snapshot_store is not None:
+                snapshot_store.append(commit, suppressions)
+            elif suppressions is not None:
+                write_suppressions_to_file(suppressions, join(self.output_path, f"{commit}_suppression.csv"))
+            # Every suppression includes only 1 warning type
+            all_suppression_nums.append(len(suppressions) if suppressions else 0)
+
+        if snapshot_store is not None:
+            snapshot_store.close()
 
         # Write a file to record the number of suppressions in every commit
         suppression_num_csv = join(os.path.dirname(self.output_path), "main_suppression_nums_pylint.csv")
         commit_max_index = len(all_suppression_nums) + 1 # set to start from 1
-        all_suppression_nums.reverse() # let it start from older commits
         with open(suppression_num_csv, 'w', newline='') as csvfile:
             csv_writer = csv.writer(csvfile)
             for i, suppression_num in zip(range(1, commit_max_index), all_suppression_nums):
                 csv_writer.writerow([i, suppression_num])
+        self.flush_suppression_cache()
+
+
+def iter_suppressions(repo_dir, commit, checker=None, scan_mode="git-grep", suppression_cache_file=None):
+    '''
+    Return an iterator over the suppressions of a commit, Suppression objects, without writing any file.
+    The default scan mode reads the files from the object database, the working tree is not touched.
+    '''
+    grep = GrepSuppressionPython(repo_dir, commit, None, checker, scan_mode, suppression_cache_file)
+    return grep.iter_suppressions(commit)
+
 
-def format_to_csv(raw_suppression_results, specific_numeric_maps): 
-    comment_symbol = "#" 
-    preprocessed_suppression_csv = raw_suppression_results.replace(".txt", "_suppression.csv")
-    FormatSuppressionCommon(comment_symbol, raw_suppression_results, preprocessed_suppression_csv, 
-                            specific_numeric_maps).format_suppression_common()
+def iter_commit_suppressions(repo_dir, commits, checker=None, scan_mode="git-grep", suppression_cache_file=None):
+    '''
+    Return an iterator over (commit, a list of Suppression or None) for commits (newest to oldest), from oldest to newest,
+    without writing any file. See GrepSuppressionPython.iter_commit_suppressions.
+    '''
+    grep = GrepSuppressionPython(repo_dir, None, None, checker, scan_mode, suppression_cache_file)
+    return grep.iter_commit_suppressions(list(commits)) # a copy, commits may change before the first commit is read
 
         
 if __name__=="__main__":
@@ -88,7 +171,8 @@ if __name__=="__main__":
     results_dir = args.results_dir
 
     output_path = os.path.join(results_dir, "grep")
-    init = GrepSuppressionPython(repo_dir, commit_id, output_path)
+    init = GrepSuppressionPython(repo_dir, commit_id, output_path, scan_mode=args.scan_mode,
+                                 suppression_cache_file=args.suppression_cache, snapshot_store_file=args.snapshot_store)
 
     if os.path.exists(commit_id): # It's a file
         init.grep_suppression_for_all_commits()  
@@ -1,71 +1,458 @@
+import codecs
+from concurrent.futures import ThreadPoolExecutor
+import re
 import subprocess
 from git.repo import Repo
 import os
-from os.path import join
-from suppression_study.utils.FunctionsCommon import get_commit_list
+from fnmatch import fnmatchcase
+from os.path import join, relpath
 
 
 class GrepSuppressionSuper():
 
-    def __init__(self, source_file_extension, filter_keywords) -> None:
+    def __init__(self, source_file_extension, filter_keywords, scan_mode="checkout") -> None:
+        '''
+        scan_mode:
+            "checkout", check out every commit and scan the files in the working tree
+            "git-grep", run "git grep" on the commits, read files from the object database,
+                        never touch the working tree
+            "incremental", like "git-grep", but for a list of commits, rescan only the files
+                        changed between consecutive commits
+            "log", for a list of commits, scan the oldest commit with "git grep", then replay
+                        the diffs of a single "git log -p" run to get the suppression of later commits
+        '''
+        if scan_mode not in ("checkout", "git-grep", "incremental", "log"):
+            raise ValueError("Scan mode must be 'checkout', 'git-grep', 'incremental' or 'log'")
         self.source_file_extension = source_file_extension
         self.filter_keywords = filter_keywords
+        self.scan_mode = scan_mode
+        # number of commits passed to a single "git grep" call
+        self.commits_per_git_grep = 50
+        # number of file paths passed to a single "git grep" call
+        self.paths_per_git_grep = 500
+        # number of threads that read and match files in the working tree
+        self.scan_threads = min(32, (os.cpu_count() or 1) + 4)
+        # with track_file_blobs, the "incremental" and "log" scan modes keep file_blobs: file path -> git blob hash
+        # of the files in the results they yield last, from the diffs they read anyway
+        self.track_file_blobs = False
+        self.file_blobs = {}
 
-    def find_suppression(self, target_folder, raw_suppression_results):
+    def scan_working_tree(self, target_folder):
         '''
-        Run "Grep" command to find suppression
+        Find suppression in all files with source_file_extension in target_folder, like "find | xargs grep",
+        but in-process: the files are read and matched in a thread pool, with a precompiled pattern over raw bytes.
+        Return a dict: file path -> matched lines of the file, with the same format as git_grep.
         '''
+        paths = []
+        for root, dirs, files in os.walk(target_folder):
+            if ".git" in dirs:
+                dirs.remove(".git") # the repository's own database, has no source files
+            for file in files:
+                if fnmatchcase(file, self.source_file_extension):
+                    paths.append(relpath(join(root, file), target_folder))
 
-        # Record relative path in results
-        find_command = "find . -name '" + self.source_file_extension + "' -print0 | xargs -0 grep -E '" + self.filter_keywords + "' -n"
-        result = subprocess.run(find_command, cwd=target_folder, shell=True, stdout=subprocess.PIPE, universal_newlines=True)
-        output_txt_lines: str = result.stdout
+        keyword_pattern = re.compile(get_git_grep_keywords(self.filter_keywords).encode())
+        file_to_lines = {}
+        with ThreadPoolExecutor(max_workers=self.scan_threads) as executor:
+            file_matches = executor.map(lambda path: scan_file(join(target_folder, path), keyword_pattern), paths)
+            for path, matches in zip(paths, file_matches):
+                if matches:
+                    file_to_lines[path] = matches
+        return file_to_lines
+
+    def git_grep(self, repo_dir, commits, paths=None):
+        '''
+        Run "git grep" on one or more commits, files are read from the object database.
+        If paths is given, only search these files, otherwise all files with source_file_extension.
+        Return a dict: commit -> {file path -> matched lines of the file}
+        The matched lines are (line number, code) tuples in line order, as in the results of scan_working_tree,
+            eg,. (121, "   except Exception:  # pylint: disable=broad-except")
         '''
-        In some cases, grep command does not show file_path in the results, as only 1 file related to searching keyword.
-        If so, run the command with option "-l" to get the file_path, and update the result raw_suppression_results file.
+        commit_to_file_lines = {commit: {} for commit in commits}
+        for commit, file_to_matches in self.git_grep_matches(repo_dir, commits, paths).items():
+            for path, matches in file_to_matches.items():
+                commit_to_file_lines[commit][path] = sorted(matches.items())
+        return commit_to_file_lines
+
+    def git_grep_matches(self, repo_dir, commits, paths=None):
         '''
-        new_txt_lines = []
-        if output_txt_lines.split(":", 1)[0].isdigit():
-            command = "find . -name '" + self.source_file_extension + "' -print0 | xargs -0 grep -l -E '" + self.filter_keywords + "' -n"
-            result = subprocess.run(command, cwd=target_folder, shell=True, stdout=subprocess.PIPE, universal_newlines=True)
-            file_path = result.stdout.strip() # should only with a file path
-            output_txt_lines_list = output_txt_lines.strip().split("\n")
-            for txt in output_txt_lines_list:
-                new_txt = file_path + ":" + txt
-                new_txt_lines.append(new_txt)
+        Like git_grep, but return a dict: commit -> {file path -> {line number -> code}}
 
-            with open(raw_suppression_results, "w") as f:
-                write_str = ""
-                for line in new_txt_lines:
-                    write_str = write_str + line + "\n"
-                f.write(write_str)
+        git grep output format with "-z", and a commit as tree-ish:
+            eg,. a09fcfec:src/fake/demo.py<NUL>121<NUL>   except Exception:  # pylint: disable=broad-except
+        '''
+        commit_to_file_matches = {commit: {} for commit in commits}
+        if paths is None:
+            pathspec_groups = [[self.source_file_extension]]
         else:
-            with open(raw_suppression_results, "w") as f:
-                f.writelines(output_txt_lines)
-
-    def grep_suppression_for_specific_commit(self):
-        repo_base= Repo(self.repo_dir)
-        repo_base.git.checkout(self.commit_id, force=True)
-        if not os.path.exists(self.output_path):
-            os.makedirs(self.output_path)
-        
-        raw_suppression_results = join(self.output_path, self.commit_id +".txt")
-        self.find_suppression(self.repo_dir, raw_suppression_results)
-
-        return raw_suppression_results
-
-    def grep_suppression_for_all_commits(self):
-        output_txt_files = []
-
-        all_commits = get_commit_list(self.commit_id)
-        repo_base= Repo(self.repo_dir)
-        for commit in all_commits:
+            # literal pathspecs, file names may contain wildcards
+            pathspecs = [f":(literal){path}" for path in paths]
+            pathspec_groups = [pathspecs[i:i + self.paths_per_git_grep]
+                    for i in range(0, len(pathspecs), self.paths_per_git_grep)]
+
+        for pathspecs in pathspec_groups:
+            # core.quotePath=false: keep non-ASCII file paths as they are, like grep does
+            git_grep_command = ["git", "-c", "core.quotePath=false", "grep", "-z", "-I", "-n", "-E",
+                    "-e", get_git_grep_keywords(self.filter_keywords)] + commits + ["--"] + pathspecs
+            result = subprocess.run(git_grep_command, cwd=repo_dir, stdout=subprocess.PIPE)
+            # exit status 1: no line matches
+            if result.returncode > 1:
+                raise RuntimeError(f"git grep failed in {repo_dir}")
+
+            # read bytes and split only at "\n", source code can include other line boundaries, eg,. "\f" or a single "\r"
+            for line in result.stdout.split(b"\n")[:-1]:
+                commit_and_path, line_number, code = line.split(b"\0", 2)
+                commit, path = commit_and_path.decode(errors="replace").split(":", 1)
+                # like scan_file, without the "\r" of a "\r\n" line ending
+                commit_to_file_matches[commit].setdefault(path, {})[int(line_number)] = \
+                        code.rstrip(b"\r").decode(errors="replace")
+
+        return commit_to_file_matches
+
+    def get_changed_files(self, repo_dir, previous_commit, commit):
+        '''
+        Return 2 lists of files with source_file_extension, compared to previous_commit:
+        1) files that are deleted in commit
+        2) files that are added or modified in commit, a renamed file is reported as deleted + added
+        '''
+        diff_command = ["git", "diff", "-z", "--no-renames", "--name-status",
+                previous_commit, commit, "--", self.source_file_extension]
+        result = subprocess.run(diff_command, cwd=repo_dir, stdout=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"git diff failed in {repo_dir}")
+
+        deleted_files = []
+        changed_files = []
+        # -z format: <status><NUL><path><NUL><status><NUL><path><NUL> ...
+        # paths decoded like in git_grep_matches
+        status_and_paths = result.stdout.decode(errors="replace").split("\0")
+        for status, path in zip(status_and_paths[0::2], status_and_paths[1::2]):
+            if status == "D":
+                deleted_files.append(path)
+            else: # A, M, T
+                changed_files.append(path)
+        return deleted_files, changed_files
+
+    def get_file_blobs(self, repo_dir, commit, paths):
+        '''
+        Return a dict: file path -> git blob hash, for the files in paths that exist in commit.
+        '''
+        path_to_blob = {}
+        pathspecs = [f":(literal){path}" for path in paths]
+        for i in range(0, len(pathspecs), self.paths_per_git_grep):
+            ls_tree_command = ["git", "ls-tree", "-r", "-z", "--full-tree", commit, "--"] + \
+                    pathspecs[i:i + self.paths_per_git_grep]
+            result = subprocess.run(ls_tree_command, cwd=repo_dir, stdout=subprocess.PIPE)
+            if result.returncode != 0:
+                raise RuntimeError(f"git ls-tree failed in {repo_dir}")
+
+            # -z format: <mode> blob <hash><TAB><path><NUL>, paths decoded like in git_grep_matches
+            for entry in result.stdout.decode(errors="replace").split("\0")[:-1]:
+                meta, path = entry.split("\t", 1)
+                _, object_type, object_hash = meta.split(" ")
+                if object_type == "blob":
+                    path_to_blob[path] = object_hash
+        return path_to_blob
+
+    def iter_incremental_snapshots(self, all_commits):
+        '''
+        Yield (commit, {file path -> matched lines of the file}) for all_commits, from oldest to newest,
+        without checkout. all_commits are newest to oldest, as in the commit .csv files.
+        Scan the oldest commit in full. For every later commit, rescan only the files that are added
+        or modified relative to the previous commit, and carry forward the results of all unchanged files.
+        The yielded dict is updated in place for the next commit, copy it to keep a snapshot.
+        '''
+        file_to_lines = {} # the results of the most recently scanned commit
+        previous_commit = None
+        for commit in reversed(all_commits):
+            if previous_commit is None:
+                file_to_lines = self.git_grep(self.repo_dir, [commit])[commit]
+                if self.track_file_blobs:
+                    self.file_blobs = self.get_file_blobs(self.repo_dir, commit, sorted(file_to_lines))
+            else:
+                deleted_files, changed_files = self.get_changed_files(self.repo_dir, previous_commit, commit)
+                for file in deleted_files + changed_files:
+                    file_to_lines.pop(file, None)
+                    self.file_blobs.pop(file, None)
+                if changed_files:
+                    file_to_lines.update(self.git_grep(self.repo_dir, [commit], changed_files)[commit])
+                    matched_files = [file for file in changed_files if file in file_to_lines]
+                    if self.track_file_blobs and matched_files:
+                        self.file_blobs.update(self.get_file_blobs(self.repo_dir, commit, matched_files))
+
+            yield commit, file_to_lines
+            previous_commit = commit
+
+    def iter_first_parent_diffs(self, oldest_commit, newest_commit):
+        '''
+        Yield (commit, {file path -> hunks}, binary file paths, {file path -> blob}) for the commits after oldest_commit
+        up to newest_commit, following the first parents, from oldest to newest.
+        All diffs come from a single "git log -p" run, with files that have source_file_extension only,
+        a merge commit is compared to its first parent. Commits that change no such file are skipped.
+        hunks: (old_start, old_count, new_start, added lines) in the order of the diff, without context lines.
+        blob: the git blob hash of the changed file in the commit, None if the commit deletes the file.
+        '''
+        # -m with --first-parent: show the diffs of merge commits to their first parent
+        log_command = ["git", "-c", "core.quotePath=false", "log", "--first-parent", "-m", "--reverse",
+                "-p", "--unified=0", "--no-renames", "--no-color", "--no-ext-diff", "--full-index",
+                "--pretty=format:%x00%H",
+                f"{oldest_commit}..{newest_commit}", "--", self.source_file_extension]
+        process = subprocess.Popen(log_command, cwd=self.repo_dir, stdout=subprocess.PIPE)
+        lines = iter_git_output_lines(process.stdout)
+
+        commit = None
+        file_to_hunks = {}
+        binary_files = []
+        file_to_blob = {}
+        file = None
+        for line in lines:
+            if line.startswith("\0"):
+                if commit is not None:
+                    yield commit, file_to_hunks, binary_files, file_to_blob
+                commit = line[1:]
+                file_to_hunks = {}
+                binary_files = []
+                file_to_blob = {}
+                file = None
+            elif line.startswith("diff --git "):
+                # without renames, the old and new path are the same
+                file = parse_diff_git_path(line[len("diff --git "):])
+            elif line.startswith("index ") and file is not None:
+                # index <old blob>..<new blob>[ <mode>], the new blob is all zeros for a deleted file
+                new_blob = line.split(" ")[1].split("..")[1]
+                file_to_blob[file] = new_blob if new_blob.strip("0") else None
+            elif line.startswith("Binary files "):
+                binary_files.append(file)
+            elif line.startswith("@@ "):
+                old_start, old_count, new_start, _, _, added_lines = read_hunk(line, lines)
+                file_to_hunks.setdefault(file, []).append((old_start, old_count, new_start, added_lines))
+
+        if commit is not None:
+            yield commit, file_to_hunks, binary_files, file_to_blob
+        process.stdout.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"git log failed in {self.repo_dir}")
+
+    def get_first_parent_commits(self, oldest_commit, newest_commit):
+        '''
+        Return the full hashes of the commits after oldest_commit up to newest_commit,
+        following the first parents, from oldest to newest.
+        '''
+        rev_list_command = ["git", "rev-list", "--first-parent", "--reverse", f"{oldest_commit}..{newest_commit}"]
+        result = subprocess.run(rev_list_command, cwd=self.repo_dir, stdout=subprocess.PIPE, universal_newlines=True)
+        return result.stdout.split()
+
+    def iter_suppression_snapshots(self, all_commits):
+        '''
+        Yield (commit, {file path -> matched lines of the file}) for all_commits, from oldest to newest.
+        all_commits are newest to oldest, as in the commit .csv files, and follow the first parents.
+        The oldest commit is scanned with "git grep", the later commits are computed by applying the diffs
+        from a single "git log --first-parent -p" run to the suppression of the previous commit.
+        Commits in between that are not in all_commits (eg,. when the commit list is sampled) are applied as well.
+        The yielded dict is updated in place for the next commit, copy it to keep a snapshot.
+        '''
+        oldest_commit = all_commits[-1]
+        history = self.get_first_parent_commits(oldest_commit, all_commits[0])
+        # full commit hash -> commit as in all_commits
+        listed_commits = {}
+        history_index = 0
+        for listed_commit in reversed(all_commits[:-1]):
+            while history_index < len(history) and not history[history_index].startswith(listed_commit):
+                history_index += 1
+            if history_index == len(history):
+                raise ValueError(f"Commit {listed_commit} is not on the first parent history of {all_commits[0]}")
+            listed_commits[history[history_index]] = listed_commit
+
+        file_to_matches = self.git_grep_matches(self.repo_dir, [oldest_commit])[oldest_commit]
+        file_to_lines = {}
+        for file, matches in file_to_matches.items():
+            update_file_results(file_to_matches, file_to_lines, file, matches)
+        if self.track_file_blobs:
+            self.file_blobs = self.get_file_blobs(self.repo_dir, oldest_commit, sorted(file_to_lines))
+        yield oldest_commit, file_to_lines
+        if not listed_commits:
+            return
+
+        keyword_pattern = re.compile(get_git_grep_keywords(self.filter_keywords))
+        diffs = self.iter_first_parent_diffs(oldest_commit, all_commits[0])
+        next_diff = next(diffs, None)
+        for commit in history:
+            # commits that change no file with source_file_extension are not in the log
+            if next_diff is not None and next_diff[0] == commit:
+                _, file_to_hunks, binary_files, file_to_blob = next_diff
+                for file, hunks in file_to_hunks.items():
+                    matches = apply_hunks(file_to_matches.get(file, {}), hunks, keyword_pattern)
+                    update_file_results(file_to_matches, file_to_lines, file, matches)
+                if binary_files:
+                    # text files with a binary version, rescan them like the oldest commit
+                    rescanned = self.git_grep_matches(self.repo_dir, [commit], binary_files)[commit]
+                    for file in binary_files:
+                        update_file_results(file_to_matches, file_to_lines, file, rescanned.get(file, {}))
+                if self.track_file_blobs:
+                    for file, blob in file_to_blob.items():
+                        if blob is not None and file in file_to_lines:
+                            self.file_blobs[file] = blob
+                        else:
+                            self.file_blobs.pop(file, None)
+                next_diff = next(diffs, None)
+            if commit in listed_commits:
+                yield listed_commits[commit], file_to_lines
+
+    def get_raw_suppression_results(self, commit):
+        '''
+        Return the suppression of a single commit: {file path -> matched lines of the file}
+        '''
+        if self.scan_mode == "checkout":
+            repo_base= Repo(self.repo_dir)
             repo_base.git.checkout(commit, force=True)
-            if not os.path.exists(self.output_path):
-                os.makedirs(self.output_path)
+            return self.scan_working_tree(self.repo_dir)
+        return self.git_grep(self.repo_dir, [commit])[commit]
+
+    def iter_raw_suppression_results(self, all_commits):
+        '''
+        Yield (commit, {file path -> matched lines of the file}) for all_commits, from oldest to newest.
+        all_commits are newest to oldest, as in the commit .csv files.
+        Consume the results of a commit before getting the next one, some scan modes update them in place.
+        '''
+        if self.scan_mode == "incremental":
+            yield from self.iter_incremental_snapshots(all_commits)
+        elif self.scan_mode == "log":
+            yield from self.iter_suppression_snapshots(all_commits)
+        elif self.scan_mode == "git-grep":
+            oldest_first_commits = list(reversed(all_commits))
+            for i in range(0, len(oldest_first_commits), self.commits_per_git_grep):
+                commits = oldest_first_commits[i:i + self.commits_per_git_grep]
+                commit_to_file_lines = self.git_grep(self.repo_dir, commits)
+                for commit in commits:
+                    yield commit, commit_to_file_lines[commit]
+        else:
+            for commit in reversed(all_commits):
+                yield commit, self.get_raw_suppression_results(commit)
+
+
+def get_git_grep_keywords(filter_keywords):
+    '''
+    GNU grep ignores a "*" at the start of an extended expression (with a warning),
+    eg,. "* pylint: *disable" matches the same lines as " pylint: *disable".
+    git grep rejects such expressions, so remove the leading "*" of every alternative.
+    '''
+    keywords = [keyword[1:] if keyword.startswith("*") else keyword for keyword in filter_keywords.split("|")]
+    return "|".join(keywords)
+
+
+def iter_git_output_lines(stream):
+    '''
+    Decode the output of a git command line by line.
+    Split only at "\\n", source code can include other line boundaries, eg,. "\\f" or a single "\\r".
+    A "\\r\\n" line ending is removed like in text mode.
+    '''
+    for line in stream:
+        line = line.decode(errors="replace").rstrip("\n")
+        if line.endswith("\r"):
+            line = line[:-1]
+        yield line
+
+
+def parse_diff_git_path(paths):
+    '''
+    Return the new path from "a/<path> b/<path>" of a "diff --git" line,
+    the paths can be quoted, eg,. "a/tab\\tin name.py" "b/tab\\tin name.py"
+    '''
+    if paths.endswith("\""):
+        quoted_path = paths[paths.rindex(" \"", 0, len(paths) - 1) + 1:]
+        path = codecs.escape_decode(quoted_path[1:-1].encode())[0].decode(errors="replace")
+        return path[2:]
+    # both paths have the same length
+    return paths[(len(paths) + 1) // 2 + 2:]
+
+
+def parse_hunk_range(hunk_range):
+    # "start,count", or "start" if count is 1
+    if "," in hunk_range:
+        start, count = hunk_range.split(",")
+        return int(start), int(count)
+    return int(hunk_range), 1
+
+
+def read_hunk(header, lines):
+    '''
+    Read a hunk of a zero-context diff, header: its "@@" line, lines: an iterator over the diff lines after it.
+    Return (old_start, old_count, new_start, new_count, removed lines, added lines), without their "-" or "+".
+    The hunk is read by its counts, a removed line may start with "--" or "++" as well.
+    '''
+    # @@ -old_start[,old_count] +new_start[,new_count] @@
+    old_range, new_range = header.split(" ", 3)[1:3]
+    old_start, old_count = parse_hunk_range(old_range[1:])
+    new_start, new_count = parse_hunk_range(new_range[1:])
+    removed_lines = []
+    added_lines = []
+    read_count = 0
+    while read_count < old_count + new_count:
+        hunk_line = next(lines)
+        if hunk_line.startswith("\\"): # \ No newline at end of file
+            continue
+        if hunk_line.startswith("-"):
+            removed_lines.append(hunk_line[1:])
+        elif hunk_line.startswith("+"):
+            added_lines.append(hunk_line[1:])
+        read_count += 1
+    return old_start, old_count, new_start, new_count, removed_lines, added_lines
+
+
+def apply_hunks(matches, hunks, keyword_pattern):
+    '''
+    Return the matches (line number -> code) of a file after applying the hunks of a zero-context diff.
+    hunks: (old_start, old_count, new_start, added lines) in the order of the diff
+    '''
+    new_matches = {}
+    # the changed old lines of a hunk are [start, end), lines before it keep their numbers
+    hunk_ranges = []
+    for old_start, old_count, new_start, added_lines in hunks:
+        start = old_start if old_count else old_start + 1 # old_start is the line before inserted lines
+        hunk_ranges.append((start, start + old_count, len(added_lines) - old_count))
+
+    hunk_index = 0
+    offset = 0
+    for line_number in sorted(matches):
+        while hunk_index < len(hunk_ranges) and line_number >= hunk_ranges[hunk_index][1]:
+            offset += hunk_ranges[hunk_index][2]
+            hunk_index += 1
+        if hunk_index < len(hunk_ranges) and line_number >= hunk_ranges[hunk_index][0]:
+            continue # removed
+        new_matches[line_number + offset] = matches[line_number]
+
+    for old_start, old_count, new_start, added_lines in hunks:
+        for i, code in enumerate(added_lines):
+            if keyword_pattern.search(code):
+                new_matches[new_start + i] = code
+    return new_matches
+
+
+def update_file_results(file_to_matches, file_to_lines, file, matches):
+    if matches:
+        file_to_matches[file] = matches
+        file_to_lines[file] = sorted(matches.items())
+    else:
+        file_to_matches.pop(file, None)
+        file_to_lines.pop(file, None)
+
 
-            raw_suppression_results = join(self.output_path, commit + ".txt")
-            self.find_suppression(self.repo_dir, raw_suppression_results)
-            output_txt_files.append(raw_suppression_results)
+def scan_file(file, keyword_pattern):
+    '''
+    Return a list of (line number, code) of the lines in file that match keyword_pattern (a bytes pattern).
+    Like grep, skip binary files (with NUL bytes) and files that cannot be read.
+    '''
+    try:
+        with open(file, "rb") as f:
+            content = f.read()
+    except OSError: # eg,. a broken symbolic link
+        return []
+    if not keyword_pattern.search(content) or b"\0" in content:
+        return []
 
-        return output_txt_files
+    matches = []
+    # split only at "\n", like grep, source code can include other line boundaries
+    for line_number, line in enumerate(content.split(b"\n"), 1):
+        if keyword_pattern.search(line):
+            matches.append((line_number, line.rstrip(b"\r").decode(errors="replace")))
+    return matches
@@ -75,6 +75,13 @@ def read_suppressions_from_file(csv_file): # to fix the order of suppressions
     return suppressions
 
 
+def write_suppressions_to_file(suppressions, csv_file):
+    with open(csv_file, "w") as f:
+        writer = csv.writer(f)
+        for suppression in suppressions:
+            writer.writerow([suppression.path, suppression.text, suppression.line])
+
+
 def get_suppression_text_from_file(csv_file):
     with open(csv_file, "r") as f:
         reader = csv.reader(f)
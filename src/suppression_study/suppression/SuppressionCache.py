@@ -0,0 +1,124 @@
+'''
+A persistent cache from the git blob hash of a file to the formatted suppressions of the file.
+The same file version shows up in many commits (and in repositories that vendor the same files),
+with the cache, the suppressions of a file version are formatted only once, also across reruns.
+'''
+
+import hashlib
+import json
+import os
+from os.path import dirname
+import sqlite3
+import time
+
+
+# Increase it when the format steps in FormatSuppressionCommon change,
+# so that rows formatted by older format steps are not used anymore.
+FORMAT_STEPS_VERSION = 1
+
+
+class SuppressionCache():
+    '''
+    The cache is stored in a SQLite file, it can be shared by several processes.
+    A cache key is the blob hash plus a version, the version covers everything else the rows depend on,
+    eg,. the searched keywords and the numeric code map (see get_suppression_cache_version).
+    When the cache holds more than max_entries blobs, the least recently used ones are evicted.
+    The entries are counted once, then kept as a running count, and counted again only before an eviction.
+    '''
+
+    def __init__(self, cache_file, version, max_entries=2000000):
+        self.cache_file = cache_file
+        self.version = version
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.new_rows = {} # key -> rows, not written to the cache file yet
+        self.used_keys = set() # keys with hits, their last used time is not updated yet
+
+        if dirname(cache_file):
+            os.makedirs(dirname(cache_file), exist_ok=True)
+        self.connection = sqlite3.connect(cache_file, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS suppressions (key TEXT PRIMARY KEY, rows TEXT, last_used REAL)")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS suppressions_last_used ON suppressions (last_used)")
+        self.connection.commit()
+        # the entries in the cache file, new rows of other processes are only counted before an eviction
+        self.entries = self.count_entries()
+
+    def count_entries(self):
+        return self.connection.execute("SELECT COUNT(*) FROM suppressions").fetchone()[0]
+
+    def get_key(self, blob):
+        return f"{self.version}:{blob}"
+
+    def get(self, blob):
+        '''
+        Return the cached rows of a blob, or None if the blob is not cached.
+        '''
+        key = self.get_key(blob)
+        if key in self.new_rows:
+            self.hits += 1
+            return self.new_rows[key]
+
+        result = self.connection.execute("SELECT rows FROM suppressions WHERE key = ?", (key,)).fetchone()
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.used_keys.add(key)
+        return json.loads(result[0])
+
+    def put(self, blob, rows):
+        self.new_rows[self.get_key(blob)] = rows
+
+    def flush(self):
+        '''
+        Write new rows and last used times to the cache file, then evict entries if the cache is full.
+        '''
+        now = time.time()
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO suppressions VALUES (?, ?, ?)",
+                    [(key, json.dumps(rows), now) for key, rows in self.new_rows.items()])
+            self.connection.executemany("UPDATE suppressions SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in self.used_keys])
+        self.entries += len(self.new_rows) # new keys, the misses of get
+        self.new_rows = {}
+        self.used_keys = set()
+        self.evict()
+
+    def evict(self):
+        if self.entries <= self.max_entries:
+            return
+        self.entries = self.count_entries()
+        if self.entries > self.max_entries:
+            to_evict = self.entries - self.max_entries
+            with self.connection:
+                self.connection.execute("DELETE FROM suppressions WHERE key IN "
+                        "(SELECT key FROM suppressions ORDER BY last_used LIMIT ?)", (to_evict,))
+            self.evictions += to_evict
+            self.entries = self.max_entries
+
+    def get_stats(self):
+        entries = self.count_entries()
+        lookups = self.hits + self.misses
+        hit_rate = round(self.hits / lookups, 4) if lookups else 0
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": hit_rate,
+                "evictions": self.evictions, "entries": entries}
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+def get_suppression_cache_version(filter_keywords, comment_symbol, specific_numeric_maps):
+    '''
+    Return a short version string of everything the formatted rows of a blob depend on.
+    A changed numeric code map results in a new version, so it never returns stale rows.
+    '''
+    numeric_map_text = "\n".join(f"{specific},{numeric}" for specific, numeric in sorted(specific_numeric_maps.items()))
+    version_text = f"{FORMAT_STEPS_VERSION}|{filter_keywords}|{comment_symbol}|{numeric_map_text}"
+    return hashlib.sha1(version_text.encode()).hexdigest()[:12]
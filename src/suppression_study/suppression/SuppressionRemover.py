@@ -1,44 +1,106 @@
-from typing import Dict
+from typing import Dict, List
+import os
 import tempfile
 import shutil
-from os.path import join
+from os.path import isdir, join
+
+
+# a file system in memory, on Linux
+SHARED_MEMORY_DIR = "/dev/shm"
+
+
+def get_shadow_parent_dir():
+    '''
+    Return the directory for shadow files: SHARED_MEMORY_DIR if it is a writable directory,
+    otherwise the temporary directory.
+    '''
+    if isdir(SHARED_MEMORY_DIR) and os.access(SHARED_MEMORY_DIR, os.W_OK):
+        return SHARED_MEMORY_DIR
+    return tempfile.gettempdir()
 
 
 class SuppressionRemover():
     """
-    Removes one suppression at a time from a repository.
-    After each call of remove_suppression(), call restore()
-    to restore the repository to its original state.
+    Removes suppressions from a repository, one at a time (remove_suppression)
+    or a group at once (remove_suppressions).
+    After each call, call restore() to restore the repository to its original state.
+
+    The original content of each file is read once and kept in memory.
+    With overlay, the repository is not modified: the edited files are written to a shadow directory
+    (in memory, under /dev/shm, if available, see get_shadow_parent_dir), see get_shadow_files, eg,. for Mypy's --shadow-file.
+    Call close() to remove the shadow directory.
     """
 
-    def __init__(self, repo_dir):
+    def __init__(self, repo_dir, overlay=False):
         self.repo_dir = repo_dir
+        self.overlay = overlay
+        self.original_contents: Dict[str, str] = {} # path -> unmodified file, with its original line endings
+        self.modified_paths: List[str] = []
+        self.shadow_dir = None
+        self.shadow_files: Dict[str, str] = {} # path -> shadow file, for the current removal
 
     def remove_suppression(self, suppression):
-        self.file = join(self.repo_dir, suppression.path)
-
-        # save unmodified file for later
-        self.tmp_dir = tempfile.mkdtemp()
-        self.stored_file = join(self.tmp_dir, "orig_file.py")
-        shutil.copyfile(self.file, self.stored_file)
-
-        # remove the suppression
-        with open(self.file, "r") as f:
-            lines = f.readlines()
-
-        assert suppression.text in lines[suppression.line - 1]
-        lines[suppression.line - 1] = lines[suppression.line - 1].replace(suppression.text, "")
-        
-        # make sure to not leave trailing whitespace
-        # (which would trigger new warnings, e.g., by Pylint)
-        if lines[suppression.line - 1].endswith("\n"):
-            lines[suppression.line - 1] = lines[suppression.line - 1].rstrip() + "\n"
-        else: 
-            lines[suppression.line - 1] = lines[suppression.line - 1].rstrip()
-        
-        with open(self.file, "w") as f:
-            f.writelines(lines)
+        self.remove_suppressions([suppression])
+
+    def remove_suppressions(self, suppressions):
+        path_to_suppressions = {}
+        for suppression in suppressions:
+            path_to_suppressions.setdefault(suppression.path, []).append(suppression)
+
+        for path, suppressions_in_file in path_to_suppressions.items():
+            lines = self.get_original_lines(path)
+
+            # remove the suppressions
+            for suppression in suppressions_in_file:
+                assert suppression.text in lines[suppression.line - 1]
+                lines[suppression.line - 1] = lines[suppression.line - 1].replace(suppression.text, "")
+
+                # make sure to not leave trailing whitespace
+                # (which would trigger new warnings, e.g., by Pylint)
+                if lines[suppression.line - 1].endswith("\n"):
+                    lines[suppression.line - 1] = lines[suppression.line - 1].rstrip() + "\n"
+                else:
+                    lines[suppression.line - 1] = lines[suppression.line - 1].rstrip()
+
+            if self.overlay:
+                shadow_file = join(self.get_shadow_dir(), f"shadow_file_{len(self.shadow_files)}.py")
+                self.shadow_files[path] = shadow_file
+                file = shadow_file
+            else:
+                self.modified_paths.append(path)
+                file = join(self.repo_dir, path)
+            with open(file, "w") as f:
+                f.writelines(lines)
+
+    def get_original_lines(self, path):
+        # same lines as readlines() in universal newlines mode
+        if path not in self.original_contents:
+            with open(join(self.repo_dir, path), "r", newline="") as f:
+                self.original_contents[path] = f.read()
+        lines = self.original_contents[path].replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        return [line + "\n" for line in lines[:-1]] + ([lines[-1]] if lines[-1] else [])
+
+    def get_shadow_dir(self):
+        if self.shadow_dir is None:
+            self.shadow_dir = tempfile.mkdtemp(dir=get_shadow_parent_dir())
+        return self.shadow_dir
+
+    def get_shadow_files(self):
+        '''
+        With overlay, return the files with removed suppressions, as a dict: path in the repository -> shadow file.
+        '''
+        return dict(self.shadow_files)
 
     def restore(self):
-        shutil.copyfile(self.stored_file, self.file)
-        shutil.rmtree(self.tmp_dir)
\ No newline at end of file
+        for path in self.modified_paths:
+            with open(join(self.repo_dir, path), "w", newline="") as f:
+                f.write(self.original_contents[path])
+        self.modified_paths = []
+        for shadow_file in self.shadow_files.values():
+            os.remove(shadow_file)
+        self.shadow_files = {}
+
+    def close(self):
+        if self.shadow_dir is not None:
+            shutil.rmtree(self.shadow_dir, ignore_errors=True)
+            self.shadow_dir = None
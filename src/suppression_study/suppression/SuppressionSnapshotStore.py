@@ -0,0 +1,223 @@
+'''
+A single-file store of the suppressions of all commits of a repository.
+Instead of one "<commit>_suppression.csv" per commit, the store records a base snapshot
+plus the added and removed suppressions of every later commit.
+The legacy layout (a folder with one .csv file per commit) can be imported and exported.
+'''
+
+import argparse
+from collections import Counter
+import csv
+import os
+from os.path import dirname, exists, join
+import sqlite3
+
+from suppression_study.suppression.Suppression import Suppression, read_suppressions_from_file
+from suppression_study.utils.FunctionsCommon import get_commit_list
+
+
+parser = argparse.ArgumentParser(description="Import or export a suppression snapshot store")
+parser.add_argument("--store", help="SQLite file of the snapshot store", required=True)
+parser.add_argument("--commit_id", help="The .csv file which stores a list of commit IDs, newest first, needed to import")
+parser.add_argument("--import_dir", help="Folder with one <commit>_suppression.csv file per commit to add to the store")
+parser.add_argument("--export_dir", help="Folder where to write one <commit>_suppression.csv file per commit")
+
+# change kinds in the changes table
+SNAPSHOT_ROW = 0
+ADDED = 1
+REMOVED = -1
+
+
+class SuppressionSnapshotStore():
+    '''
+    Commits are appended from oldest to newest. A commit either has a suppression set (maybe empty),
+    or has none, like a commit without a "<commit>_suppression.csv" file in the legacy layout.
+    Every checkpoint_interval commits, the full suppression set is stored instead of a delta,
+    so that reading a single commit replays at most checkpoint_interval deltas.
+    '''
+
+    def __init__(self, store_file, checkpoint_interval=100):
+        self.store_file = store_file
+        self.checkpoint_interval = checkpoint_interval
+
+        self.path_ids = None # path -> id, loaded when needed
+        self.last_position = None
+        self.last_state = None # the suppression set of the last commit, loaded when needed
+
+        if dirname(store_file):
+            os.makedirs(dirname(store_file), exist_ok=True)
+        self.connection = sqlite3.connect(store_file)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS commits (position INTEGER PRIMARY KEY, commit_id TEXT UNIQUE, "
+            "has_suppressions INTEGER, is_checkpoint INTEGER)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS paths (path_id INTEGER PRIMARY KEY, path TEXT UNIQUE)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS changes (position INTEGER, change INTEGER, path_id INTEGER, text TEXT, line INTEGER)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS changes_position ON changes (position)")
+        self.connection.commit()
+
+    def get_commits(self):
+        '''
+        Return all commits in the store, from oldest to newest.
+        '''
+        return [row[0] for row in self.connection.execute("SELECT commit_id FROM commits ORDER BY position")]
+
+    def __contains__(self, commit):
+        return self.get_position(commit) is not None
+
+    def get_position(self, commit):
+        result = self.connection.execute("SELECT position FROM commits WHERE commit_id = ?", (commit,)).fetchone()
+        return None if result is None else result[0]
+
+    def get_path_id(self, path):
+        if self.path_ids is None:
+            self.path_ids = {path: path_id for path_id, path in self.connection.execute("SELECT path_id, path FROM paths")}
+        if path not in self.path_ids:
+            cursor = self.connection.execute("INSERT INTO paths (path) VALUES (?)", (path,))
+            self.path_ids[path] = cursor.lastrowid
+        return self.path_ids[path]
+
+    def append(self, commit, suppressions):
+        '''
+        Add the suppressions of commit, a commit newer than all commits in the store.
+        suppressions: a list of Suppression, or None if the commit has no suppression set.
+        '''
+        if commit in self:
+            raise ValueError(f"Commit {commit} is already in the snapshot store")
+        if self.last_state is None:
+            self.last_position = self.connection.execute("SELECT MAX(position) FROM commits").fetchone()[0]
+            self.last_state = Counter()
+            if self.last_position is not None:
+                last_commit = self.get_commits()[-1]
+                self.last_state = Counter(get_suppression_key(s) for s in self.get_suppressions(last_commit) or [])
+
+        position = 0 if self.last_position is None else self.last_position + 1
+        state = Counter(get_suppression_key(s) for s in suppressions or [])
+        is_checkpoint = position % self.checkpoint_interval == 0
+
+        if is_checkpoint:
+            changes = [(SNAPSHOT_ROW, key) for key in self.expand(state)]
+        else:
+            changes = [(REMOVED, key) for key in self.expand(self.last_state - state)]
+            changes.extend((ADDED, key) for key in self.expand(state - self.last_state))
+
+        self.connection.execute("INSERT INTO commits VALUES (?, ?, ?, ?)",
+                (position, commit, suppressions is not None, is_checkpoint))
+        self.connection.executemany("INSERT INTO changes VALUES (?, ?, ?, ?, ?)",
+                [(position, change, self.get_path_id(path), text, line) for change, (path, text, line) in changes])
+        self.last_position = position
+        self.last_state = state
+
+    def expand(self, state):
+        # every suppression as often as it occurs, sorted by path and line, like the scanners write the .csv files,
+        # the row order of an imported .csv file is not kept, ExtractHistory doesn't depend on it (see get_history_order)
+        keys = sorted(state, key=lambda key: (key[0], key[2]))
+        return [key for key in keys for _ in range(state[key])]
+
+    def iter_suppressions(self, from_commit=None):
+        '''
+        Yield (commit, a list of Suppression or None) for all commits from oldest to newest,
+        or for the commits starting at from_commit.
+        The store is read in a single pass, starting at the last checkpoint before from_commit.
+        '''
+        start_position = 0
+        if from_commit is not None:
+            start_position = self.get_position(from_commit)
+            if start_position is None:
+                raise ValueError(f"Commit {from_commit} is not in the snapshot store")
+        checkpoint = self.connection.execute(
+            "SELECT MAX(position) FROM commits WHERE is_checkpoint AND position <= ?", (start_position,)).fetchone()[0]
+        if checkpoint is None:
+            return
+
+        commit_rows = self.connection.execute("SELECT position, commit_id, has_suppressions, is_checkpoint "
+                "FROM commits WHERE position >= ? ORDER BY position", (checkpoint,))
+        change_rows = self.connection.execute("SELECT position, change, path, text, line "
+                "FROM changes JOIN paths USING (path_id) WHERE position >= ? ORDER BY position, changes.rowid", (checkpoint,))
+
+        state = Counter()
+        next_change = next(change_rows, None)
+        for position, commit, has_suppressions, is_checkpoint in commit_rows:
+            if is_checkpoint:
+                state = Counter()
+            while next_change is not None and next_change[0] == position:
+                _, change, path, text, line = next_change
+                if change == REMOVED:
+                    state[(path, text, line)] -= 1
+                    if not state[(path, text, line)]:
+                        del state[(path, text, line)]
+                else:
+                    state[(path, text, line)] += 1
+                next_change = next(change_rows, None)
+
+            if position >= start_position:
+                suppressions = None
+                if has_suppressions:
+                    suppressions = [Suppression(path, text, line) for path, text, line in self.expand(state)]
+                yield commit, suppressions
+
+    def iter_suppressions_of(self, commits):
+        '''
+        Yield the suppressions of commits (oldest to newest, a subsequence of the commits in the store),
+        a list of Suppression or None, in a single pass over the store.
+        '''
+        if not commits:
+            return
+        commit_index = 0
+        for commit, suppressions in self.iter_suppressions(commits[0]):
+            if commit == commits[commit_index]:
+                yield suppressions
+                commit_index += 1
+                if commit_index == len(commits):
+                    return
+        raise ValueError(f"Commit {commits[commit_index]} is not in the snapshot store")
+
+    def get_suppressions(self, commit):
+        '''
+        Return the suppressions of commit, a list of Suppression or None.
+        '''
+        return next(self.iter_suppressions(commit))[1]
+
+    def add_csv_folder(self, csv_folder, commits):
+        '''
+        Add the commits (oldest to newest) from the legacy layout: one <commit>_suppression.csv file per commit.
+        '''
+        for commit in commits:
+            csv_file = join(csv_folder, f"{commit}_suppression.csv")
+            self.append(commit, read_suppressions_from_file(csv_file) if exists(csv_file) else None)
+        self.flush()
+
+    def export_to_csv_folder(self, csv_folder):
+        '''
+        Write the legacy layout: one <commit>_suppression.csv file per commit that has a suppression set.
+        '''
+        os.makedirs(csv_folder, exist_ok=True)
+        for commit, suppressions in self.iter_suppressions():
+            if suppressions is not None:
+                with open(join(csv_folder, f"{commit}_suppression.csv"), "w") as f:
+                    writer = csv.writer(f)
+                    for suppression in suppressions:
+                        writer.writerow([suppression.path, suppression.text, suppression.line])
+
+    def flush(self):
+        self.connection.commit()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+def get_suppression_key(suppression):
+    return (suppression.path, suppression.text, suppression.line)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    store = SuppressionSnapshotStore(args.store)
+    if args.import_dir:
+        if not args.commit_id:
+            raise ValueError("--commit_id is needed to import")
+        store.add_csv_folder(args.import_dir, list(reversed(get_commit_list(args.commit_id))))
+    if args.export_dir:
+        store.export_to_csv_folder(args.export_dir)
+    store.close()
@@ -4,6 +4,8 @@ import json
 import os
 from os.path import join
 import subprocess
+from suppression_study.evolution.ExtractHistory import get_history_order
+from suppression_study.evolution.SuppressionLineTracker import SuppressionLineTracker
 from suppression_study.suppression.intention.GetSuppressionDeleteHistories import GetSuppressionDeleteHistories
 from suppression_study.suppression.intention.GitLogFromFinalStatus import GitLogFromFinalStatus
 from suppression_study.evolution.Select1000Commits import select_1000_commits
@@ -17,11 +19,13 @@ parser.add_argument(
     "--selected_1000_commits_csv", help="Expected .csv file, which stores selected commit IDs", required=True
 )
 parser.add_argument("--results_dir", help="Directory where to put the results", required=True)
+parser.add_argument("--line_tracking", help="Find the add and delete events and the middle status chains of all suppressions "
+                    "at once, by moving their lines through the diffs of the selected commits, oldest to newest", action="store_true")
 
 
 def sort_by_date(all_histories):
     # sort the histories events by datetime
-    all_histories.sort(key=lambda x: x[list(x.keys())[0]][0]["date"])
+    all_histories.sort(key=get_history_order)
     for idx, x in enumerate(all_histories):
         assert len(x) == 1
         old_suppression_id = list(x.keys())[0]
@@ -34,7 +38,7 @@ def write_all_histories_to_json(history_json_file, all_histories):
     with open(history_json_file, "w", newline="\n") as ds:
         json.dump(all_histories, ds, indent=4, ensure_ascii=False)
 
-def main(repo_dir, selected_1000_commits_csv, results_dir):
+def main(repo_dir, selected_1000_commits_csv, results_dir, line_tracking=False):
     # Get commit list and suppression for selected commits.
     if not os.path.exists(selected_1000_commits_csv):
         select_1000_commits(repo_dir, selected_1000_commits_csv)
@@ -72,20 +76,25 @@ def main(repo_dir, selected_1000_commits_csv, results_dir):
     # change commits and dates lists to from oldest to newest
     selected_1000_commits_list.reverse()
     selected_1000_dates_list.reverse()
-    delete_event_suppression_commit_list, middle_line_number_chain_remain, middle_line_number_chain_delete = GetSuppressionDeleteHistories(
-        repo_dir, selected_1000_commits_list, selected_1000_dates_list, suppression_result, specific_numeric_maps
-    ).track_commits_forward()
+    if line_tracking:
+        histories = SuppressionLineTracker(repo_dir, selected_1000_commits_list, selected_1000_dates_list,
+                suppression_result, specific_numeric_maps).track_histories(middle_status_chain=True)
+    else:
+        delete_event_suppression_commit_list, middle_line_number_chain_remain, middle_line_number_chain_delete = GetSuppressionDeleteHistories(
+            repo_dir, selected_1000_commits_list, selected_1000_dates_list, suppression_result, specific_numeric_maps
+        ).track_commits_forward()
 
-    # get add events (for both delete and never removed suppressions)
-    # finally get the histories: 1) add event 2) add delete events
-    evolution_init = GitLogFromFinalStatus(repo_dir, never_removed_suppressions, 
-            delete_event_suppression_commit_list, specific_numeric_maps)
-    only_add_event_histories = evolution_init.git_log_never_removed_suppression(last_commit_with_suppression, middle_line_number_chain_remain)
-    add_delete_histories = evolution_init.git_log_deleted_suppression(middle_line_number_chain_delete)
+        # get add events (for both delete and never removed suppressions)
+        # finally get the histories: 1) add event 2) add delete events
+        evolution_init = GitLogFromFinalStatus(repo_dir, never_removed_suppressions, 
+                delete_event_suppression_commit_list, specific_numeric_maps)
+        only_add_event_histories = evolution_init.git_log_never_removed_suppression(last_commit_with_suppression, middle_line_number_chain_remain)
+        add_delete_histories = evolution_init.git_log_deleted_suppression(middle_line_number_chain_delete)
+        histories = only_add_event_histories + add_delete_histories
 
     all_histories = []
     history_index = 0
-    for suppression_history in (only_add_event_histories + add_delete_histories):
+    for suppression_history in histories:
         all_histories.append({f"# S{history_index}" : suppression_history})
         history_index+=1
 
@@ -100,7 +109,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
     print("Running...")
     start_time = datetime.datetime.now()
-    main(args.repo_dir, args.selected_1000_commits_csv, args.results_dir)
+    main(args.repo_dir, args.selected_1000_commits_csv, args.results_dir, args.line_tracking)
     end_time = datetime.datetime.now()
     executing_time = (end_time - start_time).seconds
     print(f"Executing time: {executing_time} seconds")
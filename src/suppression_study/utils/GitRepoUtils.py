@@ -5,6 +5,8 @@ Helper functions that operate on a Git repositories.
 from git.repo import Repo
 from os import sep
 from os.path import normpath
+import shutil
+import tempfile
 
 
 def get_name_of_main_branch(repo: Repo):
@@ -35,3 +37,35 @@ def get_current_commit(repo_dir):
 def get_files_changed_by_commit(repo: Repo, commit: str):
     files_dict = repo.commit(commit).stats.files
     return list(files_dict.keys())
+
+
+def add_worktree(repo_dir, commit_id):
+    """
+    Checks out the commit in a new, detached worktree of the repository, in a temporary directory.
+    Returns the directory, remove it with remove_worktree.
+    """
+    worktree_dir = tempfile.mkdtemp()
+    added = False
+    try:
+        Repo(repo_dir).git.worktree("add", "--detach", "--force", worktree_dir, commit_id)
+        added = True
+    finally:
+        if not added:
+            remove_worktree_dir(repo_dir, worktree_dir)
+    return worktree_dir
+
+
+def remove_worktree(repo_dir, worktree_dir):
+    """
+    Removes a worktree of add_worktree, its directory and its registration in the repository, even if git fails.
+    """
+    try:
+        Repo(repo_dir).git.worktree("remove", "--force", worktree_dir)
+    finally:
+        remove_worktree_dir(repo_dir, worktree_dir)
+
+
+def remove_worktree_dir(repo_dir, worktree_dir):
+    shutil.rmtree(worktree_dir, ignore_errors=True)
+    # forget the worktrees whose directories are gone, eg,. after a failed "git worktree add" or "remove"
+    Repo(repo_dir).git.worktree("prune")
@@ -0,0 +1,100 @@
+'''
+Attributes Mypy warnings to the "# type: ignore" suppressions that may suppress them,
+by file, line and error code, so that many suppressions can be removed in one Mypy run
+(see compute_mapping_by_removing_suppressions in WarningSuppressionMapper).
+
+The attribution over-approximates: a suppression is a candidate for a warning
+if Mypy may apply it to the warning, eg,.
+    x = f(a,  # type: ignore[arg-type]
+          b)
+is a candidate for an arg-type warning on either line, because Mypy applies an ignore comment
+on any line of the expression an error is reported for, and to a FuncDef/ClassDef error
+on any line from the first decorator to the "def"/"class" line.
+'''
+
+import ast
+import re
+from os.path import join
+
+from mypy.errorcodes import error_codes
+
+
+def get_statement_regions(file):
+    '''
+    Return a dict: line -> (first line, last line) of the statements that include the line,
+    for compound statements (eg,. def, if) only the header, from the first decorator to the line before the body.
+    None if the file can't be parsed.
+    '''
+    try:
+        with open(file, "r") as f:
+            tree = ast.parse(f.read())
+    except (SyntaxError, ValueError, UnicodeDecodeError):
+        return None
+
+    regions = {}
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.stmt):
+            continue
+        body = getattr(node, "body", None)
+        if isinstance(body, list) and body:
+            first_line = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+            last_line = max(node.lineno, body[0].lineno - 1)
+        else:
+            first_line = node.lineno
+            last_line = node.end_lineno
+        # statements may share lines, eg,. "a = f(\n 1); b = 2", take the union
+        for line in range(first_line, last_line + 1):
+            if line in regions:
+                first_line = min(first_line, regions[line][0])
+                last_line = max(last_line, regions[line][1])
+        for line in range(first_line, last_line + 1):
+            regions[line] = (first_line, last_line)
+    return regions
+
+
+def get_ignored_codes(suppression):
+    '''
+    Return the error codes of a "# type: ignore[code, ...]" suppression, None if it ignores all errors.
+    '''
+    m = re.match(r"# type: ?ignore\[([^\]]*)\]", suppression.text)
+    if m is None:
+        return None
+    return [code.strip() for code in m.group(1).split(",") if code.strip()]
+
+
+def may_ignore_code(suppression, kind):
+    codes = get_ignored_codes(suppression)
+    if codes is None or kind not in error_codes:
+        # ignores all errors, or the kind isn't an error code, eg,. the message of an error without code
+        return True
+    parent_code = error_codes[kind].sub_code_of
+    return kind in codes or (parent_code is not None and parent_code.code in codes)
+
+
+class SuppressionAttribution():
+    '''
+    Find the candidate suppressions of warnings in a repository, the files are parsed on first use.
+    '''
+
+    def __init__(self, repo_dir):
+        self.repo_dir = repo_dir
+        self.path_to_regions = {}
+
+    def get_regions(self, path):
+        if path not in self.path_to_regions:
+            self.path_to_regions[path] = get_statement_regions(join(self.repo_dir, path))
+        return self.path_to_regions[path]
+
+    def may_suppress(self, suppression, warning):
+        if suppression.path != warning.path or not may_ignore_code(suppression, warning.kind):
+            return False
+        regions = self.get_regions(suppression.path)
+        if regions is None or warning.line not in regions or suppression.line not in regions:
+            # unknown file structure, or a suppression outside of statements,
+            # eg,. a "# type: ignore" at the top of a module, which ignores all errors in the module
+            return True
+        first_line, last_line = regions[warning.line]
+        return first_line <= suppression.line <= last_line
+
+    def get_candidates(self, suppressions, warning):
+        return [s for s in suppressions if self.may_suppress(s, warning)]
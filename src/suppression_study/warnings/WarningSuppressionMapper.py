@@ -2,19 +2,27 @@
 For a given commit, computes a mapping between warnings and suppressions.
 '''
 
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import List
 import argparse
 import os
-from os.path import join
+from os.path import join, normpath
+import shutil
+import subprocess
+import tempfile
+from git.exc import GitCommandError
 from git.repo import Repo
-from suppression_study.suppression.GrepSuppressionPython import GrepSuppressionPython
+from suppression_study.suppression.GrepSuppressionPython import iter_suppressions
 from suppression_study.checkers.GetPylintWarnings import main as get_pylint_warnings
-from suppression_study.checkers.GetMypyWarnings import main as get_mypy_warnings
+from suppression_study.checkers.GetMypyWarnings import main as get_mypy_warnings, get_source_files as get_mypy_source_files
+from suppression_study.checkers.MypyDaemon import MypyDaemon
 from suppression_study.suppression.SuppressionRemover import SuppressionRemover
 from suppression_study.warnings.Warning import read_warning_from_file
+from suppression_study.warnings.SuppressionAttribution import SuppressionAttribution, get_ignored_codes
 from suppression_study.suppression.Suppression import Suppression, read_suppressions_from_file
 from suppression_study.checkers.GetSuppressedPylintWarnings import main as get_suppressed_pylint_warnings
 from suppression_study.warnings.WarningSuppressionUtil import write_mapping_to_csv, write_suppressed_warnings_to_csv, write_suppression_to_csv
+from suppression_study.utils.GitRepoUtils import add_worktree, remove_worktree
 
 
 parser = argparse.ArgumentParser(
@@ -31,6 +39,21 @@ parser.add_argument("--suppressions_file",
                     help="File with suppressions to use (if not given, will compute it)")
 parser.add_argument(
     "--warnings_file", help="File with warnings to use (if not given, will compute it)")
+parser.add_argument("--unused_ignores", action="store_true",
+                    help="For mypy, take the useless suppressions from one run with --warn-unused-ignores, "
+                    "and remove only the other suppressions")
+parser.add_argument("--mypy_daemon", action="store_true",
+                    help="For mypy, keep a mypy daemon alive while removing suppressions, each run only rechecks the changes")
+parser.add_argument("--full_recheck", action="store_true",
+                    help="For mypy, check all files after removing suppressions, not only the files with removed suppressions")
+parser.add_argument("--overlay", action="store_true",
+                    help="For mypy, don't modify the repository when removing suppressions, "
+                    "mypy checks edited copies of the files instead (--shadow-file), not with --mypy_daemon")
+parser.add_argument("--workers", type=int, default=1,
+                    help="For mypy, number of parallel checker runs while removing suppressions, "
+                    "each in its own git worktree of the commit (default: 1, in the repository itself)")
+parser.add_argument("--one_by_one", action="store_true",
+                    help="For mypy, remove one suppression per checker run instead of groups of suppressions (slower, same results)")
 
 
 def get_all_suppressions(repo_dir, commit_id, results_dir):
@@ -40,39 +63,173 @@ def get_all_suppressions(repo_dir, commit_id, results_dir):
     if os.path.exists(suppression_file):
         suppressions = read_suppressions_from_file(suppression_file)
     else:
-        # find suppressions
-        grep = GrepSuppressionPython(repo_dir, commit_id, results_dir)
-        grep.grep_suppression_for_specific_commit()
-        suppression_file = join(results_dir, f"{commit_id}_suppression.csv")
-        suppressions = read_suppressions_from_file(suppression_file)
+        # find suppressions, in memory
+        suppressions = list(iter_suppressions(repo_dir, commit_id))
     return suppressions
 
 
-def get_all_warnings(repo_dir, commit_id, checker, results_dir):
+def get_all_warnings(repo_dir, commit_id, checker, results_dir, pylint_worker=None, unused_ignores=False, mypy_daemon=None,
+        files=None, shadow_files=None):
     # run checkers
     if checker == "pylint":
-        get_pylint_warnings(repo_dir, commit_id, results_dir)
+        get_pylint_warnings(repo_dir, commit_id, results_dir, pylint_worker)
     elif checker == "mypy":
-        get_mypy_warnings(repo_dir, commit_id, results_dir)
+        get_mypy_warnings(repo_dir, commit_id, results_dir, unused_ignores, mypy_daemon, files, shadow_files)
 
     # read them into a list
-    warning_file = join(results_dir, "check_results", checker, f"{commit_id}_warnings.csv")
-    warnings = read_warning_from_file(warning_file)
+    warnings = read_warning_from_file(get_warning_file(commit_id, checker, results_dir))
     return warnings
 
 
-def compute_mapping_by_removing_suppressions(repo_dir, suppressions, original_warnings, commit_id, checker, results_dir):
-    # remove one suppression at a time and run the checker,
-    # to see what warning(s) the suppression suppresses
-    remover = SuppressionRemover(repo_dir)
+def get_warning_file(commit_id, checker, results_dir):
+    return join(results_dir, "checker_results", checker, f"{commit_id}_warnings.csv")
+
+
+class SuppressionRemovalChecker():
+    '''
+    Removes suppressions from the checkout of a commit, runs the checker, and returns the new warnings.
+
+    Removing a "# type: ignore" changes only the warnings in its own file, the types of the module stay the same.
+    So, for mypy, only the files with removed suppressions are checked again (mypy follows their imports),
+    unless full_recheck is set, or mypy can't tell which files "mypy ./" checks.
+
+    With overlay, for mypy, the checkout stays unmodified, mypy checks edited copies of the files instead.
+    Call close() when done.
+    '''
+
+    def __init__(self, repo_dir, original_warnings, commit_id, checker, results_dir, unused_ignores=False,
+            mypy_daemon=None, full_recheck=False, overlay=False):
+        self.repo_dir = repo_dir
+        # the repository with the original checkout, where the files have no removed suppressions between checker runs
+        self.main_repo_dir = repo_dir
+        self.original_warnings = original_warnings
+        self.commit_id = commit_id
+        self.checker = checker
+        self.results_dir = results_dir
+        self.unused_ignores = unused_ignores
+        self.mypy_daemon = mypy_daemon
+        # the daemon only sees the files in the repository
+        self.remover = SuppressionRemover(repo_dir, overlay and checker == "mypy" and mypy_daemon is None)
+        # the files the checker checks in a full run, None to always run it on all files
+        self.checked_files = None
+        if checker == "mypy" and not full_recheck:
+            self.checked_files = get_mypy_source_files(repo_dir)
+
+    def get_new_warnings(self, suppressions):
+        files = None
+        if self.checked_files is not None:
+            files = sorted({normpath(s.path) for s in suppressions})
+            if not all(file in self.checked_files for file in files):
+                files = None # eg,. an excluded file, mypy may still check it when another file imports it
+        self.remover.remove_suppressions(suppressions)
+        try:
+            warnings = get_all_warnings(self.repo_dir, self.commit_id, self.checker, self.results_dir,
+                                        unused_ignores=self.unused_ignores, mypy_daemon=self.mypy_daemon, files=files,
+                                        shadow_files=self.remover.get_shadow_files())
+        finally:
+            self.remover.restore()
+        if files is not None:
+            # the warnings in the other files stay the same
+            warnings = {w for w in warnings if normpath(w.path) in files}
+        return warnings - self.original_warnings
+
+    def close(self):
+        self.remover.close()
+
+
+class WorktreeRemovalChecker(SuppressionRemovalChecker):
+    '''
+    A SuppressionRemovalChecker for one of several parallel workers:
+    it works on its own worktree of the commit, with its own results directory and mypy daemon (if any),
+    so that workers don't modify or overwrite each other's files.
+    '''
+
+    def __init__(self, repo_dir, original_warnings, commit_id, checker, results_dir, unused_ignores=False,
+            mypy_daemon=None, full_recheck=False, overlay=False):
+        self.worktree_dir = add_worktree(repo_dir, commit_id)
+        self.worker_results_dir = None
+        self.worker_daemon = None
+        self.remover = None
+        initialized = False
+        try:
+            self.worker_results_dir = tempfile.mkdtemp()
+            self.worker_daemon = MypyDaemon(mypy_daemon.timeout) if mypy_daemon is not None else None
+            super().__init__(self.worktree_dir, original_warnings, commit_id, checker, self.worker_results_dir,
+                             unused_ignores, self.worker_daemon, full_recheck, overlay)
+            initialized = True
+        finally:
+            self.main_repo_dir = repo_dir
+            if not initialized:
+                self.close()
+
+    def close(self):
+        # the worktree is removed in any case, a worktree left behind stays registered in the repository
+        try:
+            if self.remover is not None:
+                super().close()
+            if self.worker_daemon is not None:
+                self.worker_daemon.close()
+        finally:
+            remove_worktree(self.main_repo_dir, self.worktree_dir)
+            if self.worker_results_dir is not None:
+                shutil.rmtree(self.worker_results_dir, ignore_errors=True)
+
+
+def create_removal_checkers(workers, repo_dir, *args):
+    '''
+    Return one SuppressionRemovalChecker on repo_dir, or, with several workers, one WorktreeRemovalChecker per worker.
+    args are the other arguments of SuppressionRemovalChecker.
+    '''
+    if workers <= 1:
+        return [SuppressionRemovalChecker(repo_dir, *args)]
+    removal_checkers = []
+    try:
+        for _ in range(workers):
+            removal_checkers.append(WorktreeRemovalChecker(repo_dir, *args))
+    except (GitCommandError, subprocess.CalledProcessError, OSError) as e:
+        # eg,. git can't add a worktree, or no space left for the worktrees
+        print(f"Failed to create worker {len(removal_checkers) + 1} of {workers} in {repo_dir}: {e}")
+        close_removal_checkers(removal_checkers)
+        raise
+    return removal_checkers
+
+
+def close_removal_checkers(removal_checkers):
+    # close all of them, even if closing one fails
+    if removal_checkers:
+        try:
+            removal_checkers[0].close()
+        finally:
+            close_removal_checkers(removal_checkers[1:])
+
+
+def compute_mapping_by_removing_suppressions(repo_dir, suppressions, original_warnings, commit_id, checker, results_dir,
+        one_by_one=False, reported_useless_suppressions=None, mypy_daemon=None, full_recheck=False, overlay=False,
+        workers=1):
+    # remove suppressions and run the checker,
+    # to see what warning(s) each suppression suppresses
+    # with reported_useless_suppressions (see GetMypyWarnings.read_useless_suppressions),
+    # those are known to be useless, and the checker runs with unused_ignores, like the run that reported them
+    unused_ignores = reported_useless_suppressions is not None
+    suppressions_to_remove = suppressions
+    if unused_ignores:
+        suppressions_to_remove = [s for s in suppressions if not is_reported_useless(s, reported_useless_suppressions)]
+    removal_checkers = create_removal_checkers(workers, repo_dir, original_warnings, commit_id, checker, results_dir,
+                                               unused_ignores, mypy_daemon, full_recheck, overlay)
+    try:
+        if one_by_one:
+            suppression_to_warnings = find_suppressed_warnings_one_by_one(suppressions_to_remove, removal_checkers)
+        else:
+            suppression_to_warnings = find_suppressed_warnings_by_group_testing(suppressions_to_remove, removal_checkers)
+    finally:
+        close_removal_checkers(removal_checkers)
+
     suppression_warning_pairs = []
     all_suppressed_warnings = set()
     useful_suppressions = []
     useless_suppressions = []
     for suppression in suppressions:
-        remover.remove_suppression(suppression)
-        warnings = get_all_warnings(repo_dir, commit_id, checker, results_dir)
-        suppressed_warnings = warnings - original_warnings
+        suppressed_warnings = suppression_to_warnings.get(suppression, set())
         for suppressed_warning in suppressed_warnings:
             suppression_warning_pairs.append((suppression, suppressed_warning))
         if len(suppressed_warnings) == 0:
@@ -81,14 +238,130 @@ def compute_mapping_by_removing_suppressions(repo_dir, suppressions, original_wa
         else:
             useful_suppressions.append(suppression)
         all_suppressed_warnings.update(suppressed_warnings)
-        remover.restore()
     return suppression_warning_pairs, all_suppressed_warnings, useful_suppressions, useless_suppressions
 
 
-def compute_mapping_via_pylint_support(repo_dir, suppressions, commit_id, relevant_files, results_dir):
+def is_reported_useless(suppression, reported_useless_suppressions):
+    '''
+    A suppression is useless if the checker reports an unused comment on its line
+    for all of the error codes it ignores, or without error codes, ie,. the whole comment.
+    An unused comment doesn't suppress anything, removing it can't reveal a warning.
+    '''
+    codes = get_ignored_codes(suppression)
+    for reported in reported_useless_suppressions:
+        if reported.path == suppression.path and reported.line == suppression.line:
+            reported_codes = get_ignored_codes(reported)
+            if reported_codes is None or (codes is not None and set(codes) <= set(reported_codes)):
+                return True
+    return False
+
+
+def check_groups(groups, removal_checkers, handle_new_warnings):
+    '''
+    Remove each group of suppressions (popped from the end of groups) and get the new warnings,
+    with one group per removal checker at a time, in parallel.
+    handle_new_warnings(group, new_warnings) is called in this thread, and may add more groups to check.
+    The new warnings of a group don't depend on the other groups,
+    so the results are the same for any number of removal checkers, in any order.
+    '''
+    free_checkers = list(removal_checkers)
+    pending = {} # future -> (group, removal checker)
+    with ThreadPoolExecutor(len(removal_checkers)) as executor:
+        while groups or pending:
+            while groups and free_checkers:
+                group = groups.pop()
+                removal_checker = free_checkers.pop()
+                pending[executor.submit(removal_checker.get_new_warnings, group)] = (group, removal_checker)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                group, removal_checker = pending.pop(future)
+                free_checkers.append(removal_checker)
+                handle_new_warnings(group, future.result())
+
+
+def find_suppressed_warnings_one_by_one(suppressions, removal_checkers):
+    # one checker run per suppression
+    suppression_to_warnings = {}
+
+    def handle_new_warnings(group, new_warnings):
+        suppression_to_warnings[group[0]] = new_warnings
+
+    check_groups([[suppression] for suppression in reversed(suppressions)], removal_checkers, handle_new_warnings)
+    return suppression_to_warnings
+
+
+def find_suppressed_warnings_by_group_testing(suppressions, removal_checkers):
+    '''
+    Same result as find_suppressed_warnings_one_by_one, with fewer checker runs:
+    remove a group of suppressions at once, attribute each new warning to the suppressions of the group
+    that may suppress it (same file, same statement, matching error code, see SuppressionAttribution).
+    A warning with a single candidate is suppressed by that suppression only,
+    the candidates of the other warnings are checked again, in two halves.
+
+    A warning shows up when removing one suppression iff that suppression is the only one suppressing it,
+    and when removing a group iff all suppressions suppressing it are in the group.
+    So a group without new warnings has only useless suppressions.
+    '''
+    attribution = SuppressionAttribution(removal_checkers[0].main_repo_dir)
+    suppression_to_warnings = {}
+    groups = [list(dict.fromkeys(suppressions))] if suppressions else []
+
+    def handle_new_warnings(group, new_warnings):
+        if len(group) == 1:
+            suppression_to_warnings[group[0]] = new_warnings
+            return
+
+        ambiguous_candidates = []
+        group_to_warnings = {suppression: set() for suppression in group}
+        for warning in new_warnings:
+            candidates = attribution.get_candidates(group, warning)
+            if len(candidates) == 1:
+                group_to_warnings[candidates[0]].add(warning)
+            else:
+                # no candidate: a warning that the attribution can't explain, check each suppression
+                ambiguous_candidates.append(candidates if candidates else group)
+
+        first_half, second_half = split_ambiguous_suppressions(group, ambiguous_candidates)
+        for suppression in group:
+            if suppression not in first_half and suppression not in second_half:
+                suppression_to_warnings[suppression] = group_to_warnings[suppression]
+        groups.extend([half for half in [second_half, first_half] if half])
+
+    check_groups(groups, removal_checkers, handle_new_warnings)
+    return suppression_to_warnings
+
+
+def split_ambiguous_suppressions(group, ambiguous_candidates):
+    '''
+    Split the suppressions that are candidates of an ambiguous warning into two groups, in the order of group.
+    Candidates of the same warnings (transitively) are a cluster, and each cluster is split in half,
+    so that the clusters, eg,. in different files, are checked together.
+    '''
+    suppression_to_cluster = {}
+    for candidates in ambiguous_candidates:
+        cluster = []
+        for suppression in candidates:
+            other_cluster = suppression_to_cluster.get(suppression, [suppression])
+            if other_cluster is not cluster:
+                cluster.extend(other_cluster)
+                for other_suppression in other_cluster:
+                    suppression_to_cluster[other_suppression] = cluster
+
+    first_half = set()
+    second_half = set()
+    clusters = {id(cluster): cluster for cluster in suppression_to_cluster.values()}
+    for cluster in clusters.values():
+        ordered_cluster = [suppression for suppression in group if suppression in cluster]
+        middle = (len(ordered_cluster) + 1) // 2
+        first_half.update(ordered_cluster[:middle])
+        second_half.update(ordered_cluster[middle:])
+    return [s for s in group if s in first_half], [s for s in group if s in second_half]
+
+
+def compute_mapping_via_pylint_support(repo_dir, suppressions, commit_id, relevant_files, results_dir, pylint_worker=None):
     # get suppression-warning pairs from Pylint
     suppression_warning_pairs = get_suppressed_pylint_warnings(
-        repo_dir, commit_id, results_dir, relevant_files)
+        repo_dir, commit_id, results_dir, relevant_files, pylint_worker)
 
     all_suppressed_warnings = set()
     useful_suppressions = set() # to write to file
@@ -115,7 +388,8 @@ def compute_mapping_via_pylint_support(repo_dir, suppressions, commit_id, releva
 
 
 def main(repo_dir, commit_id, checker, results_dir, suppressions_file=None, \
-        warnings_file=None, relevant_files: List[str] = None, file_specific=None):
+        warnings_file=None, relevant_files: List[str] = None, file_specific=None, pylint_worker=None, one_by_one=False,
+        unused_ignores=False, mypy_daemon=None, full_recheck=False, overlay=False, workers=1):
     # checkout the commit
     target_repo = Repo(repo_dir)
     target_repo.git.checkout(commit_id, force=True)
@@ -133,18 +407,23 @@ def main(repo_dir, commit_id, checker, results_dir, suppressions_file=None, \
 
     if checker == "pylint":
         suppression_warning_pairs, all_suppressed_warnings, useful_suppressions, useless_suppressions = compute_mapping_via_pylint_support(
-            repo_dir, suppressions, commit_id, relevant_files, results_dir)
+            repo_dir, suppressions, commit_id, relevant_files, results_dir, pylint_worker)
     elif checker == "mypy":
-        # TODO any way to avoid this slow approach for mypy?
-
+        reported_useless_suppressions = None
+        if unused_ignores:
+            # one run for the warnings and the useless suppressions
+            reported_useless_suppressions = get_mypy_warnings(repo_dir, commit_id, results_dir, unused_ignores, mypy_daemon)
+            if warnings_file is None:
+                warnings_file = get_warning_file(commit_id, checker, results_dir)
         if warnings_file is None:
             original_warnings = get_all_warnings(
-                repo_dir, commit_id, checker, results_dir)
+                repo_dir, commit_id, checker, results_dir, mypy_daemon=mypy_daemon)
         else:
             original_warnings = read_warning_from_file(warnings_file)
 
         suppression_warning_pairs, all_suppressed_warnings, useful_suppressions, useless_suppressions = compute_mapping_by_removing_suppressions(
-            repo_dir, suppressions, original_warnings, commit_id, checker, results_dir)
+            repo_dir, suppressions, original_warnings, commit_id, checker, results_dir, one_by_one, reported_useless_suppressions,
+            mypy_daemon, full_recheck, overlay, workers)
 
     if suppression_warning_pairs:
         write_mapping_to_csv(suppression_warning_pairs, results_dir, commit_id, file_specific)
@@ -161,5 +440,15 @@ def main(repo_dir, commit_id, checker, results_dir, suppressions_file=None, \
 
 if __name__ == "__main__":
     args = parser.parse_args()
-    main(args.repo_dir, args.commit_id, args.checker, args.results_dir,
-         args.suppressions_file, args.warnings_file)
+    if args.overlay and args.mypy_daemon:
+        parser.error("--overlay doesn't work with --mypy_daemon, which rechecks the files in the repository")
+    mypy_daemon = MypyDaemon() if args.mypy_daemon else None
+    try:
+        main(args.repo_dir, args.commit_id, args.checker, args.results_dir,
+             args.suppressions_file, args.warnings_file, one_by_one=args.one_by_one, unused_ignores=args.unused_ignores,
+             mypy_daemon=mypy_daemon, full_recheck=args.full_recheck, overlay=args.overlay,
+             workers=args.workers)
+    finally:
+        # the daemon would outlive this process until its timeout
+        if mypy_daemon is not None:
+            mypy_daemon.close()
@@ -1,3 +1,8 @@
+import os
+from os.path import dirname, join
+import subprocess
+
+
 def sort_and_compare_files(actual_file, expected_file):
     with open(expected_file, "r") as f:
         expected_lines = f.readlines()
@@ -22,3 +27,34 @@ def exactly_compare_files(actual_file, expected_file):
     assert len(actual_lines) == len(expected_lines)
     for actual, expected in zip(actual_lines, expected_lines):
         assert actual == expected
+
+
+def create_git_repo(repo_dir, commits):
+    '''
+    Create a git repository in repo_dir, offline, with one commit per dict in commits:
+    file path -> content (str or bytes), or None to delete the file.
+    Return the commit hashes, oldest to newest.
+    '''
+    os.makedirs(repo_dir, exist_ok=True)
+    subprocess.run(["git", "init", "-q", "-b", "main"], cwd=repo_dir, check=True)
+    commit_hashes = []
+    for i, files in enumerate(commits):
+        for path, content in files.items():
+            file = join(repo_dir, path)
+            if content is None:
+                os.remove(file)
+                continue
+            os.makedirs(dirname(file), exist_ok=True)
+            with open(file, "wb") as f:
+                f.write(content.encode() if isinstance(content, str) else content)
+        # fixed dates, one minute apart
+        date = f"2023-01-01T00:{i:02d}:00+0000"
+        env = dict(os.environ, GIT_AUTHOR_NAME="a", GIT_AUTHOR_EMAIL="a@b", GIT_AUTHOR_DATE=date,
+                GIT_COMMITTER_NAME="a", GIT_COMMITTER_EMAIL="a@b", GIT_COMMITTER_DATE=date)
+        subprocess.run(["git", "add", "-A"], cwd=repo_dir, check=True)
+        # a message that doesn't start with "commit ", which starts a commit block in git log results
+        subprocess.run(["git", "commit", "-q", "--allow-empty", "-m", f"change {i}"], cwd=repo_dir, env=env, check=True)
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_dir, stdout=subprocess.PIPE,
+                universal_newlines=True, check=True)
+        commit_hashes.append(result.stdout.strip())
+    return commit_hashes
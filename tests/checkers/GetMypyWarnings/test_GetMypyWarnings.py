@@ -1,8 +1,12 @@
+import os
 import tempfile
 import subprocess
 from os.path import join
 
-from tests.TestUtils import sort_and_compare_files
+from suppression_study.checkers.GetMypyWarnings import GetMypyWarnings, get_source_files
+from suppression_study.suppression.Suppression import Suppression
+from suppression_study.warnings.Warning import Warning
+from tests.TestUtils import create_git_repo, sort_and_compare_files
 
 def test_GetMypyWarning():
     with tempfile.TemporaryDirectory() as demo_path:
@@ -18,4 +22,51 @@ def test_GetMypyWarning():
         
         actual_results = join(demo_path, "checker_results/mypy/06d4370_warnings.csv")
         expected_results = "tests/checkers/GetMypyWarnings/expected_06d4370_warnings.csv"
-        sort_and_compare_files(actual_results, expected_results)
\ No newline at end of file
+        sort_and_compare_files(actual_results, expected_results)
+
+def test_GetMypyWarnings_read_useless_suppressions():
+    # the report of "mypy --warn-unused-ignores" (Mypy 1.4)
+    report_lines = [
+        'a.py:6: error: Unused "type: ignore" comment  [unused-ignore]\n',
+        # a single code is reported as the whole comment
+        'a.py:7: error: Unused "type: ignore" comment  [unused-ignore]\n',
+        'a.py:8: error: Unused "type: ignore[arg-type, misc]" comment  [unused-ignore]\n',
+        # "# type: ignore[assignment]" suppresses a method-assign error, a sub-code of assignment
+        'a.py:9: error: Unused "type: ignore" comment, use narrower [method-assign] instead of [assignment] code  '
+        '[unused-ignore]\n',
+        # "# type: ignore[assignment, method-assign, misc]"
+        'a.py:10: error: Unused "type: ignore[assignment, misc]" comment, '
+        'use narrower [method-assign] instead of [assignment] code  [unused-ignore]\n',
+        'a.py:11: error: Incompatible types in assignment (expression has type "str", variable has type "int")  '
+        '[assignment]\n',
+        'Found 5 errors in 1 file (checked 1 source file)\n']
+    with tempfile.TemporaryDirectory() as demo_path:
+        report = join(demo_path, "report.txt")
+        with open(report, "w") as f:
+            f.writelines(report_lines)
+        init = GetMypyWarnings(demo_path, "0" * 8, demo_path, unused_ignores=True)
+        assert init.read_useless_suppressions(report) == [
+            Suppression("a.py", "# type: ignore", 6),
+            Suppression("a.py", "# type: ignore", 7),
+            Suppression("a.py", "# type: ignore[arg-type, misc]", 8),
+            Suppression("a.py", "# type: ignore[misc]", 10)]
+        assert init.read_reports(report) == [Warning("a.py", "assignment", 11)]
+
+
+def test_GetMypyWarnings_get_source_files():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        create_git_repo(repo_dir, [{
+            "mypy.ini": "[mypy]\nexclude = skipped/\n",
+            "a.py": "X = 1\n",
+            "pkg/__init__.py": "",
+            "pkg/b.py": "Y = 2\n",
+            "skipped/c.py": "Z = 3\n"}])
+        current_dir = os.getcwd()
+        # the configuration in repo_dir applies, not the one of the working directory
+        assert get_source_files(repo_dir) == {"a.py", "pkg/__init__.py", "pkg/b.py"}
+        assert os.getcwd() == current_dir
+
+        # two files of the same module
+        create_git_repo(repo_dir, [{"skipped/c.py": None, "mypy.ini": None, "other/b.py": "Y = 3\n", "b.py": "Y = 4\n"}])
+        assert get_source_files(repo_dir) is None
@@ -2,7 +2,7 @@ import tempfile
 import subprocess
 from os.path import join
 
-from tests.TestUtils import sort_and_compare_files
+from tests.TestUtils import create_git_repo, sort_and_compare_files
 
 def test_GetPylintWarning():
     with tempfile.TemporaryDirectory() as demo_path:
@@ -18,4 +18,42 @@ def test_GetPylintWarning():
 
         actual_results = join(demo_path, "checker_results/pylint/a09fcfe_warnings.csv")
         expected_results = "tests/checkers/GetPylintWarnings/expected_a09fcfe_warnings.csv"
-        sort_and_compare_files(actual_results, expected_results)
\ No newline at end of file
+        sort_and_compare_files(actual_results, expected_results)
+
+
+# commits with edits, a sibling package import, an import that breaks, a new package root, a deletion and a rename
+INCREMENTAL_COMMITS = [
+    {"pkg/__init__.py": "'''pkg'''\n",
+     "pkg/m.py": "'''m'''\n\n\ndef f():\n    '''f'''\n    return 1\n\n\ndef g():\n    '''g'''\n    return 2\n",
+     "pkg/n.py": "'''n'''\nfrom .m import f\n\nY = f()\n",
+     "sub/c.py": "'''c'''\nimport os\nfrom pkg.m import g\n\nprint(g())\n",
+     "sub/d.py": "'''d'''\nimport c\n\nprint(c.g(), c.h)\n",
+     "top.py": "'''top'''\nimport sys\nx = 1\n"},
+    {"sub/c.py": "'''c'''\nimport os\nfrom pkg.m import g\n\nprint(g())\nprint(os.sep)\n"},
+    {"pkg/m.py": "'''m'''\n\n\ndef f():\n    '''f'''\n    return 1\n"},
+    {"tools/t.py": "'''t'''\nfrom pkg import n\n\nprint(n.Y, n.Z)\n", "top.py": None},
+    {"sub/d.py": None, "sub/e.py": "'''d'''\nimport c\n\nprint(c.g(), c.h)\n"},
+    {"pkg/sub/__init__.py": "", "pkg/sub/k.py": "'''k'''\nfrom .. import m\nfrom ..m import g\n"},
+]
+
+
+def test_GetPylintWarning_commits_file():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commits = [commit[:7] for commit in create_git_repo(repo_dir, INCREMENTAL_COMMITS)]
+        commits_file = join(demo_path, "commits.csv")
+        with open(commits_file, "w") as f:
+            f.writelines(f"{commit}\n" for commit in commits)
+
+        # checking only the changed files gives the same warnings as checking every commit from scratch
+        subprocess.run(["python", "-m", "suppression_study.checkers.GetPylintWarnings",
+            "--repo_dir=" + repo_dir,
+            "--commits_file=" + commits_file,
+            "--results_dir=" + join(demo_path, "incremental")])
+        for commit in commits:
+            subprocess.run(["python", "-m", "suppression_study.checkers.GetPylintWarnings",
+                "--repo_dir=" + repo_dir,
+                "--commit_id=" + commit,
+                "--results_dir=" + demo_path])
+            sort_and_compare_files(join(demo_path, f"incremental/checker_results/pylint/{commit}_warnings.csv"),
+                join(demo_path, f"checker_results/pylint/{commit}_warnings.csv"))
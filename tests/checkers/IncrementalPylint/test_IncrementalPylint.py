@@ -0,0 +1,126 @@
+import subprocess
+import tempfile
+from os.path import join
+
+from suppression_study.checkers import IncrementalPylint as incremental_pylint_module
+from suppression_study.checkers.IncrementalPylint import IncrementalPylint, add_package_root_paths, \
+    get_cross_file_symbol, get_package_root
+from suppression_study.checkers.WarningCache import WarningCache
+from tests.TestUtils import create_git_repo
+
+
+class RecordingIncrementalPylint(IncrementalPylint):
+
+    def __init__(self, warning_cache=None):
+        super().__init__(warning_cache=warning_cache)
+        self.runs = []
+
+    def run(self, repo_dir, files, options):
+        self.runs.append(options)
+        return super().run(repo_dir, files, options)
+
+
+def test_IncrementalPylint_package_roots():
+    blobs = {"pkg/__init__.py": "1", "pkg/m.py": "2", "pkg/sub/__init__.py": "3", "pkg/sub/k.py": "4",
+            "sub/c.py": "5", "top.py": "6"}
+    assert get_package_root("pkg/sub/k.py", blobs) == ""
+    assert get_package_root("sub/c.py", blobs) == "sub"
+    assert get_package_root("top.py", blobs) == ""
+    assert add_package_root_paths(["sub/c.py"], list(blobs), blobs) == ["pkg/__init__.py", "sub/c.py"]
+    assert add_package_root_paths(["pkg/m.py", "sub/c.py"], list(blobs), blobs) == ["pkg/m.py", "sub/c.py"]
+
+
+def test_IncrementalPylint_sibling_package_import():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        create_git_repo(repo_dir, [{
+            "pkg/__init__.py": "'''pkg'''\n",
+            "pkg/m.py": "'''m'''\nX = 1\n",
+            "sub/c.py": "'''c'''\nimport pkg.m\nprint(pkg.m.X)\n"}])
+        options = ["--recursive=y", "--disable=I"]
+
+        incremental_pylint = RecordingIncrementalPylint()
+        assert incremental_pylint.check(repo_dir, ["./"], options) == []
+        # only sub/c.py changes, it still imports pkg from the repository root
+        with open(join(repo_dir, "sub/c.py"), "a") as f:
+            f.write("x = 1\n")
+        full_runs = len(incremental_pylint.runs)
+        messages = incremental_pylint.check(repo_dir, ["./"], options)
+        assert any(option.startswith("--ignore-paths=") for option in incremental_pylint.runs[full_runs])
+        assert messages == IncrementalPylint().check(repo_dir, ["./"], options)
+        assert [message[3] for message in messages] == ["invalid-name"]
+
+
+DUPLICATE_FUNCTION = "\n\ndef {name}(x):\n    '''{name}'''\n    y = x + 1\n    z = y * 2\n    w = z - 3\n    v = w / 4\n    return v\n"
+
+# duplicate code in a.py and b.py, a cyclic import in pkg
+CROSS_FILE_COMMITS = [
+    {"a.py": "'''a'''\nimport os\n" + DUPLICATE_FUNCTION.format(name="f"),
+     "b.py": "'''b'''\n" + DUPLICATE_FUNCTION.format(name="g"),
+     "c.py": "'''c'''\nX = 1\n",
+     "pkg/__init__.py": "",
+     "pkg/p.py": "'''p'''\nfrom pkg import q\n\nY = q.Z\n",
+     "pkg/q.py": "'''q'''\nZ = 1\n\n\ndef h():\n    '''h'''\n    from pkg import p\n    return p.Y\n"},
+    # no import and no similar lines change
+    {"c.py": "'''c'''\nX = 2\n"},
+    # a third copy of the duplicate code
+    {"c.py": "'''c'''\nX = 2\n" + DUPLICATE_FUNCTION.format(name="k")},
+    # the cyclic import goes away
+    {"pkg/q.py": "'''q'''\nZ = 1\n"},
+    # the duplicate code moves down
+    {"a.py": "'''a'''\nimport os\nW = os.sep\n" + DUPLICATE_FUNCTION.format(name="f")},
+]
+
+
+def without_cross_file_locations(messages):
+    # Pylint reports cross file messages at the last file it checks, which depends on the order of directory entries
+    return sorted([["", 0] + message[2:] if get_cross_file_symbol(message) else message for message in messages])
+
+
+def test_IncrementalPylint_cross_file_checks():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commits = create_git_repo(repo_dir, CROSS_FILE_COMMITS)
+        options = ["--recursive=y", "--disable=I"]
+        cache_file = join(demo_path, "cache.sqlite")
+
+        with WarningCache(cache_file) as warning_cache:
+            incremental_pylint = RecordingIncrementalPylint(warning_cache)
+            cross_file_passes = []
+            for commit in commits:
+                subprocess.run(["git", "checkout", "-q", commit], cwd=repo_dir, check=True)
+                runs = len(incremental_pylint.runs)
+                messages = incremental_pylint.check(repo_dir, ["./"], options)
+                full_messages = incremental_pylint.run(repo_dir, ["./"], options)
+                assert without_cross_file_locations(messages) == without_cross_file_locations(full_messages)
+                cross_file_passes.append([option[len("--enable="):] for options in incremental_pylint.runs[runs:]
+                        if "--disable=all" in options for option in options if option.startswith("--enable=")])
+            assert cross_file_passes == [[], [], ["duplicate-code"], ["cyclic-import"], ["duplicate-code"]]
+            assert [message[3] for message in messages if get_cross_file_symbol(message)] == ["duplicate-code"]
+
+        # all messages from the cache, no Pylint run
+        with WarningCache(cache_file) as warning_cache:
+            incremental_pylint = RecordingIncrementalPylint(warning_cache)
+            for commit in commits:
+                subprocess.run(["git", "checkout", "-q", commit], cwd=repo_dir, check=True)
+                messages = incremental_pylint.check(repo_dir, ["./"], options)
+                assert without_cross_file_locations(messages) == \
+                    without_cross_file_locations(incremental_pylint.run(repo_dir, ["./"], options))
+            assert len(incremental_pylint.runs) == len(commits)
+
+
+def test_IncrementalPylint_other_pylint_version(monkeypatch):
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        create_git_repo(repo_dir, CROSS_FILE_COMMITS[:1])
+        options = ["--recursive=y", "--disable=I"]
+        expected_messages = IncrementalPylint().check(repo_dir, ["./"], options)
+
+        # the internals it uses may differ in another version, every check runs Pylint on all files
+        monkeypatch.setattr(incremental_pylint_module, "SUPPORTED_PYLINT_VERSION", "0.0.0")
+        incremental_pylint = RecordingIncrementalPylint()
+        assert not incremental_pylint.incremental
+        for _ in range(2):
+            assert without_cross_file_locations(incremental_pylint.check(repo_dir, ["./"], options)) == \
+                without_cross_file_locations(expected_messages)
+        assert incremental_pylint.runs == [options, options]
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import tempfile
+import time
+from os.path import exists, join
+
+from suppression_study.checkers.MypyDaemon import MypyDaemon
+from tests.TestUtils import create_git_repo
+
+
+def run_daemon(daemon, repo_dir, commit_id):
+    # the error lines of "mypy ./", through the daemon
+    command_line = daemon.get_command_line(repo_dir, commit_id, [])
+    result = subprocess.run(command_line, cwd=repo_dir, shell=True, stdout=subprocess.PIPE, universal_newlines=True)
+    return [line for line in result.stdout.splitlines() if " error: " in line]
+
+
+def test_MypyDaemon_same_size_edits_in_one_second():
+    original = "X: int = 1\nY: str = 2  # type: ignore[assignment]\nZ: str = 3  # type: ignore[assignment]\n"
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commit_id = create_git_repo(repo_dir, [{"a.py": original}])[0]
+        file = join(repo_dir, "a.py")
+        mtime = int(time.time())
+
+        def write(content):
+            # all versions of the file have the same size and modification time
+            with open(file, "w") as f:
+                f.write(content)
+            os.utime(file, (mtime, mtime))
+
+        with MypyDaemon() as daemon:
+            write(original)
+            assert run_daemon(daemon, repo_dir, commit_id) == []
+            status_file = daemon.get_status_file()
+
+            write(original.replace("2  # type: ignore[assignment]", "2" + " " * 28))
+            assert [line.split(":")[1] for line in run_daemon(daemon, repo_dir, commit_id)] == ["2"]
+
+            # restored, then another line without suppression, of the same size again
+            write(original)
+            write(original.replace("3  # type: ignore[assignment]", "3" + " " * 28))
+            assert [line.split(":")[1] for line in run_daemon(daemon, repo_dir, commit_id)] == ["3"]
+
+            write(original)
+            assert run_daemon(daemon, repo_dir, commit_id) == []
+        assert not exists(status_file)
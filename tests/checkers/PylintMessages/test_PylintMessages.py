@@ -0,0 +1,87 @@
+import json
+import shlex
+import sys
+import pytest
+
+from suppression_study.checkers.GetWarningsSuper import iter_command_output
+from suppression_study.checkers.PylintMessages import PYLINT_MAX_EXIT_STATUS, iter_messages_from_json_output
+
+
+MESSAGES = [
+    ["src/a.py", 1, "C0114", "missing-module-docstring", "Missing module docstring"],
+    ["src/b.py", 12, "W0611", "unused-import", "Unused import os"],
+    ["src/é.py", 3, "C0103", "invalid-name", "Variable name \"café\" doesn't conform to snake_case naming style"],
+]
+
+
+def get_json_output(messages, ensure_ascii=True):
+    # the output of "pylint --output-format=json"
+    return json.dumps([{"type": "convention", "line": line, "column": 0, "path": path, "symbol": symbol,
+            "message": msg, "message-id": msg_id} for path, line, msg_id, symbol, msg in messages],
+            indent=4, ensure_ascii=ensure_ascii) + "\n"
+
+
+def test_iter_messages_from_json_output_lines():
+    output = get_json_output(MESSAGES)
+    assert list(iter_messages_from_json_output(output.splitlines(keepends=True))) == MESSAGES
+
+
+def test_iter_messages_from_json_output_partial_chunks():
+    # chunks that end anywhere, eg,. in the middle of a string or an escape sequence
+    output = get_json_output(MESSAGES)
+    for chunk_size in [1, 7, 64]:
+        chunks = [output[i:i + chunk_size] for i in range(0, len(output), chunk_size)]
+        assert list(iter_messages_from_json_output(chunks)) == MESSAGES
+
+
+def test_iter_messages_from_json_output_empty():
+    assert list(iter_messages_from_json_output(["[]\n"])) == []
+    assert list(iter_messages_from_json_output(["[\n", "]\n"])) == []
+    assert list(iter_messages_from_json_output([])) == []
+
+
+def test_iter_messages_from_json_output_truncated():
+    output = get_json_output(MESSAGES)
+    truncated = output[:output.index('"path": "src/b.py"')]
+    messages = iter_messages_from_json_output(truncated.splitlines(keepends=True))
+    assert next(messages) == MESSAGES[0]
+    with pytest.raises(ValueError):
+        next(messages)
+
+
+def test_iter_command_output_split_utf8():
+    # a non-ASCII character written in two parts, the lines are decoded as a whole
+    output = get_json_output(MESSAGES, ensure_ascii=False).encode("utf-8")
+    split = output.index("é".encode("utf-8")) + 1
+    script = "import sys, time; out = sys.stdout.buffer; " \
+            f"out.write({output[:split]!r}); out.flush(); time.sleep(0.2); out.write({output[split:]!r})"
+    command_line = shlex.join([sys.executable, "-c", script])
+    output_lines = iter_command_output(command_line, ".")
+    assert list(iter_messages_from_json_output(output_lines)) == MESSAGES
+
+
+def test_iter_command_output_exit_status():
+    def run(script, max_exit_status=0):
+        return list(iter_command_output(shlex.join([sys.executable, "-c", script]), ".", max_exit_status))
+
+    assert run("print('[]')") == ["[]\n"]
+    # Pylint reports messages in its exit status
+    assert run("print('[]'); raise SystemExit(31)", PYLINT_MAX_EXIT_STATUS) == ["[]\n"]
+    # a crash after part of the output
+    with pytest.raises(RuntimeError):
+        run("print('['); raise SystemExit(32)", PYLINT_MAX_EXIT_STATUS)
+    with pytest.raises(RuntimeError):
+        run("import os, signal; print('[', flush=True); os.kill(os.getpid(), signal.SIGKILL)", PYLINT_MAX_EXIT_STATUS)
+
+
+def test_iter_command_output_stopped_early():
+    # the command is stopped when the caller stops reading, that is no failure
+    output_lines = iter_command_output(shlex.join([sys.executable, "-c", "while True: print('[]', flush=True)"]), ".")
+    assert next(output_lines) == "[]\n"
+    output_lines.close()
+
+
+def test_iter_command_output_pylint_usage_error():
+    output_lines = iter_command_output("pylint --output-format=json --no-such-option .", ".", PYLINT_MAX_EXIT_STATUS)
+    with pytest.raises(RuntimeError):
+        list(iter_messages_from_json_output(output_lines))
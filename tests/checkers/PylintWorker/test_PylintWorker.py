@@ -0,0 +1,56 @@
+import subprocess
+import tempfile
+from os.path import join
+import pytest
+
+from suppression_study.checkers.PylintMessages import iter_messages_from_json_output
+from suppression_study.checkers.PylintWorker import PylintWorker
+from tests.TestUtils import create_git_repo
+
+
+def run_pylint_process(repo_dir, files, options):
+    # the messages of a new "pylint" process, as reference
+    result = subprocess.run(["pylint", "--output-format=json"] + options + files, cwd=repo_dir,
+            stdout=subprocess.PIPE, universal_newlines=True)
+    return list(iter_messages_from_json_output(result.stdout.splitlines(keepends=True)))
+
+
+def test_PylintWorker_same_messages_as_pylint_process():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        create_git_repo(repo_dir, [{
+            "pkg/__init__.py": "",
+            "pkg/m.py": "'''m'''\n\n\ndef f():\n    '''f'''\n    return 1\n",
+            "c.py": "'''c'''\nimport os\nfrom pkg.m import f, g\nimport missing_module\n\nprint(f(), g())\n"}])
+        options = ["--recursive=y", "--disable=I"]
+
+        with PylintWorker() as worker:
+            messages = worker.check(repo_dir, ["./"], options)
+            assert sorted(messages) == sorted(run_pylint_process(repo_dir, ["./"], options))
+            assert ["c.py", 3, "E0611", "no-name-in-module", "No name 'g' in module 'pkg.m'"] in messages
+            assert ["c.py", 4, "E0401", "import-error", "Unable to import 'missing_module'"] in messages
+
+            # the files changed, the modules of the repository are read again
+            with open(join(repo_dir, "pkg/m.py"), "a") as f:
+                f.write("\n\ndef g():\n    '''g'''\n    return 2\n")
+            messages = worker.check(repo_dir, ["./"], options)
+            assert sorted(messages) == sorted(run_pylint_process(repo_dir, ["./"], options))
+            assert not [message for message in messages if message[2] == "E0611"]
+
+
+def test_PylintWorker_error_and_close():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        create_git_repo(repo_dir, [{"a.py": "'''a'''\nX = 1\n"}])
+
+        worker = PylintWorker()
+        with pytest.raises(RuntimeError):
+            worker.check(repo_dir, ["a.py"], ["--no-such-option"])
+        # the worker survives a failed request
+        process = worker.process
+        assert worker.check(repo_dir, ["a.py"], ["--disable=I"]) == []
+        assert worker.process is process
+
+        worker.close()
+        assert worker.process is None
+        assert process.returncode == 0
@@ -0,0 +1,28 @@
+import tempfile
+from os.path import join
+
+from suppression_study.checkers.WarningCache import WarningCache
+
+
+def test_WarningCache_least_recently_used_entries_evicted():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        messages_a = [["a.py", 1, "C0114", "missing-module-docstring", "Missing module docstring"]]
+        messages_b = [["b.py", 3, "W0611", "unused-import", "Unused import os"]]
+        with WarningCache(join(cache_dir, "cache.sqlite"), max_entries=2) as cache:
+            cache.put_many("pylint", "2.17.4", "config", {"blob_a": messages_a, "blob_b": messages_b})
+            assert cache.get_many("pylint", "2.17.4", "config", ["blob_a", "blob_c"]) == {"blob_a": messages_a}
+            # another version or configuration, another entry
+            assert cache.get_many("pylint", "3.0.0", "config", ["blob_a"]) == {}
+
+            cache.put_many("pylint", "2.17.4", "config", {"blob_c": []})
+            assert cache.get_many("pylint", "2.17.4", "config", ["blob_a", "blob_b", "blob_c"]) == \
+                {"blob_a": messages_a, "blob_c": []}
+
+        # persistent across runs
+        with WarningCache(join(cache_dir, "cache.sqlite")) as cache:
+            assert cache.get_many("pylint", "2.17.4", "config", ["blob_c"]) == {"blob_c": []}
+            stats = cache.get_stats()
+            assert stats["entries"] == 2
+            assert stats["hits"] == 4
+            assert stats["misses"] == 3
+            assert stats["evictions"] == 1
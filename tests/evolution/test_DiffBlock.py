@@ -0,0 +1,89 @@
+import subprocess
+import tempfile
+from os.path import join
+import pytest
+
+from suppression_study.evolution.DiffBlock import DiffBlock, FileDiffBlocks
+from suppression_study.suppression.NumericSpecificTypeMap import get_warning_kind_to_numeric_code
+from suppression_study.suppression.Suppression import Suppression, get_raw_warning_type_from_formatted_suppression_text
+from tests.TestUtils import create_git_repo
+
+
+OLD_LINES = [f"x{i} = {i}" for i in range(1, 31)]
+SUPPRESSED_LINES = {3: "invalid-name", 4: "invalid-name,unused-variable", 5: "unused-variable", 20: "invalid-name",
+        26: "invalid-name"}
+
+
+def get_old_content():
+    return "".join(f"{line}  # pylint: disable={SUPPRESSED_LINES[i]}\n" if i in SUPPRESSED_LINES else f"{line}\n"
+            for i, line in enumerate(OLD_LINES, start=1))
+
+
+def get_suppressions():
+    suppressions = []
+    for line, warning_types in SUPPRESSED_LINES.items():
+        for warning_type in warning_types.split(","):
+            suppressions.append(Suppression("a.py", f"# pylint: disable={warning_type}", line))
+    return suppressions
+
+
+def get_file_diff_blocks_events(diff, suppressions, specific_numeric_maps):
+    raw_warning_types = [get_raw_warning_type_from_formatted_suppression_text(s.text) for s in suppressions]
+    file_diff_blocks = FileDiffBlocks("c" * 40, "date", diff, specific_numeric_maps)
+    return file_diff_blocks.get_delete_events(suppressions, raw_warning_types)
+
+
+def get_diff_block_events(diff, suppressions, specific_numeric_maps):
+    # one DiffBlock per suppression, as before FileDiffBlocks
+    return [DiffBlock("c" * 40, "date", diff, suppression,
+            get_raw_warning_type_from_formatted_suppression_text(suppression.text),
+            specific_numeric_maps).from_diff_block_to_delete_event() for suppression in suppressions]
+
+
+def test_FileDiffBlocks_same_as_DiffBlock():
+    specific_numeric_maps = get_warning_kind_to_numeric_code()
+    suppressions = get_suppressions()
+    new_contents = [
+        # a removed suppression, a removed warning type, a kept one, another hunk with a removed suppression
+        get_old_content().replace("x3 = 3  # pylint: disable=invalid-name", "x3 = 3")
+                .replace("disable=invalid-name,unused-variable", "disable=unused-variable")
+                .replace("x26 = 26  # pylint: disable=invalid-name", "x26 = 0"),
+        # only added lines before the suppressions, then a changed line
+        "import os\n" + get_old_content().replace("x20 = 20  # pylint: disable=invalid-name", "x20 = 0"),
+        # the suppressed line changes, the suppression stays
+        get_old_content().replace("x5 = 5", "x5 = 55"),
+        # all lines removed
+        ""]
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commits = create_git_repo(repo_dir, [{"a.py": get_old_content()}] + [{"a.py": c} for c in new_contents])
+        delete_events = []
+        for next_commit in commits[1:]:
+            diff = subprocess.run(["git", "diff", commits[0], next_commit, "--", "a.py"],
+                    cwd=repo_dir, stdout=subprocess.PIPE, universal_newlines=True).stdout
+            events = get_file_diff_blocks_events(diff, suppressions, specific_numeric_maps)
+            assert events == get_diff_block_events(diff, suppressions, specific_numeric_maps)
+            delete_events.append([(event["line_number"], event["warning_type"]) for event in events if event])
+        # only the first hunk that changes old lines is compared
+        assert delete_events == [
+            [(3, "# pylint: disable=invalid-name"), (4, "# pylint: disable=invalid-name")],
+            [],
+            [],
+            [(3, "# pylint: disable=invalid-name"), (4, "# pylint: disable=invalid-name"),
+             (4, "# pylint: disable=unused-variable"), (5, "# pylint: disable=unused-variable"),
+             (20, "# pylint: disable=invalid-name"), (26, "# pylint: disable=invalid-name")]]
+
+
+def test_FileDiffBlocks_single_line_hunk():
+    # a hunk of one line has no line count, eg,. "@@ -5 +5 @@"
+    specific_numeric_maps = get_warning_kind_to_numeric_code()
+    suppressions = get_suppressions()
+    diff = "diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n" \
+            "@@ -5 +5 @@\n-x5 = 5  # pylint: disable=unused-variable\n+x5 = 5\n" \
+            "@@ -20,0 +21 @@\n+y = 1\n"
+    events = get_file_diff_blocks_events(diff, suppressions, specific_numeric_maps)
+    assert [(event["line_number"], event["warning_type"]) for event in events if event] == \
+            [(5, "# pylint: disable=unused-variable")]
+    # DiffBlock fails on it
+    with pytest.raises(IndexError):
+        get_diff_block_events(diff, suppressions, specific_numeric_maps)
@@ -1,55 +1,83 @@
 import tempfile
 import subprocess
 import json
-from os.path import join
+import os
+from os.path import join, exists
+import pytest
 
 from suppression_study.evolution.Select1000Commits import select_1000_commits
+from tests.TestUtils import create_git_repo
 
 
-def test_ExtractHistory_pylint_single_branch():
-    expected_results = "tests/evolution/expected_histories_suppression_level_all.json"
+def extract_histories(repo_dir, results_dir, extra_args=()):
+    # run ExtractHistory on all commits of repo_dir, return the histories it writes
+    selected_1000_commits_csv = join(repo_dir, "check_commits_1000.csv")
+    if not exists(selected_1000_commits_csv):
+        select_1000_commits(repo_dir, selected_1000_commits_csv)
+    subprocess.run(["python", "-m", "suppression_study.evolution.ExtractHistory",
+        "--repo_dir=" + repo_dir,
+        "--selected_1000_commits_csv=" + selected_1000_commits_csv,
+        "--results_dir=" + results_dir] + list(extra_args))
+
+    with open(join(results_dir, "histories_suppression_level_all.json"), "r") as f:
+        return json.load(f)
+
+
+def compare_histories(demo_repo_git_link, expected_results, extra_args=()):
+    # clone the demo repository, and compare the extracted histories to the expected ones
     with tempfile.TemporaryDirectory() as demo_path:
-        demo_repo_name = "suppression-test-python-pylint"
-        demo_repo_git_link = "https://github.com/michaelpradel/suppression-test-python-pylint.git"
         subprocess.run("git clone " + demo_repo_git_link, cwd=demo_path, shell=True)
-
+        demo_repo_name = demo_repo_git_link.rsplit("/", 1)[1][:-len(".git")]
         repo_dir = join(demo_path, demo_repo_name)
-        selected_1000_commits_csv = join(repo_dir, "check_commits_1000.csv")
-        select_1000_commits(repo_dir, selected_1000_commits_csv)
-        subprocess.run(["python", "-m", "suppression_study.evolution.ExtractHistory",
-            "--repo_dir=" + repo_dir,
-            "--selected_1000_commits_csv=" + selected_1000_commits_csv,
-            "--results_dir=" + demo_path])
+        extra_args = [arg.replace("{demo_path}", demo_path) for arg in extra_args]
+        actual_history = extract_histories(repo_dir, demo_path, extra_args)
 
         with open(expected_results, "r") as f:
             expected_history = json.load(f)
 
-        with open(join(demo_path,"histories_suppression_level_all.json"), "r") as f:
-            actual_history = json.load(f)
-        
+        if "--streaming" in extra_args:
+            assert not exists(join(demo_path, "grep"))
         assert len(actual_history) == len(expected_history)
         assert actual_history == expected_history
 
+
+@pytest.mark.parametrize("extra_args", [
+    [],
+    ["--snapshot_store={demo_path}/suppression_snapshots.sqlite"],
+    ["--streaming"]])
+def test_ExtractHistory_pylint_single_branch(extra_args):
+    compare_histories("https://github.com/michaelpradel/suppression-test-python-pylint.git",
+            "tests/evolution/expected_histories_suppression_level_all.json", extra_args)
+
+
 def test_ExtractHistory_pylint_multi_branch():
-    expected_results = "tests/evolution/expected_histories_multi_branch.json"
+    compare_histories("https://github.com/Hhyemin/suppression-test-python-multi-operation.git",
+            "tests/evolution/expected_histories_multi_branch.json")
+
+
+def test_ExtractHistory_same_order_from_all_suppression_sources():
+    # many suppressions with the same date, their "# S<n>" ids must not depend on the order of the suppression rows
     with tempfile.TemporaryDirectory() as demo_path:
-        demo_repo_name = "suppression-test-python-multi-operation"
-        demo_repo_git_link = "https://github.com/Hhyemin/suppression-test-python-multi-operation.git"
-        subprocess.run("git clone " + demo_repo_git_link, cwd=demo_path, shell=True)
+        repo_dir = join(demo_path, "repo")
+        create_git_repo(repo_dir, [
+            {"z.py": "x = 1  # pylint: disable=invalid-name\n",
+             "a/b.py": "import os  # pylint: disable=unused-import,W0611\ny = 2  # pylint: disable=invalid-name\n",
+             "m.py": "def f():  # pylint: disable=missing-docstring\n    pass\n"},
+            {"z.py": "x = 1\n", "c.py": "z = 3  # pylint: disable=invalid-name\n"},
+            {"m.py": None}])
 
-        repo_dir = join(demo_path, demo_repo_name)
-        selected_1000_commits_csv = join(repo_dir, "check_commits_1000.csv")
-        select_1000_commits(repo_dir, selected_1000_commits_csv)
-        subprocess.run(["python", "-m", "suppression_study.evolution.ExtractHistory",
-            "--repo_dir=" + repo_dir,
-            "--selected_1000_commits_csv=" + selected_1000_commits_csv,
-            "--results_dir=" + demo_path])
+        expected_history = extract_histories(repo_dir, join(demo_path, "csv"))
+        assert len(expected_history) == 6
 
-        with open(expected_results, "r") as f:
-            expected_history = json.load(f)
+        # the suppression .csv files in another row order, eg,. from a scan in directory order
+        grep_folder = join(demo_path, "csv", "grep")
+        for csv_file in os.listdir(grep_folder):
+            with open(join(grep_folder, csv_file), "r") as f:
+                rows = f.readlines()
+            with open(join(grep_folder, csv_file), "w") as f:
+                f.writelines(reversed(rows))
+        assert extract_histories(repo_dir, join(demo_path, "csv")) == expected_history
 
-        with open(join(demo_path,"histories_suppression_level_all.json"), "r") as f:
-            actual_history = json.load(f)
-        
-        assert len(actual_history) == len(expected_history)
-        assert actual_history == expected_history
\ No newline at end of file
+        snapshot_store_file = join(demo_path, "suppression_snapshots.sqlite")
+        for results_name, extra_args in [("store", ["--snapshot_store=" + snapshot_store_file]), ("streaming", ["--streaming"])]:
+            assert extract_histories(repo_dir, join(demo_path, results_name), extra_args) == expected_history
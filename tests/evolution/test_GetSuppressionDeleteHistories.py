@@ -0,0 +1,104 @@
+import subprocess
+import tempfile
+from os.path import join
+
+from suppression_study.evolution.GetSuppressionDeleteHistories import GetSuppressionDeleteHistories, quote_git_path, \
+    unquote_git_path
+from suppression_study.suppression.GrepSuppressionPython import iter_commit_suppressions
+from suppression_study.suppression.NumericSpecificTypeMap import get_warning_kind_to_numeric_code
+from tests.TestUtils import create_git_repo
+
+
+def get_delete_events(repo_dir, commits, pickaxe_prefilter=True):
+    # commits: oldest to newest
+    suppression_sets = (suppressions for _, suppressions in iter_commit_suppressions(repo_dir, list(reversed(commits))))
+    dates = [f"date {i}" for i in range(len(commits))]
+    histories = GetSuppressionDeleteHistories(repo_dir, commits, dates, None, get_warning_kind_to_numeric_code(),
+            pickaxe_prefilter=pickaxe_prefilter, suppression_sets=suppression_sets)
+    return [(d.last_exists_commit, d.delete_event) for d in histories.track_commits_forward()]
+
+
+def test_GetSuppressionDeleteHistories_pickaxe_prefilter():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commits = create_git_repo(repo_dir, [
+            {"a.py": "x = 1  # pylint: disable=invalid-name\ny = 2\n"},
+            {"a.py": "x = 1  # pylint: disable=invalid-name\ny = 3\n", "README": "no Python file\n"},
+            {"a.py": "x = 1\ny = 3\n"},
+            {"c.py": "import os  # pylint: disable=unused-import\n"},
+            {"c.py": None}])
+
+        histories = GetSuppressionDeleteHistories(repo_dir, commits, [], None, {})
+        assert histories.get_commits_changing_suppressions() == {2, 3, 4}
+        # a sampled commit list, the skipped commits are checked as well
+        histories = GetSuppressionDeleteHistories(repo_dir, commits[0:3:2] + commits[4:], [], None, {})
+        assert histories.get_commits_changing_suppressions() == {1, 2}
+        # not on the first parent history
+        histories = GetSuppressionDeleteHistories(repo_dir, list(reversed(commits)), [], None, {})
+        assert histories.get_commits_changing_suppressions() is None
+
+        delete_events = get_delete_events(repo_dir, commits)
+        assert [(commit, event["commit_id"], event["file_path"], event["change_operation"])
+                for commit, event in delete_events] == [
+            (commits[1], commits[2][:8], "a.py", "delete"),
+            (commits[3], commits[4][:8], "c.py", "file delete")]
+        assert get_delete_events(repo_dir, commits, pickaxe_prefilter=False) == delete_events
+
+
+SPECIAL_PATHS = ["sp ace/a.py", "é/b.py", "q\"uote.py", "back\\slash.py", "tab\tname.py", "new\nline.py"]
+
+
+def get_hunks(diff):
+    return diff[diff.index("\n@@ "):]
+
+
+def test_GetSuppressionDeleteHistories_quoted_and_non_ascii_paths():
+    def get_content(path, changed_line=None):
+        # a different content per file, renames are detected by content
+        lines = [f"PATH = {path!r}\n"] + [f"x{i} = {i}  # pylint: disable=invalid-name\n" for i in range(1, 10)]
+        if changed_line is not None:
+            lines[changed_line] = f"x{changed_line} = 0\n"
+        return "".join(lines)
+
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commits = create_git_repo(repo_dir, [
+            {path: get_content(path) for path in SPECIAL_PATHS},
+            {"sp ace/a.py": get_content("sp ace/a.py", 1),
+             "é/b.py": get_content("é/b.py", 2),
+             "back\\slash.py": get_content("back\\slash.py", 3),
+             "q\"uote.py": None, "ré\"named.py": get_content("q\"uote.py", 4),
+             "tab\tname.py": None,
+             "new\nline.py": None}])
+
+        histories = GetSuppressionDeleteHistories(repo_dir, commits, [], None, {})
+        [(deleted_files, path_to_diff)] = list(histories.iter_commit_pair_diffs([(commits[0], commits[1])]))
+        # unquoted, one per line
+        assert deleted_files == "new\nline.py\ntab\tname.py\n"
+        # under the paths in the first commit
+        assert sorted(path_to_diff) == sorted(SPECIAL_PATHS)
+        for path in SPECIAL_PATHS:
+            if path == "q\"uote.py":
+                continue
+            diff = subprocess.run(["git", "-c", "core.quotePath=false", "diff", commits[0], commits[1], "--",
+                f":(literal){path}"], cwd=repo_dir, stdout=subprocess.PIPE, universal_newlines=True).stdout
+            assert path_to_diff[path] == diff
+        renamed_diff = subprocess.run(["git", "diff", f"{commits[0]}:q\"uote.py", f"{commits[1]}:ré\"named.py"],
+            cwd=repo_dir, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        assert get_hunks(path_to_diff["q\"uote.py"]) == get_hunks(renamed_diff)
+
+
+def test_quote_git_path_round_trip():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        create_git_repo(repo_dir, [{path: "x = 1\n" for path in SPECIAL_PATHS}])
+        # as git prints the paths with core.quotePath=false
+        quoted_paths = subprocess.run(["git", "-c", "core.quotePath=false", "ls-files"], cwd=repo_dir,
+            stdout=subprocess.PIPE).stdout.decode().splitlines()
+        paths = subprocess.run(["git", "ls-files", "-z"], cwd=repo_dir,
+            stdout=subprocess.PIPE).stdout.decode().split("\0")[:-1]
+        assert sorted(paths) == sorted(SPECIAL_PATHS)
+        assert [quote_git_path(path) for path in paths] == quoted_paths
+        assert [unquote_git_path(path) for path in quoted_paths] == paths
+        assert quote_git_path("é/b.py") == "é/b.py"
+        assert quote_git_path("tab\tname.py") == "\"tab\\tname.py\""
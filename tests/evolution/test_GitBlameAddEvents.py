@@ -0,0 +1,47 @@
+import tempfile
+from os.path import join
+
+from suppression_study.evolution.GitBlameAddEvents import GitBlameAddEvents
+from suppression_study.evolution.GitLogFromFinalStatus import GitLogFromFinalStatus
+from suppression_study.suppression.GrepSuppressionPython import iter_suppressions
+from suppression_study.suppression.NumericSpecificTypeMap import get_warning_kind_to_numeric_code
+from tests.TestUtils import create_git_repo
+
+
+def test_GitBlameAddEvents_same_as_git_log():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commits = create_git_repo(repo_dir, [
+            {"a.py": "x = 1  # pylint: disable=invalid-name\n",
+             "b.py": "import os  # pylint: disable=unused-import\n\n\ndef f():\n    pass\n"},
+            # lines added above, the suppression moves
+            {"a.py": "import sys\n\nx = 1  # pylint: disable=invalid-name\ny = 2  # pylint: disable=W0612\n"},
+            # the line changes, its suppression stays, and another warning type is added
+            {"a.py": "import sys\n\nx = 3  # pylint: disable=invalid-name\n"
+                     "y = 2  # pylint: disable=W0612,unused-import\n"},
+            # renamed, and a suppression added in the new file
+            {"b.py": None,
+             "c.py": "import os  # pylint: disable=unused-import\n\n\ndef f():  # pylint: disable=missing-docstring\n"
+                     "    pass\n"}])
+
+        specific_numeric_maps = get_warning_kind_to_numeric_code()
+        suppressions = list(iter_suppressions(repo_dir, commits[-1]))
+        assert len(suppressions) == 5
+        blame_add_events = GitBlameAddEvents(repo_dir, specific_numeric_maps).get_add_events(commits[-1], suppressions)
+        git_log = GitLogFromFinalStatus(repo_dir, suppressions, [], specific_numeric_maps)
+        log_add_events = [git_log.run_git_log(suppression, "", True)[0] for suppression in suppressions]
+
+        # blame finds the add events that the newest change of the line makes, git log -L finds all of them:
+        # the newest change of a.py:3 and a.py:4 adds unused-import only, c.py:1 is blamed through the rename
+        assert [(suppression.path, suppression.line, suppression.text, blame_add_event is not None)
+                for suppression, blame_add_event in zip(suppressions, blame_add_events)] == [
+            ("a.py", 3, "# pylint: disable=invalid-name", False),
+            ("a.py", 4, "# pylint: disable=unused-variable", False),
+            ("a.py", 4, "# pylint: disable=unused-import", True),
+            ("c.py", 1, "# pylint: disable=unused-import", True),
+            ("c.py", 4, "# pylint: disable=missing-docstring", True)]
+        for blame_add_event, log_add_event in zip(blame_add_events, log_add_events):
+            if blame_add_event is not None:
+                assert blame_add_event == log_add_event
+        assert [log_add_event["commit_id"] for log_add_event in log_add_events] == \
+                [commits[i][:8] for i in [0, 1, 2, 0, 3]]
@@ -0,0 +1,62 @@
+import tempfile
+from os.path import join
+
+from suppression_study.evolution.GetSuppressionDeleteHistories import GetSuppressionDeleteHistories
+from suppression_study.evolution.ReverseBlameDeleteHistories import ReverseBlameDeleteHistories
+from suppression_study.suppression.GrepSuppressionPython import iter_commit_suppressions
+from suppression_study.suppression.NumericSpecificTypeMap import get_warning_kind_to_numeric_code
+from tests.TestUtils import create_git_repo
+
+
+A_PY = "import os\n\nx = 1  # pylint: disable=invalid-name\n\ny = 2  # pylint: disable=invalid-name\nz = 3\n" + \
+    "".join(f"v{i} = {i}\n" for i in range(8)) + "w = 4  # pylint: disable=invalid-name\n"
+
+
+def get_histories(histories_class, repo_dir, commits, **kwargs):
+    # commits: oldest to newest
+    suppression_sets = (suppressions for _, suppressions in iter_commit_suppressions(repo_dir, list(reversed(commits))))
+    dates = [f"date {i}" for i in range(len(commits))]
+    return histories_class(repo_dir, commits, dates, None, get_warning_kind_to_numeric_code(),
+            suppression_sets=suppression_sets, **kwargs)
+
+
+def as_tuples(delete_event_suppression_commit_list):
+    return [(d.last_exists_commit, d.delete_event["commit_id"], d.delete_event["file_path"],
+            d.delete_event["line_number"], d.delete_event["change_operation"])
+            for d in delete_event_suppression_commit_list]
+
+
+def test_ReverseBlameDeleteHistories_same_events_as_diff_all_hunks():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commits = create_git_repo(repo_dir, [
+            {"a.py": A_PY, "b.py": "import os  # pylint: disable=unused-import\n"},
+            # the suppressions of lines 5 and 15 go away, in two hunks, the one of line 3 stays unchanged
+            {"a.py": A_PY.replace("y = 2  # pylint: disable=invalid-name", "y = 2").replace(
+                "w = 4  # pylint: disable=invalid-name", "w = 4")},
+            # the file goes away
+            {"b.py": None},
+            {"c.py": "'''c'''\n"}])
+
+        forward = get_histories(GetSuppressionDeleteHistories, repo_dir, commits).track_commits_forward()
+        # by default, the first hunk is compared as a whole: line 3 is in its context lines, line 15 in the next hunk
+        assert as_tuples(forward) == [
+            (commits[0], commits[1][:8], "a.py", 3, "delete"),
+            (commits[0], commits[1][:8], "a.py", 5, "delete"),
+            (commits[1], commits[2][:8], "b.py", 1, "file delete")]
+
+        all_hunks_forward = get_histories(GetSuppressionDeleteHistories, repo_dir, commits,
+                all_hunks=True).track_commits_forward()
+        # with no context lines, and all hunks, only the changed lines have delete events
+        assert as_tuples(all_hunks_forward) == [
+            (commits[0], commits[1][:8], "a.py", 5, "delete"),
+            (commits[0], commits[1][:8], "a.py", 15, "delete"),
+            (commits[1], commits[2][:8], "b.py", 1, "file delete")]
+
+        reverse_blame = get_histories(ReverseBlameDeleteHistories, repo_dir, commits)
+        assert as_tuples(reverse_blame.track_commits_forward()) == as_tuples(all_hunks_forward)
+
+        reverse_blame = get_histories(ReverseBlameDeleteHistories, repo_dir, commits)
+        differences, verify_forward = reverse_blame.verify()
+        assert as_tuples(verify_forward) == as_tuples(all_hunks_forward)
+        assert differences == []
@@ -1,9 +1,11 @@
 import tempfile
 import subprocess
 from os.path import join
-from suppression_study.evolution.Select1000Commits import select_1000_commits
+from suppression_study.evolution.Select1000Commits import get_commits_first_use_suppression, select_1000_commits
+from suppression_study.suppression.GrepSuppressionPython import iter_suppressions
+from suppression_study.utils.FunctionsCommon import get_commit_list
 
-from tests.TestUtils import sort_and_compare_files
+from tests.TestUtils import create_git_repo, sort_and_compare_files
 
 
 def test_Select1000Commits():
@@ -17,4 +19,24 @@ def test_Select1000Commits():
         select_1000_commits(repo_dir, actual_result_file)
         
         expected_results_file = "tests/evolution/expected_selected_1000_commits.csv"
-        sort_and_compare_files(actual_result_file, expected_results_file)
\ No newline at end of file
+        sort_and_compare_files(actual_result_file, expected_results_file)
+
+def test_Select1000Commits_first_commit_with_suppressions():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "select-commits-repo")
+        commits = create_git_repo(repo_dir, [
+            {"a.py": "x = 1\n"},
+            {"README": "no Python file\n"},
+            # found by grep, but excluded by the format steps
+            {"lib/b.py": "y = 2  # pylint: disable=invalid-name\n"},
+            {"a.py": "x = 1  # pylint: disable=invalid-name\n"},
+            {"a.py": "x = 2\n"}])
+
+        # the same commit as checking every commit from the oldest one on
+        commits_with_suppressions = [i for i, commit in enumerate(commits) if list(iter_suppressions(repo_dir, commit))]
+        assert commits_with_suppressions[0] == 3
+        assert get_commits_first_use_suppression(repo_dir, commits, len(commits), None) == (commits[3], 3)
+
+        actual_result_file = join(demo_path, "check_commits_1000.csv")
+        select_1000_commits(repo_dir, actual_result_file)
+        assert get_commit_list(actual_result_file) == [commit[:8] for commit in reversed(commits[3:])]
@@ -0,0 +1,67 @@
+import json
+import subprocess
+import tempfile
+from os.path import join
+
+from suppression_study.evolution.Select1000Commits import select_1000_commits
+from tests.TestUtils import create_git_repo
+
+
+B_PY = "'''b'''\nimport os  # pylint: disable=unused-import\n\n\ndef f():\n    '''f'''\n    return 1\n"
+
+
+def run_history_module(module, repo_dir, results_dir, history_json_file):
+    # run module with --line_tracking on all commits of repo_dir, return the histories it writes
+    selected_1000_commits_csv = join(repo_dir, "check_commits_1000.csv")
+    select_1000_commits(repo_dir, selected_1000_commits_csv)
+    subprocess.run(["python", "-m", module,
+        "--repo_dir=" + repo_dir,
+        "--selected_1000_commits_csv=" + selected_1000_commits_csv,
+        "--results_dir=" + results_dir,
+        "--line_tracking"], check=True)
+
+    with open(join(results_dir, history_json_file), "r") as f:
+        return json.load(f)
+
+
+def test_ExtractHistoryWithChain_line_tracking():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commits = create_git_repo(repo_dir, [
+            {"a.py": "'''a'''\nx = 1  # pylint: disable=invalid-name\ny = 2\n",
+             "b.py": B_PY,
+             "d.py": "'''d'''\nimport sys  # pylint: disable=unused-import\n"},
+            # lines added above move the suppression of a.py, another one is added, b.py is renamed
+            {"a.py": "'''a'''\nimport os\n\nx = 1  # pylint: disable=invalid-name\ny = 2\n"
+                     "z = 3  # pylint: disable=invalid-name\n",
+             "b.py": None, "c.py": B_PY},
+            # both suppressions of a.py move again, d.py is deleted
+            {"a.py": "'''a'''\nimport os\nimport sys\n\nx = 1  # pylint: disable=invalid-name\ny = 2\n"
+                     "z = 3  # pylint: disable=invalid-name\n",
+             "d.py": None},
+            {"e.py": "'''e'''\n"}])
+        commits = [commit[:8] for commit in commits]
+
+        histories = run_history_module("suppression_study.suppression.intention.ExtractHistoryWithChain",
+                repo_dir, join(demo_path, "chain"), "histories_suppression_level_with_chain.json")
+        assert [[(event["commit_id"], event["file_path"], event["line_number"], event["change_operation"],
+                event.get("middle_status_chain")) for event in list(history.values())[0]] for history in histories] == [
+            # moved within the file
+            [(commits[0], "a.py", 2, "file add", str([["", commits[1], 4], ["", commits[2], 5], ["", commits[3], 5]])),
+             (commits[3], "a.py", 5, "remaining", None)],
+            # in a renamed file, the add event has the old path, the chain the path of the last event
+            [(commits[0], "b.py", 2, "file add", str([["", commits[1], 2], ["", commits[2], 2], ["", commits[3], 2]])),
+             (commits[3], "c.py", 2, "remaining", None)],
+            # in a deleted file
+            [(commits[0], "d.py", 2, "file add", str([["", commits[1], 2], ["", commits[2], 2]])),
+             (commits[2], "d.py", 2, "file delete", None)],
+            # added in the window, then moved
+            [(commits[1], "a.py", 6, "add", str([["", commits[2], 7], ["", commits[3], 7]])),
+             (commits[3], "a.py", 7, "remaining", None)]]
+
+        # the same histories as ExtractHistory, with the chains
+        all_histories = run_history_module("suppression_study.evolution.ExtractHistory",
+                repo_dir, join(demo_path, "all"), "histories_suppression_level_all.json")
+        for history in histories:
+            list(history.values())[0][0].pop("middle_status_chain")
+        assert all_histories == histories
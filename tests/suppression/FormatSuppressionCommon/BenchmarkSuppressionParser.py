@@ -0,0 +1,81 @@
+'''
+Micro-benchmark of SuppressionParser (FormatSuppressionCommon) against the former implementation,
+which split every line repeatedly and scanned specific_numeric_maps for every numeric code.
+Prints the throughput in lines per second, and checks that both return the same suppression texts.
+Run from the repository root: python -m tests.suppression.FormatSuppressionCommon.BenchmarkSuppressionParser
+'''
+
+import argparse
+import time
+
+from suppression_study.suppression.FormatSuppressionCommon import SuppressionParser
+from suppression_study.suppression.GrepSuppressionPython import GrepSuppressionPython
+from suppression_study.suppression.NumericSpecificTypeMap import get_warning_kind_to_numeric_code
+from tests.suppression.FormatSuppressionCommon.LegacyFormatSuppression import legacy_parse
+
+
+parser = argparse.ArgumentParser(description="Benchmark the suppression parser")
+parser.add_argument("--repo_dir", help="Repository to take the suppression lines from, "
+                    "if not given, use a fixed set of sample lines")
+parser.add_argument("--commit_id", help="Commit to take the suppression lines from", default="HEAD")
+parser.add_argument("--lines", help="Number of lines to parse per run", type=int, default=200000)
+
+SAMPLE_LINES = [
+    "# pylint: disable=no-member",
+    "# pylint: disable=W0703",
+    "# pylint: disable=C0103, W0212, too-many-locals",
+    "except Exception:  # pylint: disable=broad-except",
+    "def log_message(self, fmt, *args):  # pylint: disable=arguments-differ",
+    "import foo  # noqa # pylint: disable=unused-import",
+    "# noqa pylint: disable= no-member",
+    "# pylint: disable=invalid-name # pylint: disable=R0913",
+    "x = y  # pylint: disable=E1101 because the member is added at runtime",
+    "# pylint: disable-all",
+    "return 0  # type: ignore",
+    "value = compute()  # a plain comment",
+]
+
+
+def get_repo_lines(repo_dir, commit):
+    grep = GrepSuppressionPython(repo_dir, commit, None, scan_mode="git-grep")
+    file_to_lines = grep.get_raw_suppression_results(commit)
+    return [code.strip() for lines in file_to_lines.values() for _, code in lines]
+
+
+def measure(name, parse, lines):
+    start_time = time.perf_counter()
+    for line in lines:
+        parse(line)
+    seconds = time.perf_counter() - start_time
+    print(f"{name:<28} {len(lines) / seconds:>12,.0f} lines/sec")
+
+
+def main(lines_to_parse, specific_numeric_maps):
+    # same results, except for lines the former implementation fails on
+    failing_lines = set()
+    for line in set(lines_to_parse):
+        expected = legacy_parse(line, specific_numeric_maps)
+        if expected is None:
+            failing_lines.add(line)
+        else:
+            assert list(SuppressionParser("#", specific_numeric_maps).parse(line)) == expected, line
+    lines_to_parse = [line for line in lines_to_parse if line not in failing_lines]
+    print(f"{len(lines_to_parse)} lines, {len(set(lines_to_parse))} distinct "
+          f"(skipped {len(failing_lines)} distinct lines the former implementation fails on)")
+
+    measure("former implementation", lambda line: legacy_parse(line, specific_numeric_maps), lines_to_parse)
+    not_memoized = SuppressionParser("#", specific_numeric_maps, max_memoized_lines=0)
+    measure("SuppressionParser", not_memoized.parse, lines_to_parse)
+    memoized = SuppressionParser("#", specific_numeric_maps)
+    measure("SuppressionParser, memoized", memoized.parse, lines_to_parse)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    source_lines = SAMPLE_LINES
+    if args.repo_dir:
+        source_lines = get_repo_lines(args.repo_dir, args.commit_id)
+    if not source_lines:
+        raise ValueError("No suppression lines to parse")
+    lines_to_parse = [source_lines[i % len(source_lines)] for i in range(args.lines)]
+    main(lines_to_parse, get_warning_kind_to_numeric_code())
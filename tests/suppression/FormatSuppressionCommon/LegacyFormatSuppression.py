@@ -0,0 +1,93 @@
+'''
+The former suppression formatting of FormatSuppressionCommon, before SuppressionParser,
+as reference for the tests and the benchmark of SuppressionParser.
+'''
+
+import re
+
+from suppression_study.suppression.FormatSuppressionCommon import get_suppressor
+
+
+def legacy_get_suppression_from_source_code(suppressor, comment_symbol, code_suppression, specific_numeric_maps):
+    # the former get_suppression_from_source_code, as reference
+    if suppressor == "":
+        return []
+    preprocessed_suppression = ""
+    if code_suppression.startswith("# noqa"):
+        tmp_check = code_suppression.split("pylint")[1]
+        if comment_symbol in tmp_check:
+            tmp_check = tmp_check.split(comment_symbol)[0]
+        code_suppression = f"# pylint{tmp_check}"
+    if not code_suppression.startswith(suppressor):
+        suppression_content = ""
+        if comment_symbol in code_suppression:
+            suppression_tmp = code_suppression.split("pylint:")[1]
+            if comment_symbol in suppression_tmp:
+                suppression_content = suppressor + suppression_tmp.split(comment_symbol, 1)[0]
+            else:
+                suppression_content = suppressor + suppression_tmp
+            preprocessed_suppression = suppression_content
+        else:
+            preprocessed_suppression = None
+    else:
+        if code_suppression.count(comment_symbol) >= 2:
+            index_of_second_comment = [m.start() for m in re.finditer(suppressor, code_suppression)][1]
+            preprocessed_suppression = code_suppression[:index_of_second_comment].strip()
+        else:
+            preprocessed_suppression = code_suppression
+    return legacy_get_separated_suppressions(preprocessed_suppression, specific_numeric_maps)
+
+
+def legacy_get_separated_suppressions(suppression_text, specific_numeric_maps):
+    # the former get_separated_suppressions, as reference
+    preprocessed_suppression_texts = []
+    separator = ""
+    raw_warning_type = ""
+    suppressor_part = ""
+    if "=" in suppression_text:
+        separator = "="
+    elif "(" in suppression_text:
+        separator = "("
+    elif "[" in suppression_text:
+        separator = "["
+    else:
+        if "disable-all" in suppression_text and "pylint" in suppression_text:
+            raw_warning_type = "all"
+            suppressor_part = "# pylint: disable"
+    if separator:
+        tmp = suppression_text.split(separator)
+        suppressor_part = tmp[0]
+        raw_warning_type = tmp[1].replace("]", "", 1).strip()
+    last_type = ""
+    multi_raw_warning_type = []
+    if "," in raw_warning_type:
+        multi_raw_warning_type_tmp = raw_warning_type.split(",")
+        multi_raw_warning_type = [warning_type.strip() for warning_type in multi_raw_warning_type_tmp]
+        last_type = multi_raw_warning_type[-1]
+    else:
+        multi_raw_warning_type.append(raw_warning_type)
+        last_type = raw_warning_type
+    if " " in last_type:
+        multi_raw_warning_type[-1] = last_type.split(" ")[0]
+    for t in multi_raw_warning_type:
+        if bool(re.search(r'\d', t)) == True:
+            for specific, numeric in specific_numeric_maps.items():
+                if t == numeric:
+                    t = specific
+                    break
+        if "# pylint:" in suppressor_part:
+            suppression_text = f"{suppressor_part}={t}"
+        else:
+            suppression_text = f"{suppressor_part}[{t}]"
+        preprocessed_suppression_texts.append(suppression_text)
+    return preprocessed_suppression_texts
+
+
+def legacy_parse(code_suppression, specific_numeric_maps):
+    suppressor = get_suppressor(code_suppression)
+    if not suppressor:
+        return []
+    try:
+        return legacy_get_suppression_from_source_code(suppressor, "#", code_suppression, specific_numeric_maps)
+    except (IndexError, TypeError):
+        return None # the former implementation fails on some lines
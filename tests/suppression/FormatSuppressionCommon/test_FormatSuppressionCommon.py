@@ -0,0 +1,84 @@
+from suppression_study.suppression.FormatSuppressionCommon import FormatSuppressionCommon, SuppressionParser, \
+    get_separated_suppressions, get_suppression_from_source_code, get_suppressor
+from suppression_study.suppression.NumericSpecificTypeMap import get_warning_kind_to_numeric_code
+from tests.suppression.FormatSuppressionCommon.LegacyFormatSuppression import legacy_get_separated_suppressions, \
+    legacy_parse
+
+
+# source line -> suppression texts
+PARSED_LINES = [
+    ("# pylint: disable=no-member", ["# pylint: disable=no-member"]),
+    # numeric codes
+    ("# pylint: disable=W0703", ["# pylint: disable=broad-except"]),
+    ("# pylint: disable=C0103, W0212, too-many-locals",
+     ["# pylint: disable=invalid-name", "# pylint: disable=protected-access", "# pylint: disable=too-many-locals"]),
+    ("# pylint: disable=unused-import,W0611", ["# pylint: disable=unused-import", "# pylint: disable=unused-import"]),
+    ("# pylint: disable=W9999", ["# pylint: disable=W9999"]),
+    # after source code
+    ("except Exception:  # pylint: disable=broad-except", ["# pylint: disable=broad-except"]),
+    ("x = y  # pylint: disable=E1101 because the member is added at runtime", ["# pylint: disable=no-member"]),
+    # mixed with noqa
+    ("import foo  # noqa # pylint: disable=unused-import", ["# pylint: disable=unused-import"]),
+    ("# noqa pylint: disable= no-member", ["# pylint: disable=no-member"]),
+    ("# noqa # pylint: disable=W0611 # a comment", ["# pylint: disable=unused-import"]),
+    # multiple comments
+    ("# pylint: disable=invalid-name # pylint: disable=R0913", ["# pylint: disable=invalid-name"]),
+    ("x = 1  # type: ignore  # pylint: disable=invalid-name,W0612",
+     ["# pylint: disable=invalid-name", "# pylint: disable=unused-variable"]),
+    ("# pylint: disable-all", ["# pylint: disable=all"]),
+    # no Pylint suppression
+    ("return 0  # type: ignore", []),
+    ("value = compute()  # a plain comment", []),
+]
+
+# lines the former implementation fails on
+LEGACY_FAILING_LINES = [
+    # a single suppressor, and another comment
+    ("# pylint: disable=invalid-name # a comment", ["# pylint: disable=invalid-name"]),
+    # no comment symbol
+    ("pylint: disable=invalid-name", []),
+]
+
+
+def test_SuppressionParser_same_as_legacy():
+    specific_numeric_maps = get_warning_kind_to_numeric_code()
+    parser = SuppressionParser("#", specific_numeric_maps)
+    for line, expected in PARSED_LINES:
+        assert list(parser.parse(line)) == expected, line
+        assert legacy_parse(line, specific_numeric_maps) == expected, line
+        assert get_suppression_from_source_code(get_suppressor(line), "#", line, specific_numeric_maps) == expected
+    for line, expected in LEGACY_FAILING_LINES:
+        assert list(parser.parse(line)) == expected, line
+        assert legacy_parse(line, specific_numeric_maps) is None, line
+
+
+def test_get_separated_suppressions_same_as_legacy():
+    specific_numeric_maps = get_warning_kind_to_numeric_code()
+    for suppression_text, expected in [
+            ("# pylint: disable=no-member, W0703", ["# pylint: disable=no-member", "# pylint: disable=broad-except"]),
+            ("# type: ignore[assignment]", ["# type: ignore[assignment]"]),
+            ("# type: ignore[assignment, misc]", ["# type: ignore[assignment]", "# type: ignore[misc]"]),
+            ("# pylint: disable-all", ["# pylint: disable=all"])]:
+        assert get_separated_suppressions(suppression_text, specific_numeric_maps) == expected
+        assert legacy_get_separated_suppressions(suppression_text, specific_numeric_maps) == expected
+
+
+def test_SuppressionParser_first_specific_type_of_numeric_code():
+    # several specific types with the same numeric code, the first one is taken, like a scan over the map
+    specific_numeric_maps = {"old-name": "W0001", "new-name": "W0001"}
+    assert SuppressionParser("#", specific_numeric_maps).parse("# pylint: disable=W0001") == \
+        ("# pylint: disable=old-name",)
+    assert legacy_parse("# pylint: disable=W0001", specific_numeric_maps) == ["# pylint: disable=old-name"]
+
+
+def test_FormatSuppressionCommon_iter_suppressions():
+    formatter = FormatSuppressionCommon("#", None, None, get_warning_kind_to_numeric_code())
+    raw_suppressions = [
+        ("a.py", 1, "x = 1  # pylint: disable=invalid-name,W0612"),
+        ("a.py", 3, "y = 2  # a plain comment"),
+        ("lib/b.py", 1, "import os  # pylint: disable=unused-import"), # excluded folder
+        ("c.py", "2", "  # pylint: disable=W0611  ")]
+    assert [(s.path, s.text, s.line) for s in formatter.iter_suppressions(raw_suppressions)] == [
+        ("a.py", "# pylint: disable=invalid-name", 1),
+        ("a.py", "# pylint: disable=unused-variable", 1),
+        ("c.py", "# pylint: disable=unused-import", 2)]
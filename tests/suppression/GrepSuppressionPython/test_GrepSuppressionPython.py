@@ -2,9 +2,13 @@ import tempfile
 import subprocess
 import os
 from os.path import join
+import pytest
 
+from suppression_study.suppression.GrepSuppressionPython import iter_suppressions
+from suppression_study.suppression.GrepSuppressionSuper import GrepSuppressionSuper
+from suppression_study.suppression.Suppression import write_suppressions_to_file
 from suppression_study.utils.FunctionsCommon import write_commit_info_to_csv
-from tests.TestUtils import sort_and_compare_files
+from tests.TestUtils import create_git_repo, exactly_compare_files, sort_and_compare_files
 
 # TODO newly edited suppression format steps are not well fit for mypy, fix it later
 # def test_GrepSuppressionPython_mypy_commit_list():
@@ -46,3 +50,165 @@ def test_GrepSuppressionPython_pylint_single_commit():
         actual_results = join(demo_path,"grep/a09fcfec_suppression.csv")
         sort_and_compare_files(actual_results, expected_results)
 
+def test_GrepSuppressionPython_pylint_single_commit_git_grep():
+    expected_results = "tests/suppression/GrepSuppressionPython/PylintSuppression/expected_a09fcfec_suppression.csv"
+    with tempfile.TemporaryDirectory() as demo_path:
+        demo_repo_name = "suppression-test-python-pylint"
+        demo_repo_git_link = "https://github.com/michaelpradel/suppression-test-python-pylint.git"
+        subprocess.run("git clone " + demo_repo_git_link, cwd=demo_path, shell=True)
+
+        repo_dir = join(demo_path, demo_repo_name)
+        subprocess.run(["python", "-m", "suppression_study.suppression.GrepSuppressionPython",
+            "--repo_dir=" + repo_dir,
+            "--commit_id=a09fcfec",
+            "--results_dir=" + demo_path,
+            "--scan_mode=git-grep"])
+
+        actual_results = join(demo_path,"grep/a09fcfec_suppression.csv")
+        sort_and_compare_files(actual_results, expected_results)
+
+def test_GrepSuppressionPython_pylint_single_commit_iter_suppressions():
+    expected_results = "tests/suppression/GrepSuppressionPython/PylintSuppression/expected_a09fcfec_suppression.csv"
+    with tempfile.TemporaryDirectory() as demo_path:
+        demo_repo_name = "suppression-test-python-pylint"
+        demo_repo_git_link = "https://github.com/michaelpradel/suppression-test-python-pylint.git"
+        subprocess.run("git clone " + demo_repo_git_link, cwd=demo_path, shell=True)
+
+        repo_dir = join(demo_path, demo_repo_name)
+        # no file is written by iter_suppressions, write them here to compare
+        actual_results = join(demo_path, "a09fcfec_suppression.csv")
+        write_suppressions_to_file(iter_suppressions(repo_dir, "a09fcfec"), actual_results)
+        sort_and_compare_files(actual_results, expected_results)
+
+def test_GrepSuppressionPython_pylint_commit_list_incremental():
+    with tempfile.TemporaryDirectory() as demo_path:
+        demo_repo_name = "suppression-test-python-pylint"
+        demo_repo_git_link = "https://github.com/michaelpradel/suppression-test-python-pylint.git"
+        subprocess.run("git clone " + demo_repo_git_link, cwd=demo_path, shell=True)
+
+        repo_dir = join(demo_path, demo_repo_name)
+        commit_csv_file = join(demo_path, "check_commits.csv")
+        write_commit_info_to_csv(repo_dir, commit_csv_file)
+
+        # the incremental scan should find the same suppressions as checking out every commit
+        for scan_mode in ["checkout", "incremental"]:
+            subprocess.run(["python", "-m", "suppression_study.suppression.GrepSuppressionPython",
+                "--repo_dir=" + repo_dir,
+                "--commit_id=" + commit_csv_file,
+                "--results_dir=" + join(demo_path, scan_mode),
+                "--scan_mode=" + scan_mode])
+
+        expected_grep_folder = join(demo_path, "checkout", "grep")
+        actual_grep_folder = join(demo_path, "incremental", "grep")
+        expected_csvs = [f for f in os.listdir(expected_grep_folder) if f.endswith(".csv")]
+        actual_csvs = [f for f in os.listdir(actual_grep_folder) if f.endswith(".csv")]
+        assert sorted(actual_csvs) == sorted(expected_csvs)
+        for csv_file in expected_csvs:
+            sort_and_compare_files(join(actual_grep_folder, csv_file), join(expected_grep_folder, csv_file))
+
+
+def test_GrepSuppressionPython_pylint_commit_list_log():
+    with tempfile.TemporaryDirectory() as demo_path:
+        demo_repo_name = "suppression-test-python-pylint"
+        demo_repo_git_link = "https://github.com/michaelpradel/suppression-test-python-pylint.git"
+        subprocess.run("git clone " + demo_repo_git_link, cwd=demo_path, shell=True)
+
+        repo_dir = join(demo_path, demo_repo_name)
+        commit_csv_file = join(demo_path, "check_commits.csv")
+        write_commit_info_to_csv(repo_dir, commit_csv_file)
+
+        # replaying the diffs of "git log" should find the same suppressions as checking out every commit
+        for scan_mode in ["checkout", "log"]:
+            subprocess.run(["python", "-m", "suppression_study.suppression.GrepSuppressionPython",
+                "--repo_dir=" + repo_dir,
+                "--commit_id=" + commit_csv_file,
+                "--results_dir=" + join(demo_path, scan_mode),
+                "--scan_mode=" + scan_mode])
+
+        expected_grep_folder = join(demo_path, "checkout", "grep")
+        actual_grep_folder = join(demo_path, "log", "grep")
+        expected_csvs = [f for f in os.listdir(expected_grep_folder) if f.endswith(".csv")]
+        actual_csvs = [f for f in os.listdir(actual_grep_folder) if f.endswith(".csv")]
+        assert sorted(actual_csvs) == sorted(expected_csvs)
+        for csv_file in expected_csvs:
+            sort_and_compare_files(join(actual_grep_folder, csv_file), join(expected_grep_folder, csv_file))
+        exactly_compare_files(join(demo_path, "log", "main_suppression_nums_pylint.csv"),
+                join(demo_path, "checkout", "main_suppression_nums_pylint.csv"))
+
+
+def test_GrepSuppressionPython_pylint_commit_list_snapshot_store():
+    with tempfile.TemporaryDirectory() as demo_path:
+        demo_repo_name = "suppression-test-python-pylint"
+        demo_repo_git_link = "https://github.com/michaelpradel/suppression-test-python-pylint.git"
+        subprocess.run("git clone " + demo_repo_git_link, cwd=demo_path, shell=True)
+
+        repo_dir = join(demo_path, demo_repo_name)
+        commit_csv_file = join(demo_path, "check_commits.csv")
+        write_commit_info_to_csv(repo_dir, commit_csv_file)
+
+        subprocess.run(["python", "-m", "suppression_study.suppression.GrepSuppressionPython",
+            "--repo_dir=" + repo_dir,
+            "--commit_id=" + commit_csv_file,
+            "--results_dir=" + join(demo_path, "csv")])
+        snapshot_store_file = join(demo_path, "suppression_snapshots.sqlite")
+        subprocess.run(["python", "-m", "suppression_study.suppression.GrepSuppressionPython",
+            "--repo_dir=" + repo_dir,
+            "--commit_id=" + commit_csv_file,
+            "--results_dir=" + join(demo_path, "store"),
+            "--snapshot_store=" + snapshot_store_file])
+
+        # the exported store should have the same .csv files as the legacy layout
+        exported_grep_folder = join(demo_path, "exported")
+        subprocess.run(["python", "-m", "suppression_study.suppression.SuppressionSnapshotStore",
+            "--store=" + snapshot_store_file,
+            "--export_dir=" + exported_grep_folder])
+
+        expected_grep_folder = join(demo_path, "csv", "grep")
+        expected_csvs = [f for f in os.listdir(expected_grep_folder) if f.endswith(".csv")]
+        actual_csvs = [f for f in os.listdir(exported_grep_folder) if f.endswith(".csv")]
+        assert sorted(actual_csvs) == sorted(expected_csvs)
+        for csv_file in expected_csvs:
+            sort_and_compare_files(join(exported_grep_folder, csv_file), join(expected_grep_folder, csv_file))
+
+
+def test_GrepSuppressionPython_git_grep_line_boundaries():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        # a single "\r" is no line boundary for git grep, a "\r\n" line ending is removed
+        code = b"a = 1  # pylint: disable=invalid-name\rb = 2\nc = 3  # pylint: disable=unused-variable\r\n"
+        commits = create_git_repo(repo_dir, [{"a.py": code, "b.py": "x = 1\n"}])
+
+        grep = GrepSuppressionSuper("*.py", "* pylint: *disable", "git-grep")
+        assert grep.git_grep_matches(repo_dir, commits) == {commits[0]: {"a.py": {
+            1: "a = 1  # pylint: disable=invalid-name\rb = 2",
+            2: "c = 3  # pylint: disable=unused-variable"}}}
+        # the same results as a scan of the checked out files
+        assert grep.git_grep(repo_dir, commits)[commits[0]] == grep.scan_working_tree(repo_dir)
+
+        # no suppression is no error, an unknown commit is
+        assert grep.git_grep_matches(repo_dir, commits, ["b.py"]) == {commits[0]: {}}
+        with pytest.raises(RuntimeError):
+            grep.git_grep_matches(repo_dir, ["0000000"])
+
+
+def test_GrepSuppressionPython_get_changed_files():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        # "\udce9": the single byte 0xe9 in the file name, no UTF-8
+        commits = create_git_repo(repo_dir, [
+            {"a.py": "x = 1  # pylint: disable=invalid-name\n", "b.py": "y = 2\n", "c.py": "'''c'''\nz = 3\n",
+             "README": "no Python file\n"},
+            {"a.py": "x = 2  # pylint: disable=invalid-name\n", "b.py": None,
+             "c.py": None, "d/c.py": "'''c'''\nz = 3\n", "README": None,
+             "\udce9.py": "w = 4  # pylint: disable=invalid-name\n"}])
+
+        grep = GrepSuppressionSuper("*.py", "* pylint: *disable", "incremental")
+        deleted_files, changed_files = grep.get_changed_files(repo_dir, commits[0], commits[1])
+        # a renamed file is deleted + added
+        assert sorted(deleted_files) == ["b.py", "c.py"]
+        assert sorted(changed_files) == ["a.py", "d/c.py", "�.py"]
+        # the same paths as git grep reports
+        assert sorted(grep.git_grep_matches(repo_dir, [commits[1]])[commits[1]]) == ["a.py", "�.py"]
+
+        with pytest.raises(RuntimeError):
+            grep.get_changed_files(repo_dir, commits[0], "0000000")
@@ -0,0 +1,99 @@
+import tempfile
+from os.path import join
+import pytest
+
+from suppression_study.suppression.GrepSuppressionPython import GrepSuppressionPython
+from suppression_study.suppression.SuppressionCache import SuppressionCache
+from tests.TestUtils import create_git_repo
+
+
+def test_SuppressionCache_hit_and_miss():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_file = join(cache_dir, "cache.sqlite")
+        rows = [["./a.py", "# pylint: disable=invalid-name", 1]]
+        cache = SuppressionCache(cache_file, "v1")
+        assert cache.get("blob_a") is None
+        cache.put("blob_a", rows)
+        assert cache.get("blob_a") == rows # not flushed yet
+        cache.close()
+
+        # persistent across runs, another version is another entry
+        cache = SuppressionCache(cache_file, "v1")
+        assert cache.get("blob_a") == rows
+        cache.close()
+        cache = SuppressionCache(cache_file, "v2")
+        assert cache.get("blob_a") is None
+        assert cache.get_stats()["entries"] == 1
+        cache.close()
+
+
+def test_SuppressionCache_unchanged_files_hit_across_commits():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commits = create_git_repo(repo_dir, [
+            {"a.py": "x = 1  # pylint: disable=invalid-name\n", "b.py": "import os  # pylint: disable=unused-import\n"},
+            {"b.py": "y = 2\nimport os  # pylint: disable=unused-import,W0611\n"}])
+        newest_first_commits = list(reversed(commits))
+
+        grep = GrepSuppressionPython(repo_dir, None, None, "pylint", "git-grep")
+        expected = list(grep.iter_commit_suppressions(newest_first_commits))
+        assert len(expected[1][1]) == 3
+
+        cache_file = join(demo_path, "cache.sqlite")
+        for run in range(2):
+            grep = GrepSuppressionPython(repo_dir, None, None, "pylint", "git-grep", cache_file)
+            actual = list(grep.iter_commit_suppressions(newest_first_commits))
+            assert actual == expected
+            stats = grep.suppression_cache.get_stats()
+            if run == 0: # a.py is the same blob in both commits
+                assert (stats["hits"], stats["misses"]) == (1, 3)
+            else:
+                assert (stats["hits"], stats["misses"]) == (4, 0)
+            grep.suppression_cache.close()
+
+
+def test_SuppressionCache_eviction():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = SuppressionCache(join(cache_dir, "cache.sqlite"), "v1", max_entries=2)
+        for blob in ["blob_a", "blob_b"]:
+            cache.put(blob, [])
+        cache.flush()
+        assert cache.get("blob_a") == []
+        cache.flush()
+        cache.put("blob_c", [])
+        cache.flush()
+        # the least recently used entry goes
+        assert cache.get("blob_b") is None
+        assert cache.get_stats()["entries"] == cache.entries == 2
+        assert cache.get_stats()["evictions"] == 1
+        cache.close()
+
+
+def test_SuppressionCache_file_blobs_from_diffs():
+    with tempfile.TemporaryDirectory() as demo_path:
+        repo_dir = join(demo_path, "repo")
+        commits = create_git_repo(repo_dir, [
+            {"a.py": "x = 1  # pylint: disable=invalid-name\n", "b.py": "import os  # pylint: disable=unused-import\n",
+             "c.py": "y = 2  # pylint: disable=invalid-name\n", "d.py": "z = 3\n"},
+            # modified, no suppression anymore, a suppression added
+            {"a.py": "x = 2  # pylint: disable=invalid-name\n", "c.py": "y = 2\n",
+             "d.py": "z = 3  # pylint: disable=invalid-name\n"},
+            # deleted, added, unchanged a.py
+            {"b.py": None, "e.py": "import sys  # pylint: disable=unused-import\n"}])
+        newest_first_commits = list(reversed(commits))
+        expected = list(GrepSuppressionPython(repo_dir, None, None, "pylint", "git-grep")
+                .iter_commit_suppressions(newest_first_commits))
+
+        for scan_mode in ["incremental", "log"]:
+            grep = GrepSuppressionPython(repo_dir, None, None, "pylint", scan_mode, join(demo_path, f"{scan_mode}.sqlite"))
+            # the blobs of the scan are the ones of git ls-tree
+            for commit, file_to_lines in grep.iter_raw_suppression_results(newest_first_commits):
+                assert grep.file_blobs == grep.get_file_blobs(repo_dir, commit, sorted(file_to_lines))
+                assert sorted(grep.file_blobs) == sorted(file_to_lines)
+            assert list(grep.iter_commit_suppressions(newest_first_commits)) == expected
+            # the unchanged files: b.py in the second commit, a.py and d.py in the last one
+            assert grep.suppression_cache.get_stats()["hits"] == 3
+            grep.suppression_cache.close()
+
+        with pytest.raises(RuntimeError):
+            grep.get_file_blobs(repo_dir, "0000000", ["a.py"])
@@ -0,0 +1,60 @@
+import tempfile
+from os.path import dirname, exists, join
+
+from suppression_study.suppression import SuppressionRemover as suppression_remover
+from suppression_study.suppression.Suppression import Suppression
+from suppression_study.suppression.SuppressionRemover import SuppressionRemover
+
+
+FILES = {
+    "a.py": "x = f(1)  # type: ignore[arg-type]\r\ny = 2  # type: ignore\r\n",
+    "b.py": "import c  # type: ignore\nz = 3  # pylint: disable=invalid-name"}
+SUPPRESSIONS = [
+    Suppression("a.py", "# type: ignore[arg-type]", 1),
+    Suppression("b.py", "# type: ignore", 1),
+    Suppression("b.py", "# pylint: disable=invalid-name", 2)]
+
+
+def write_files(repo_dir):
+    for path, content in FILES.items():
+        with open(join(repo_dir, path), "w", newline="") as f:
+            f.write(content)
+
+
+def read_file(file):
+    with open(file, "r", newline="") as f:
+        return f.read()
+
+
+def test_SuppressionRemover_overlay_same_as_in_place():
+    with tempfile.TemporaryDirectory() as repo_dir:
+        write_files(repo_dir)
+        remover = SuppressionRemover(repo_dir)
+        remover.remove_suppressions(SUPPRESSIONS)
+        removed = {path: read_file(join(repo_dir, path)) for path in FILES}
+        assert removed["b.py"] == "import c\nz = 3"
+        remover.restore()
+        assert {path: read_file(join(repo_dir, path)) for path in FILES} == FILES
+
+        overlay_remover = SuppressionRemover(repo_dir, overlay=True)
+        overlay_remover.remove_suppressions(SUPPRESSIONS)
+        shadow_files = overlay_remover.get_shadow_files()
+        assert {path: read_file(shadow_file) for path, shadow_file in shadow_files.items()} == removed
+        # the repository stays the same
+        assert {path: read_file(join(repo_dir, path)) for path in FILES} == FILES
+        overlay_remover.restore()
+        overlay_remover.close()
+        assert not any(exists(shadow_file) for shadow_file in shadow_files.values())
+
+
+def test_SuppressionRemover_overlay_without_shared_memory(monkeypatch):
+    with tempfile.TemporaryDirectory() as repo_dir:
+        monkeypatch.setattr(suppression_remover, "SHARED_MEMORY_DIR", join(repo_dir, "no_shm"))
+        write_files(repo_dir)
+        remover = SuppressionRemover(repo_dir, overlay=True)
+        remover.remove_suppressions(SUPPRESSIONS[:1])
+        shadow_file = remover.get_shadow_files()["a.py"]
+        assert dirname(dirname(shadow_file)) == tempfile.gettempdir()
+        assert read_file(shadow_file) == "x = f(1)\ny = 2  # type: ignore\n"
+        remover.restore()
+        remover.close()
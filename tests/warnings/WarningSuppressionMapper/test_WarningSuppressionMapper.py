@@ -1,7 +1,14 @@
-from os.path import join
+import csv
+import os
+from os.path import join, realpath
 import tempfile
 import subprocess
-from tests.TestUtils import sort_and_compare_files
+from git.exc import GitCommandError
+import pytest
+from suppression_study.suppression.Suppression import Suppression, read_suppressions_from_file, write_suppressions_to_file
+from suppression_study.warnings import WarningSuppressionMapper as mapper
+from suppression_study.warnings.WarningSuppressionMapper import SuppressionRemovalChecker, create_removal_checkers, main
+from tests.TestUtils import create_git_repo, sort_and_compare_files
 
 
 def test_mapping():
@@ -35,3 +42,156 @@ def test_mapping():
         mapping_actual = join(working_dir, "7178e728_useless_suppressions.csv")
         mapping_expected = "tests/warnings/WarningSuppressionMapper/expected_useless_suppressions.csv"
         sort_and_compare_files(mapping_actual, mapping_expected)
+
+
+MYPY_FILES = {
+    "a.py": "def f(x: int, y: int) -> int:\n    return x + y\n\n\ndef g(s: str) -> str:\n    return s\n\n\n"
+            # one statement, two suppressions that may both suppress both warnings
+            "A = f(\"a\",  # type: ignore[arg-type]\n      \"b\")  # type: ignore[arg-type]\n"
+            "B: int = g(\"c\")  # type: ignore[assignment]\n"
+            "C: int = 1  # type: ignore\n"
+            "D = f(1,  # type: ignore\n      2)\n",
+    "b.py": "import a\n\nE: str = a.f(1, 2)  # type: ignore\nF = a.g(1)  # type: ignore[arg-type, assignment]\n\n\n"
+            "class K:\n    def m(self) -> int:\n        return 1\n\n\n"
+            # suppresses a method-assign error, a sub-code of assignment
+            "K().m = lambda: 2  # type: ignore[assignment]\n"}
+
+# the suppressions of MYPY_FILES, the mapper's own scan finds only Pylint suppressions
+MYPY_SUPPRESSIONS = [
+    Suppression("a.py", "# type: ignore[arg-type]", 9),
+    Suppression("a.py", "# type: ignore[arg-type]", 10),
+    Suppression("a.py", "# type: ignore[assignment]", 11),
+    Suppression("a.py", "# type: ignore", 12),
+    Suppression("a.py", "# type: ignore", 13),
+    Suppression("b.py", "# type: ignore", 3),
+    Suppression("b.py", "# type: ignore[arg-type, assignment]", 4),
+    Suppression("b.py", "# type: ignore[assignment]", 12)]
+
+EXPECTED_MYPY_MAPPING = [
+    ["a.py", "# type: ignore", "12", "", "", ""],
+    ["a.py", "# type: ignore", "13", "", "", ""],
+    ["a.py", "# type: ignore[arg-type]", "10", "a.py", "arg-type", "10"],
+    ["a.py", "# type: ignore[arg-type]", "9", "a.py", "arg-type", "9"],
+    ["a.py", "# type: ignore[assignment]", "11", "a.py", "assignment", "11"],
+    ["b.py", "# type: ignore", "3", "b.py", "assignment", "3"],
+    ["b.py", "# type: ignore[arg-type, assignment]", "4", "b.py", "arg-type", "4"],
+    ["b.py", "# type: ignore[assignment]", "12", "b.py", "method-assign", "12"]]
+
+
+def compute_mypy_mapping(repo_dir, commit_id, results_dir, extra_args=()):
+    # run the mapper for mypy on MYPY_SUPPRESSIONS, return the sorted rows of the mapping
+    os.makedirs(results_dir)
+    suppressions_file = join(results_dir, "suppressions.csv")
+    write_suppressions_to_file(MYPY_SUPPRESSIONS, suppressions_file)
+    subprocess.run(["python", "-m", "suppression_study.warnings.WarningSuppressionMapper",
+                    "--repo_dir=" + repo_dir,
+                    "--commit_id=" + commit_id,
+                    "--checker=mypy",
+                    "--results_dir=" + results_dir,
+                    "--suppressions_file=" + suppressions_file] + list(extra_args), check=True)
+    with open(join(results_dir, f"{commit_id}_mapping.csv"), "r") as f:
+        return sorted(csv.reader(f))
+
+
+def test_mapping_mypy_group_testing():
+    with tempfile.TemporaryDirectory() as working_dir:
+        repo_dir = join(working_dir, "repo")
+        commit_id = create_git_repo(repo_dir, [MYPY_FILES])[0][:8] # the mapper compares commits by 8 characters
+
+        mapping = compute_mypy_mapping(repo_dir, commit_id, join(working_dir, "group"))
+        assert mapping == EXPECTED_MYPY_MAPPING
+        assert compute_mypy_mapping(repo_dir, commit_id, join(working_dir, "one_by_one"), ["--one_by_one"]) == mapping
+
+
+def get_worktrees(repo_dir):
+    worktrees = subprocess.run(["git", "worktree", "list", "--porcelain"], cwd=repo_dir, stdout=subprocess.PIPE,
+                               universal_newlines=True, check=True).stdout
+    return [line[len("worktree "):] for line in worktrees.splitlines() if line.startswith("worktree ")]
+
+
+def test_create_removal_checkers_failure(capsys, monkeypatch):
+    with tempfile.TemporaryDirectory() as working_dir:
+        repo_dir = join(working_dir, "repo")
+        commit_id = create_git_repo(repo_dir, [MYPY_FILES])[0]
+        # git can't add a worktree of a missing commit
+        with pytest.raises(GitCommandError):
+            create_removal_checkers(2, repo_dir, set(), "0" * 40, "mypy", join(working_dir, "results"))
+        assert "Failed to create worker 1 of 2" in capsys.readouterr().out
+        assert get_worktrees(repo_dir) == [realpath(repo_dir)]
+
+        # a failure after adding the worktree
+        def failing_get_source_files(worktree_dir):
+            raise OSError(f"no files in {worktree_dir}")
+
+        monkeypatch.setattr(mapper, "get_mypy_source_files", failing_get_source_files)
+        with pytest.raises(OSError):
+            create_removal_checkers(2, repo_dir, set(), commit_id, "mypy", join(working_dir, "results"))
+        assert get_worktrees(repo_dir) == [realpath(repo_dir)]
+
+
+def test_mapping_mypy_unused_ignores(monkeypatch):
+    # the suppressions Mypy reports unused are never removed, the mapping stays the same
+    removed_suppressions = []
+    get_new_warnings = SuppressionRemovalChecker.get_new_warnings
+
+    def recording_get_new_warnings(self, suppressions):
+        removed_suppressions.extend(suppressions)
+        return get_new_warnings(self, suppressions)
+
+    monkeypatch.setattr(SuppressionRemovalChecker, "get_new_warnings", recording_get_new_warnings)
+    with tempfile.TemporaryDirectory() as working_dir:
+        repo_dir = join(working_dir, "repo")
+        commit_id = create_git_repo(repo_dir, [MYPY_FILES])[0][:8]
+        suppressions_file = join(working_dir, "suppressions.csv")
+        write_suppressions_to_file(MYPY_SUPPRESSIONS, suppressions_file)
+        main(repo_dir, commit_id, "mypy", working_dir, suppressions_file, unused_ignores=True)
+
+        with open(join(working_dir, f"{commit_id}_mapping.csv"), "r") as f:
+            assert sorted(csv.reader(f)) == EXPECTED_MYPY_MAPPING
+        useless_suppressions = [Suppression("a.py", "# type: ignore", 12), Suppression("a.py", "# type: ignore", 13)]
+        assert read_suppressions_from_file(join(working_dir, "checker_results", "mypy",
+                                                f"{commit_id}_useless_suppressions.csv")) == useless_suppressions
+        assert removed_suppressions
+        assert not set(removed_suppressions) & set(useless_suppressions)
+
+
+def test_mapping_mypy_overlay(monkeypatch):
+    # mypy checks edited copies of the files, the same mapping as removing the suppressions in place
+    with tempfile.TemporaryDirectory() as working_dir:
+        repo_dir = join(working_dir, "repo")
+        commit_id = create_git_repo(repo_dir, [MYPY_FILES])[0][:8]
+        in_place_mapping = compute_mypy_mapping(repo_dir, commit_id, join(working_dir, "in_place"))
+        assert in_place_mapping == EXPECTED_MYPY_MAPPING
+
+        shadow_files_runs = []
+        get_mypy_warnings = mapper.get_mypy_warnings
+
+        def checking_get_mypy_warnings(*args):
+            # the files in the repository stay unmodified during all checker runs
+            subprocess.run(["git", "diff", "--quiet"], cwd=repo_dir, check=True)
+            shadow_files_runs.append(bool(args[-1]))
+            return get_mypy_warnings(*args)
+
+        monkeypatch.setattr(mapper, "get_mypy_warnings", checking_get_mypy_warnings)
+        results_dir = join(working_dir, "overlay")
+        os.makedirs(results_dir)
+        suppressions_file = join(results_dir, "suppressions.csv")
+        write_suppressions_to_file(MYPY_SUPPRESSIONS, suppressions_file)
+        main(repo_dir, commit_id, "mypy", results_dir, suppressions_file, overlay=True)
+        with open(join(results_dir, f"{commit_id}_mapping.csv"), "r") as f:
+            assert sorted(csv.reader(f)) == in_place_mapping
+        # the original warnings, then removals
+        assert shadow_files_runs[0] is False and shadow_files_runs[1:] and all(shadow_files_runs[1:])
+
+
+def test_mapping_mypy_workers():
+    # parallel workers on their own worktrees, the same mapping as a single worker in the repository
+    with tempfile.TemporaryDirectory() as working_dir:
+        repo_dir = join(working_dir, "repo")
+        commit_id = create_git_repo(repo_dir, [MYPY_FILES])[0][:8]
+        mapping = compute_mypy_mapping(repo_dir, commit_id, join(working_dir, "workers_1"), ["--workers", "1"])
+        assert mapping == EXPECTED_MYPY_MAPPING
+        for extra_args in [["--workers", "3"], ["--workers", "3", "--one_by_one"], ["--workers", "2", "--overlay"]]:
+            results_dir = join(working_dir, "_".join(extra_args))
+            assert compute_mypy_mapping(repo_dir, commit_id, results_dir, extra_args) == mapping
+            assert get_worktrees(repo_dir) == [realpath(repo_dir)]